@@ -0,0 +1 @@
+"""Benchmarks do sistema: gerador de dados sintéticos e suíte de medição (python -m benchmarks.suite)."""
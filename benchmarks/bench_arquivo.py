@@ -0,0 +1,104 @@
+"""
+Benchmark do arquivo morto em Parquet.
+
+Gera um banco sintético (ver gerador.py) e mede, com todo o histórico no SQLite,
+o que lê as linhas dos meses arquivados: a exportação de vendas e de despesas em
+janelas longas e curtas, e as primeiras páginas da listagem de Gerir Lançamentos
+a partir de uma data antiga. Depois arquiva os meses fechados, repete as medições
+e confere que as linhas continuam iguais. Mostra também o tamanho do banco e dos Parquet.
+
+Uso (a partir da pasta do projeto; precisa do pyarrow):
+    python benchmarks/bench_arquivo.py --escala media --meses-abertos 3
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerador import adicionar_argumentos_escala, gerar_banco, parametros_escala  # noqa: E402
+from doceria import create_app  # noqa: E402
+from doceria.arquivamento import arquivar_meses_fechados, get_pasta_arquivo  # noqa: E402
+from doceria.dao import get_vendas_pagina  # noqa: E402
+from doceria.db import get_db  # noqa: E402
+from doceria.exportacao import gerar_linhas_exportacao  # noqa: E402
+
+PAGINAS = 10
+
+
+def tamanho_mb(caminho):
+    if os.path.isdir(caminho):
+        return sum(os.path.getsize(os.path.join(pasta, nome))
+                   for pasta, _, nomes in os.walk(caminho) for nome in nomes) / 1e6
+    return os.path.getsize(caminho) / 1e6
+
+
+def paginas_listagem(data_fim):
+    """As PAGINAS primeiras páginas de vendas até 'data_fim', seguindo o cursor como a tela faz."""
+    linhas, cursor_pagina = [], None
+    for _ in range(PAGINAS):
+        vendas, cursor_pagina = get_vendas_pagina(apos=cursor_pagina, data_fim=data_fim)
+        linhas += [(venda['id'], venda['data'], venda['total_venda'], venda['metodo_pagamento']) for venda in vendas]
+        if not cursor_pagina:
+            break
+    return linhas
+
+
+def medir(casos, repeticoes):
+    resultados = {}
+    for nome, funcao in casos.items():
+        tempos = []
+        for _ in range(repeticoes):
+            comeco = time.perf_counter()
+            linhas = funcao()
+            tempos.append(time.perf_counter() - comeco)
+        resultados[nome] = (min(tempos) * 1000, linhas)
+    return resultados
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    adicionar_argumentos_escala(parser)
+    parser.add_argument("--meses-abertos", type=int, default=3)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    caminho = os.path.join(tempfile.mkdtemp(), "bench_arquivo.db")
+    print(f"Gerando {caminho}: {gerar_banco(caminho, anos=args.anos, seed=args.seed, **parametros_escala(args))}")
+    hoje = date.today()
+    janelas = {
+        'todo o histórico': (hoje - timedelta(days=366 * args.anos), hoje),
+        'último ano': (hoje - timedelta(days=365), hoje),
+        'últimos 30 dias': (hoje - timedelta(days=29), hoje),
+    }
+    casos = {f"exportação de {nome} ({janela})": (lambda nome=nome, periodo=periodo:
+                                                   list(gerar_linhas_exportacao(nome, *periodo)))
+             for janela, periodo in janelas.items() for nome in ('vendas', 'despesas')}
+    data_antiga = hoje - timedelta(days=366 * args.anos // 2)
+    casos[f"listagem: {PAGINAS} páginas até {data_antiga}"] = lambda: paginas_listagem(data_antiga)
+
+    app = create_app({'DATABASE': caminho})
+    with app.test_request_context():
+        antes = medir(casos, args.repeticoes)
+        mb_banco_antes = tamanho_mb(caminho)
+
+        comeco = time.perf_counter()
+        meses = arquivar_meses_fechados(args.meses_abertos)
+        segundos_arquivar = time.perf_counter() - comeco
+        get_db().execute("VACUUM")  # Devolve ao disco as páginas das linhas arquivadas
+        depois = medir(casos, args.repeticoes)
+
+        print(f"\n{len(meses)} meses arquivados em {segundos_arquivar:.2f}s")
+        print(f"banco: {mb_banco_antes:.1f} MB -> {tamanho_mb(caminho):.1f} MB "
+              f"(+ {tamanho_mb(get_pasta_arquivo()):.1f} MB de Parquet)")
+        for nome in casos:
+            ms_antes, linhas_antes = antes[nome]
+            ms_depois, linhas_depois = depois[nome]
+            assert linhas_antes == linhas_depois, nome
+            print(f"  {nome}: {ms_antes:.1f} ms -> {ms_depois:.1f} ms ({len(linhas_depois)} linhas, iguais)")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,92 @@
+"""
+Benchmark e verificação do cálculo de custos vetorizado (NumPy).
+
+Cria um banco sintético temporário com todas as unidades de medida (inclusive
+unidades desconhecidas), densidades nulas/zero, embalagens sem quantidade e
+custos adicionais com e sem vida útil. Compara o custo de TODAS as receitas
+calculado pelas funções escalares (a referência) com calcular_custos_receitas:
+os valores precisam ser idênticos (==), não apenas próximos. Sai com código 1 se
+alguma receita divergir.
+
+Uso (a partir da pasta do projeto):
+    python benchmarks/bench_custos.py --receitas 2000 --ingredientes 800
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from doceria import create_app  # noqa: E402
+from doceria.custos import FATORES_CONVERSAO, calcular_custo_total_receita, calcular_custos_receitas  # noqa: E402
+from doceria.dao import get_receitas  # noqa: E402
+from doceria.db import get_db  # noqa: E402
+
+UNIDADES = list(FATORES_CONVERSAO) + ['lata', 'G']  # Desconhecidas usam fator 1.0
+
+
+def popular_banco(db, num_ingredientes, num_receitas, num_custos, seed=42):
+    """Gera um catálogo sintético cobrindo os casos de borda das regras de custo."""
+    rnd = random.Random(seed)
+    cursor = db.cursor()
+    cursor.executemany("INSERT INTO ingredientes (nome, preco_embalagem, quant_embalagem, densidade) VALUES(?,?,?,?)",
+                       [(f"ingrediente {i}", rnd.uniform(0, 60), rnd.choice([0, 200, 395, 500, 1000, 1.5]),
+                         rnd.choice([None, 0, 1.0, 0.93, 1.03, rnd.uniform(0.2, 2)]))
+                        for i in range(num_ingredientes)])
+    cursor.executemany("INSERT INTO custos_adicionais (nome, tipo, custo_unitario, vida_util) VALUES(?,?,?,?)",
+                       [(f"custo {i}", 'Fixo', rnd.uniform(0, 300), rnd.choice([None, 0, 1, 12, 365]))
+                        for i in range(num_custos)])
+    cursor.executemany("INSERT INTO receitas (nome, descricao, rendimento) VALUES(?,?,?)",
+                       [(f"receita {i}", "", rnd.randint(0, 40)) for i in range(num_receitas)])
+    cursor.executemany("INSERT INTO receita_ingredientes (receita_id, ingrediente_id, quantidade, unidade) VALUES(?,?,?,?)",
+                       [(r, rnd.randint(1, num_ingredientes), rnd.choice([rnd.uniform(0, 500), rnd.randint(1, 10)]),
+                         rnd.choice(UNIDADES))
+                        for r in range(1, num_receitas + 1) for _ in range(rnd.randint(0, 15))])
+    cursor.executemany("""INSERT INTO receita_custos_adicionais (receita_id, custo_adicional_id, quantidade_utilizada)
+                          VALUES(?,?,?)""",
+                       [(r, rnd.randint(1, num_custos), rnd.choice([1, 2, rnd.uniform(0.1, 5)]))
+                        for r in range(1, num_receitas + 1) for _ in range(rnd.randint(0, 3))])
+    db.commit()
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredientes", type=int, default=800)
+    parser.add_argument("--receitas", type=int, default=2000)
+    parser.add_argument("--custos", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), "bench_custos.db")})
+    with app.test_request_context():
+        db = get_db()
+        popular_banco(db, args.ingredientes, args.receitas, args.custos)
+        ids = [row['id'] for row in get_receitas()]
+
+        inicio = time.perf_counter()
+        referencia = {receita_id: calcular_custo_total_receita(receita_id) for receita_id in ids}
+        ms_escalar = (time.perf_counter() - inicio) * 1000
+
+        inicio = time.perf_counter()
+        for _ in range(args.repeticoes):
+            vetorizado = calcular_custos_receitas()
+        ms_vetorizado = (time.perf_counter() - inicio) / args.repeticoes * 1000
+
+        parcial = calcular_custos_receitas(ids[::7])
+
+    divergentes = [receita_id for receita_id in ids if vetorizado.get(receita_id) != referencia[receita_id]]
+    divergentes += [receita_id for receita_id in ids[::7] if parcial.get(receita_id) != referencia[receita_id]]
+    print(f"{len(ids)} receitas")
+    print(f"  escalar (referência): {ms_escalar:.1f} ms")
+    print(f"  vetorizado          : {ms_vetorizado:.1f} ms ({ms_escalar / max(ms_vetorizado, 1e-9):.1f}x)")
+    if divergentes:
+        for receita_id in divergentes[:10]:
+            print(f"  DIVERGE receita {receita_id}: {referencia[receita_id]!r} != {vetorizado.get(receita_id)!r}")
+        sys.exit(1)
+    print("  resultados idênticos ao cálculo escalar")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,117 @@
+"""
+Benchmark dos índices da migração 4.
+
+Cria um banco sintético temporário no schema da versão 3 (sem índices), mede as
+queries mais usadas e mostra o plano de execução (EXPLAIN QUERY PLAN). Depois
+aplica a migração 4 e repete as medições no mesmo banco.
+
+Uso (a partir da pasta do projeto):
+    python benchmarks/bench_indices.py --vendas 50000 --receitas 300 --produtos 600
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from doceria import create_app  # noqa: E402
+from doceria.custos import calcular_custo_produto  # noqa: E402
+from doceria.dao import get_ingredientes_receita, get_itens_para_vendas, get_vendas_recentes  # noqa: E402
+from doceria.db import _bancos_migrados, aplicar_migracoes, get_db  # noqa: E402
+from doceria.exportacao import gerar_linhas_exportacao  # noqa: E402
+
+# (nome, SQL usado no EXPLAIN, função que executa o caminho real do app)
+CONSULTAS = [
+    ("ingredientes da receita",
+     "SELECT * FROM receita_ingredientes WHERE receita_id = 1",
+     lambda: [get_ingredientes_receita(r) for r in range(1, 51)]),
+    ("custo do produto",
+     "SELECT * FROM produto_composicao WHERE produto_id = 1",
+     lambda: [calcular_custo_produto(p) for p in range(1, 21)]),
+    ("itens para vendas",
+     "SELECT * FROM venda_itens WHERE venda_id IN (1, 2, 3)",
+     lambda: get_itens_para_vendas([v['id'] for v in get_vendas_recentes(20)])),
+    ("vendas recentes",
+     "SELECT * FROM vendas ORDER BY data DESC, id DESC LIMIT 20",
+     lambda: get_vendas_recentes(20)),
+    ("exportação de vendas (30 dias)",
+     "SELECT v.id, vi.* FROM vendas v JOIN venda_itens vi ON vi.venda_id = v.id "
+     "WHERE v.data >= '2024-01-01' AND v.data < '2024-01-31' ORDER BY v.data, v.id, vi.id",
+     lambda: list(gerar_linhas_exportacao('vendas', date(2024, 1, 1), date(2024, 1, 30)))),
+]
+
+
+def popular_banco(db, num_ingredientes, num_receitas, num_produtos, num_vendas, seed=42):
+    """Gera um catálogo e um histórico de vendas sintéticos."""
+    rnd = random.Random(seed)
+    cursor = db.cursor()
+    cursor.executemany("INSERT INTO ingredientes (nome, preco_embalagem, quant_embalagem, densidade) VALUES(?,?,?,?)",
+                       [(f"ingrediente {i}", rnd.uniform(2, 60), rnd.choice([200, 395, 500, 1000]), 1.0)
+                        for i in range(num_ingredientes)])
+    cursor.executemany("INSERT INTO receitas (nome, descricao, rendimento) VALUES(?,?,?)",
+                       [(f"receita {i}", "", rnd.randint(1, 40)) for i in range(num_receitas)])
+    cursor.executemany("INSERT INTO receita_ingredientes (receita_id, ingrediente_id, quantidade, unidade) VALUES(?,?,?,?)",
+                       [(r, rnd.randint(1, num_ingredientes), rnd.uniform(1, 300), rnd.choice(['g', 'ml', 'xícara']))
+                        for r in range(1, num_receitas + 1) for _ in range(8)])
+    cursor.executemany("INSERT INTO produtos (nome, preco_venda) VALUES(?,?)",
+                       [(f"produto {i}", rnd.uniform(2, 80)) for i in range(num_produtos)])
+    cursor.executemany("INSERT INTO produto_composicao (produto_id, receita_id, fracao_receita) VALUES(?,?,?)",
+                       [(p, rnd.randint(1, num_receitas), rnd.choice([1.0, 2.0, 0.5]))
+                        for p in range(1, num_produtos + 1) for _ in range(2)])
+    inicio = date(2022, 1, 1)
+    cursor.executemany("INSERT INTO vendas (data, total_venda, metodo_pagamento) VALUES(?,?,?)",
+                       [((inicio + timedelta(days=rnd.randint(0, 3 * 365))).isoformat(), rnd.uniform(5, 200), 'Pix')
+                        for _ in range(num_vendas)])
+    cursor.executemany("""INSERT INTO venda_itens
+                          (venda_id, produto_id, quantidade, preco_unitario_venda, custo_unitario_producao)
+                          VALUES(?,?,?,?,?)""",
+                       [(v, rnd.randint(1, num_produtos), rnd.randint(1, 5), 10.0, 4.0)
+                        for v in range(1, num_vendas + 1) for _ in range(3)])
+    db.commit()
+
+
+def medir(repeticoes):
+    resultados = {}
+    db = get_db()
+    for nome, sql, funcao in CONSULTAS:
+        plano = [row['detail'] for row in db.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        inicio = time.perf_counter()
+        for _ in range(repeticoes):
+            funcao()
+        resultados[nome] = ((time.perf_counter() - inicio) / repeticoes * 1000, plano)
+    return resultados
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredientes", type=int, default=500)
+    parser.add_argument("--receitas", type=int, default=300)
+    parser.add_argument("--produtos", type=int, default=600)
+    parser.add_argument("--vendas", type=int, default=50000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), "bench_indices.db")})
+    _bancos_migrados.add(app.config['DATABASE'])  # As migrações são aplicadas manualmente abaixo
+    with app.test_request_context():
+        db = get_db()
+        aplicar_migracoes(db, ate_versao=3)
+        popular_banco(db, args.ingredientes, args.receitas, args.produtos, args.vendas)
+        antes = medir(args.repeticoes)
+        aplicar_migracoes(db, ate_versao=4)
+        db.execute("ANALYZE")
+        depois = medir(args.repeticoes)
+
+    for nome, _, _ in CONSULTAS:
+        ms_antes, plano_antes = antes[nome]
+        ms_depois, plano_depois = depois[nome]
+        print(f"\n=== {nome}: {ms_antes:.2f} ms -> {ms_depois:.2f} ms ({ms_antes / max(ms_depois, 1e-9):.1f}x)")
+        print("  antes : " + " | ".join(plano_antes))
+        print("  depois: " + " | ".join(plano_depois))
+
+
+if __name__ == "__main__":
+    main_benchmark()
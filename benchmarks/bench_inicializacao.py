@@ -0,0 +1,110 @@
+"""
+Benchmark da subida do app (tempo de import e memória).
+
+Cada medição roda num processo Python novo, como um worker recém-reiniciado:
+  1. custo de import de cada biblioteca pesada isoladamente;
+  2. import do main.py, com o BI sob demanda (padrão) e com PRECARREGAR_BI=1;
+  3. primeiro request de uma tela comum (/receitas) e do dashboard (/api/financeiro/series),
+     que é quando o bi.py (pandas) é carregado.
+A memória é o RSS do processo (no Windows, onde não há /proc nem 'resource', fica em branco).
+
+Uso (a partir da pasta do projeto):
+    python benchmarks/bench_inicializacao.py --repeticoes 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_PROJETO)
+from benchmarks import gerador  # noqa: E402
+
+BIBLIOTECAS = ['flask', 'numpy', 'pandas', 'plotly']
+
+# Código executado no processo filho: imprime um JSON com os tempos (ms) e o RSS (MB)
+SCRIPT_FILHO = r'''
+import json, os, sys, time
+
+def rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for linha in f:
+                if linha.startswith('VmRSS:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+resultado = {}
+inicio = time.perf_counter()
+if MODULO != 'main':
+    __import__(MODULO)
+    resultado['import_ms'] = (time.perf_counter() - inicio) * 1000
+    resultado['rss_mb'] = rss_mb()
+else:
+    import main
+    resultado['import_ms'] = (time.perf_counter() - inicio) * 1000
+    resultado['rss_mb'] = rss_mb()
+    cliente = main.app.test_client()
+    for nome, url in (('receitas', '/receitas'), ('dashboard', '/api/financeiro/series')):
+        inicio = time.perf_counter()
+        assert cliente.get(url).status_code == 200, url
+        resultado[f'primeiro_{nome}_ms'] = (time.perf_counter() - inicio) * 1000
+        resultado[f'rss_apos_{nome}_mb'] = rss_mb()
+print(json.dumps(resultado))
+'''
+
+
+def rodar_filho(modulo, banco, env_extra=None):
+    codigo = f"MODULO = {modulo!r}\n" + SCRIPT_FILHO
+    env = {**os.environ, 'DATABASE': banco, **(env_extra or {})}
+    saida = subprocess.run([sys.executable, "-W", "ignore", "-c", codigo], cwd=PASTA_PROJETO, env=env,
+                           capture_output=True, text=True, check=True).stdout
+    return json.loads(saida.strip().splitlines()[-1])
+
+
+def mediana(resultados, chave):
+    valores = [r[chave] for r in resultados if r.get(chave) is not None]
+    return statistics.median(valores) if valores else None
+
+
+def formatar(valor, unidade):
+    return f"{valor:8.1f} {unidade}" if valor is not None else f"{'-':>8} {unidade}"
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+
+    banco = os.path.join(tempfile.mkdtemp(), "bench_inicializacao.db")
+    gerador.gerar_banco(banco, **gerador.ESCALAS['pequena'])
+
+    print("=== Import isolado de cada biblioteca (processo novo, mediana)")
+    for biblioteca in BIBLIOTECAS:
+        resultados = [rodar_filho(biblioteca, banco) for _ in range(args.repeticoes)]
+        print(f"  {biblioteca:8s} {formatar(mediana(resultados, 'import_ms'), 'ms')}"
+              f"  RSS {formatar(mediana(resultados, 'rss_mb'), 'MB')}")
+
+    for titulo, env in (("BI sob demanda (padrão)", {"PRECARREGAR_BI": "0"}),
+                        ("BI pré-carregado (PRECARREGAR_BI=1)", {"PRECARREGAR_BI": "1"})):
+        resultados = [rodar_filho('main', banco, env) for _ in range(args.repeticoes)]
+        print(f"\n=== main.py: {titulo}")
+        print(f"  import main            {formatar(mediana(resultados, 'import_ms'), 'ms')}"
+              f"  RSS {formatar(mediana(resultados, 'rss_mb'), 'MB')}")
+        print(f"  1º GET /receitas       {formatar(mediana(resultados, 'primeiro_receitas_ms'), 'ms')}"
+              f"  RSS {formatar(mediana(resultados, 'rss_apos_receitas_mb'), 'MB')}")
+        print(f"  1º GET api de séries   {formatar(mediana(resultados, 'primeiro_dashboard_ms'), 'ms')}"
+              f"  RSS {formatar(mediana(resultados, 'rss_apos_dashboard_mb'), 'MB')}")
+
+
+if __name__ == "__main__":
+    main_benchmark()
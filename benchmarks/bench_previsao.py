@@ -0,0 +1,82 @@
+"""
+Benchmark da previsão de vendas por produto (previsao.py).
+
+1. Num banco sintético (ver gerador.py): tempo de leitura do histórico, do ajuste de
+   cada método para todos os produtos e da lista de compras completa; e o erro
+   (MAE, unidades por produto e dia) de cada método prevendo a última semana, que
+   fica de fora do ajuste.
+2. Em séries sintéticas com sazonalidade semanal e ruído (--series, padrão 5000):
+   tempo do ajuste e erro de cada método. O gerador.py não tem padrão semanal, então
+   esta parte mostra o ganho da suavização quando há sazonalidade.
+
+Uso (a partir da pasta do projeto):
+    python benchmarks/bench_previsao.py --escala media --series 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from gerador import adicionar_argumentos_escala, gerar_banco, parametros_escala  # noqa: E402
+from doceria import create_app  # noqa: E402
+from doceria.previsao import METODOS_PREVISAO, calcular_lista_compras, get_historico_produtos  # noqa: E402
+
+SEMANAS = 26
+HORIZONTE = 7
+
+
+def medir_ms(funcao):
+    comeco = time.perf_counter()
+    resultado = funcao()
+    return (time.perf_counter() - comeco) * 1000, resultado
+
+
+def comparar_metodos(historico, titulo):
+    """Ajusta cada método sem a última semana e mede o erro ao prevê-la."""
+    treino, real = historico[:, :-HORIZONTE], historico[:, -HORIZONTE:]
+    print(f"\n=== {titulo}: {historico.shape[0]} séries x {treino.shape[1]} dias")
+    print(f"  {'média do histórico':45s}              MAE {np.abs(treino.mean(axis=1)[:, None] - real).mean():.3f}")
+    for nome, (descricao, funcao) in METODOS_PREVISAO.items():
+        ms, previsao = medir_ms(lambda: funcao(treino, HORIZONTE))
+        print(f"  {descricao:45s} {ms:8.1f} ms  MAE {np.abs(previsao - real).mean():.3f}")
+
+
+def series_sazonais(num_series, dias, seed):
+    """Vendas diárias com nível, padrão semanal e ruído próprios de cada série."""
+    rng = np.random.default_rng(seed)
+    nivel = rng.uniform(1, 40, (num_series, 1))
+    padrao = rng.uniform(0.4, 1.8, (num_series, 7))
+    ruido = rng.normal(0, 0.25, (num_series, dias)) * nivel
+    return np.maximum(nivel * padrao[:, np.arange(dias) % 7] + ruido, 0).round()
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    adicionar_argumentos_escala(parser)
+    parser.add_argument("--series", type=int, default=5000)
+    args = parser.parse_args()
+
+    caminho = os.path.join(tempfile.mkdtemp(), "bench_previsao.db")
+    print(f"Gerando {caminho}: {gerar_banco(caminho, anos=args.anos, seed=args.seed, **parametros_escala(args))}")
+    app = create_app({'DATABASE': caminho, 'PREVISAO_SEMANAS': SEMANAS})
+    with app.test_request_context():
+        ontem = date.today() - timedelta(days=1)
+        ms, (_, historico) = medir_ms(lambda: get_historico_produtos(ontem, SEMANAS * 7 + HORIZONTE))
+        print(f"\nhistórico ({historico.shape[0]} produtos x {historico.shape[1]} dias): {ms:.1f} ms")
+        for metodo in METODOS_PREVISAO:
+            ms, lista = medir_ms(lambda: calcular_lista_compras(HORIZONTE, metodo))
+            ms_cache, _ = medir_ms(lambda: calcular_lista_compras(HORIZONTE, metodo))
+            print(f"lista de compras ({metodo}): {ms:.1f} ms ({ms_cache:.1f} ms com a previsão do dia em cache), "
+                  f"{len(lista['ingredientes'])} ingredientes")
+        comparar_metodos(historico, "Banco sintético")
+
+    comparar_metodos(series_sazonais(args.series, SEMANAS * 7 + HORIZONTE, args.seed), "Séries com padrão semanal")
+
+
+if __name__ == "__main__":
+    main_benchmark()
@@ -0,0 +1,72 @@
+"""
+Benchmark do motor de simulação (what-if).
+
+Cria um catálogo sintético temporário, compila o grafo de custos e mede quantos
+cenários por segundo simular_cenarios avalia (variação de preço dos ingredientes,
+rendimentos e markup). Confere também se o cenário base reproduz os custos do
+cálculo em lote.
+
+Uso (a partir da pasta do projeto):
+    python benchmarks/bench_simulacao.py --cenarios 5000 --receitas 300 --produtos 600
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bench_indices import popular_banco  # noqa: E402
+from doceria import create_app  # noqa: E402
+from doceria.custos import calcular_custos_produtos, compilar_grafo_custos, simular_cenarios  # noqa: E402
+from doceria.db import get_db  # noqa: E402
+
+
+def main_benchmark():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--ingredientes", type=int, default=500)
+    parser.add_argument("--receitas", type=int, default=300)
+    parser.add_argument("--produtos", type=int, default=600)
+    parser.add_argument("--cenarios", type=int, default=5000)
+    args = parser.parse_args()
+
+    app = create_app({'DATABASE': os.path.join(tempfile.mkdtemp(), "bench_simulacao.db")})
+    rnd = random.Random(42)
+    with app.test_request_context():
+        popular_banco(get_db(), args.ingredientes, args.receitas, args.produtos, num_vendas=0)
+
+        inicio = time.perf_counter()
+        grafo = compilar_grafo_custos()
+        ms_compilar = (time.perf_counter() - inicio) * 1000
+
+        base = simular_cenarios(grafo, [{}])[0]
+        custos = calcular_custos_produtos()
+        esperado = [custos[produto['id']] for produto in grafo['produtos']]
+        if not np.allclose(base['custo_unitario'], esperado):
+            print("ERRO: o cenário base não reproduz o cálculo em lote")
+            sys.exit(1)
+
+        ingrediente_ids = list(grafo['pos_ingrediente'])
+        receita_ids = list(grafo['pos_receita'])
+        cenarios = [{
+            'variacao_geral_ingredientes': rnd.uniform(0.9, 1.2),
+            'variacao_ingredientes': {rnd.choice(ingrediente_ids): rnd.uniform(0.5, 2) for _ in range(5)},
+            'rendimentos': {rnd.choice(receita_ids): rnd.randint(1, 40)},
+            'markup': rnd.choice([None, 3, 3.5, 4]),
+        } for _ in range(args.cenarios)]
+        mix = {produto['id']: rnd.randint(0, 50) for produto in grafo['produtos']}
+
+        inicio = time.perf_counter()
+        simular_cenarios(grafo, cenarios, mix=mix)
+        segundos = time.perf_counter() - inicio
+
+    print(f"grafo compilado em {ms_compilar:.1f} ms "
+          f"({len(ingrediente_ids)} ingredientes, {len(receita_ids)} receitas, {len(grafo['produtos'])} produtos)")
+    print(f"{args.cenarios} cenários em {segundos * 1000:.1f} ms ({args.cenarios / segundos:.0f} cenários/s)")
+
+
+if __name__ == "__main__":
+    main_benchmark()
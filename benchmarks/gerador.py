@@ -0,0 +1,171 @@
+"""
+Gerador de dados sintéticos para os benchmarks.
+
+Cria catálogo (ingredientes, custos adicionais, receitas, produtos) e histórico
+(vendas, itens e despesas) em qualquer escala, sempre igual para a mesma semente.
+O histórico termina hoje, então as janelas do dashboard ("últimos 30 dias" etc.)
+sempre encontram dados. As vendas são inseridas em lotes com executemany.
+
+Uso (a partir da pasta do projeto):
+    python -m benchmarks.gerador --escala media --saida /tmp/doceria_media.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from doceria import create_app  # noqa: E402
+from doceria.custos import calcular_custos_produtos  # noqa: E402
+from doceria.db import get_db  # noqa: E402
+from doceria.resumos import reconstruir_resumos_financeiros  # noqa: E402
+
+# Escalas prontas: (ingredientes, receitas, produtos, itens de venda)
+ESCALAS = {
+    'pequena': dict(ingredientes=100, receitas=50, produtos=200, itens=50_000),
+    'media': dict(ingredientes=500, receitas=250, produtos=1_000, itens=500_000),
+    'grande': dict(ingredientes=1_000, receitas=500, produtos=2_000, itens=5_000_000),
+}
+UNIDADES = ['g', 'g', 'g', 'kg', 'ml', 'l', 'colher', 'xícara', 'unidade', 'pitada']
+TAMANHO_LOTE = 200_000  # Itens de venda gerados/inseridos por vez
+
+
+def popular_catalogo(db, num_ingredientes, num_receitas, num_produtos, seed=42):
+    """Gera ingredientes, custos adicionais, receitas (8 ingredientes cada) e produtos (1 a 3 receitas)."""
+    rnd = random.Random(seed)
+    cursor = db.cursor()
+    cursor.executemany("INSERT INTO ingredientes (nome, preco_embalagem, quant_embalagem, densidade) VALUES(?,?,?,?)",
+                       [(f"ingrediente {i}", rnd.uniform(2, 60), rnd.choice([200, 395, 500, 1000]),
+                         rnd.choice([1.0, 0.93, 1.03, 0.6]))
+                        for i in range(num_ingredientes)])
+    cursor.executemany("INSERT INTO custos_adicionais (nome, tipo, custo_unitario, vida_util) VALUES(?,?,?,?)",
+                       [(f"custo {i}", rnd.choice(['Fixo', 'Variável']), rnd.uniform(0.1, 200),
+                         rnd.choice([None, 30, 365])) for i in range(20)])
+    cursor.executemany("INSERT INTO receitas (nome, descricao, rendimento) VALUES(?,?,?)",
+                       [(f"receita {i}", "", rnd.randint(1, 40)) for i in range(num_receitas)])
+    cursor.executemany("INSERT INTO receita_ingredientes (receita_id, ingrediente_id, quantidade, unidade) VALUES(?,?,?,?)",
+                       [(r, rnd.randint(1, num_ingredientes), rnd.uniform(1, 300), rnd.choice(UNIDADES))
+                        for r in range(1, num_receitas + 1) for _ in range(8)])
+    cursor.executemany("""INSERT INTO receita_custos_adicionais (receita_id, custo_adicional_id, quantidade_utilizada)
+                          VALUES(?,?,?)""",
+                       [(r, rnd.randint(1, 20), rnd.choice([1, 2, 0.5]))
+                        for r in range(1, num_receitas + 1) for _ in range(2)])
+    cursor.executemany("INSERT INTO produtos (nome, preco_venda) VALUES(?,?)",
+                       [(f"produto {i}", round(rnd.uniform(2, 80), 2)) for i in range(num_produtos)])
+    cursor.executemany("INSERT INTO produto_composicao (produto_id, receita_id, fracao_receita) VALUES(?,?,?)",
+                       [(p, rnd.randint(1, num_receitas), rnd.choice([1.0, 2.0, 0.5]))
+                        for p in range(1, num_produtos + 1) for _ in range(rnd.randint(1, 3))])
+    db.commit()
+
+
+def popular_historico(db, num_itens, anos=3, seed=42):
+    """Gera ~num_itens itens de venda (1 a 5 por venda) e ~3 despesas por dia, terminando hoje.
+
+    Os produtos seguem uma popularidade desigual (poucos campeões de venda) e o custo de
+    produção de cada item é o custo real do produto, calculado pelo motor de custos.
+    """
+    rng = np.random.default_rng(seed)
+    cursor = db.cursor()
+    produtos = cursor.execute("SELECT id, preco_venda FROM produtos ORDER BY id").fetchall()
+    produto_ids = np.array([p['id'] for p in produtos])
+    precos = np.array([p['preco_venda'] for p in produtos])
+    custos_produtos = calcular_custos_produtos()
+    custos = np.array([custos_produtos.get(p['id'], 0) for p in produtos])
+    popularidade = 1 / np.arange(1, len(produtos) + 1) ** 0.8
+    popularidade = rng.permutation(popularidade / popularidade.sum())
+
+    dias = anos * 365
+    inicio = date.today() - timedelta(days=dias - 1)
+    datas = [(inicio + timedelta(days=d)).isoformat() for d in range(dias)]
+    metodos = np.array(['Pix', 'Cartão', 'Dinheiro', 'Outro'])
+
+    proxima_venda = (cursor.execute("SELECT COALESCE(MAX(id), 0) FROM vendas").fetchone()[0]) + 1
+    gerados = 0
+    while gerados < num_itens:
+        # 1. Vendas do lote: quantos itens cada uma tem e em que dia foi (ids crescem com a data)
+        itens_por_venda = rng.integers(1, 6, size=TAMANHO_LOTE // 3)
+        itens_por_venda = itens_por_venda[np.cumsum(itens_por_venda) <= min(TAMANHO_LOTE, num_itens - gerados)]
+        if len(itens_por_venda) == 0:
+            itens_por_venda = np.array([num_itens - gerados])
+        num_vendas = len(itens_por_venda)
+        primeiro_item = gerados + np.cumsum(itens_por_venda) - itens_por_venda
+        dia_venda = primeiro_item * dias // num_itens  # Itens espalhados igualmente ao longo do período
+        venda_ids = np.arange(proxima_venda, proxima_venda + num_vendas)
+
+        # 2. Itens
+        venda_do_item = np.repeat(venda_ids, itens_por_venda)
+        posicao_produto = rng.choice(len(produtos), size=len(venda_do_item), p=popularidade)
+        quantidade = rng.integers(1, 6, size=len(venda_do_item))
+        preco = precos[posicao_produto]
+        total_venda = np.bincount(venda_do_item - proxima_venda, weights=preco * quantidade, minlength=num_vendas)
+
+        cursor.executemany("INSERT INTO vendas (id, data, total_venda, metodo_pagamento) VALUES(?,?,?,?)",
+                           zip(venda_ids.tolist(), [datas[d] for d in dia_venda], total_venda.tolist(),
+                               metodos[rng.integers(0, 4, size=num_vendas)].tolist()))
+        cursor.executemany("""INSERT INTO venda_itens
+                              (venda_id, produto_id, quantidade, preco_unitario_venda, custo_unitario_producao)
+                              VALUES(?,?,?,?,?)""",
+                           zip(venda_do_item.tolist(), produto_ids[posicao_produto].tolist(), quantidade.tolist(),
+                               preco.tolist(), custos[posicao_produto].tolist()))
+        gerados += len(venda_do_item)
+        proxima_venda += num_vendas
+
+    cursor.executemany("INSERT INTO despesas (descricao, valor, data, categoria) VALUES(?,?,?,?)",
+                       ((f"despesa {i}", float(rng.uniform(5, 400)), datas[i % dias],
+                         ['Fixa', 'Variável', 'Ingredientes', 'Outra'][i % 4]) for i in range(dias * 3)))
+    db.commit()
+
+
+def gerar_banco(caminho, ingredientes, receitas, produtos, itens, anos=3, seed=42):
+    """Cria (do zero) um banco sintético completo em 'caminho', com resumos e estatísticas prontos."""
+    for arquivo in (caminho, caminho + "-wal", caminho + "-shm"):
+        if os.path.exists(arquivo):
+            os.remove(arquivo)
+    app = create_app({'DATABASE': caminho})
+    with app.test_request_context():
+        db = get_db()
+        db.execute("PRAGMA synchronous = OFF")  # Só para a carga inicial do banco descartável
+        popular_catalogo(db, ingredientes, receitas, produtos, seed)
+        popular_historico(db, itens, anos, seed)
+        reconstruir_resumos_financeiros()
+        db.execute("ANALYZE")
+        db.execute(f"PRAGMA synchronous = {app.config['DB_SYNCHRONOUS']}")
+        return contar_linhas(db)
+
+
+def contar_linhas(db):
+    tabelas = ['ingredientes', 'receitas', 'produtos', 'vendas', 'venda_itens', 'despesas']
+    return {tabela: db.execute(f"SELECT COUNT(*) FROM {tabela}").fetchone()[0] for tabela in tabelas}
+
+
+def adicionar_argumentos_escala(parser):
+    """Argumentos de escala compartilhados pelo gerador e pela suíte."""
+    parser.add_argument("--escala", choices=list(ESCALAS), default='pequena')
+    parser.add_argument("--ingredientes", type=int, help="Sobrescreve o valor da escala")
+    parser.add_argument("--receitas", type=int, help="Sobrescreve o valor da escala")
+    parser.add_argument("--produtos", type=int, help="Sobrescreve o valor da escala")
+    parser.add_argument("--itens", type=int, help="Itens de venda (sobrescreve o valor da escala)")
+    parser.add_argument("--anos", type=int, default=3, help="Anos de histórico de vendas")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def parametros_escala(args):
+    parametros = dict(ESCALAS[args.escala])
+    for chave in parametros:
+        if getattr(args, chave) is not None:
+            parametros[chave] = getattr(args, chave)
+    return parametros
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    adicionar_argumentos_escala(parser)
+    parser.add_argument("--saida", required=True, help="Arquivo .db a criar (é sobrescrito)")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    contagens = gerar_banco(args.saida, anos=args.anos, seed=args.seed, **parametros_escala(args))
+    print(f"{args.saida} gerado em {time.perf_counter() - inicio:.1f}s: {contagens}")
@@ -0,0 +1,192 @@
+"""
+Suíte de benchmarks reproduzível.
+
+Gera (ou reaproveita) um banco sintético com benchmarks.gerador, mede os caminhos
+mais usados do app e grava os tempos num JSON, para comparar versões:
+
+    python -m benchmarks.suite --escala media --saida base.json
+    (... alterações ...)
+    python -m benchmarks.suite --escala media --saida novo.json --comparar base.json
+
+Com --comparar, o script lista cada medição cuja mediana piorou mais que --limiar
+(padrão 20%) e termina com código 1, para poder ser usado em CI. Gerar a escala
+'grande' (5 milhões de itens) demora: use --banco para guardar o arquivo gerado e
+--reusar para aproveitá-lo nas próximas rodadas.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from doceria import create_app  # noqa: E402
+from doceria.bi import _cache_graficos, _cache_graficos_lock  # noqa: E402
+from doceria.config import PASTA_PROJETO  # noqa: E402
+from doceria.custos import calcular_custo_produto  # noqa: E402
+from doceria.dao import get_itens_para_vendas, get_vendas_recentes  # noqa: E402
+from doceria.db import get_db  # noqa: E402
+from benchmarks import gerador  # noqa: E402
+
+JANELAS_DASHBOARD = [7, 30, 90, 365, None]  # Dias (None: todo o histórico)
+
+
+def _limpar_cache_custos():
+    db = get_db()
+    db.execute("DELETE FROM custos_produtos_cache")
+    db.execute("DELETE FROM custos_receitas_cache")
+    db.commit()
+
+
+def _limpar_cache_graficos():
+    with _cache_graficos_lock:
+        _cache_graficos.clear()
+
+
+def _get(cliente, url):
+    def funcao():
+        resposta = cliente.get(url)
+        if resposta.status_code != 200:
+            raise RuntimeError(f"GET {url} respondeu {resposta.status_code}")
+    return funcao
+
+
+def montar_medicoes(cliente, seed):
+    """Lista de (nome, preparar, funcao). 'preparar' roda antes de cada repetição, fora do cronômetro."""
+    rnd = random.Random(seed)
+    db = get_db()
+    produto_ids = [row['id'] for row in db.execute("SELECT id FROM produtos")]
+    amostra_produtos = rnd.sample(produto_ids, min(50, len(produto_ids)))
+    primeira_data = db.execute("SELECT MIN(data) FROM vendas").fetchone()[0] or date.today().isoformat()
+    vendas_20 = [row['id'] for row in get_vendas_recentes(20)]
+    vendas_500 = [row['id'] for row in get_vendas_recentes(500)]
+
+    medicoes = [
+        ("calcular_custo_produto (50 produtos)", None,
+         lambda: [calcular_custo_produto(p) for p in amostra_produtos]),
+        ("gerir_receitas (cache de custos frio)", _limpar_cache_custos, _get(cliente, "/receitas")),
+        ("gerir_receitas (cache de custos quente)", None, _get(cliente, "/receitas")),
+        ("lancamentos_financeiros GET", None, _get(cliente, "/financeiro/lancamentos")),
+        ("gerir_lancamentos (primeira página)", None, _get(cliente, "/financeiro/gerir")),
+        ("get_itens_para_vendas (20 vendas)", None, lambda: get_itens_para_vendas(vendas_20)),
+        ("get_itens_para_vendas (500 vendas)", None, lambda: get_itens_para_vendas(vendas_500)),
+    ]
+    hoje = date.today()
+    for dias in JANELAS_DASHBOARD:
+        inicio = primeira_data if dias is None else (hoje - timedelta(days=dias - 1)).isoformat()
+        rotulo = "todo o histórico" if dias is None else f"{dias} dias"
+        filtro = f"?start_date={inicio}&end_date={hoje.isoformat()}"
+        medicoes += [
+            (f"dashboard_financeiro ({rotulo})", None, _get(cliente, "/financeiro/dashboard" + filtro)),
+            (f"api series ({rotulo}, frio)", _limpar_cache_graficos, _get(cliente, "/api/financeiro/series" + filtro)),
+            (f"api series ({rotulo}, quente)", None, _get(cliente, "/api/financeiro/series" + filtro)),
+        ]
+    return medicoes
+
+
+def medir(preparar, funcao, repeticoes):
+    funcao()  # Aquecimento (statements preparados, páginas no cache do SQLite)
+    tempos = []
+    for _ in range(repeticoes):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    tempos.sort()
+    return {
+        'min_ms': round(tempos[0], 3),
+        'mediana_ms': round(statistics.median(tempos), 3),
+        'media_ms': round(statistics.fmean(tempos), 3),
+        'p95_ms': round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+        'repeticoes': repeticoes,
+    }
+
+
+def _commit_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=PASTA_PROJETO).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def comparar(resultado, base, limiar):
+    """Imprime a variação de cada medição e retorna os nomes das que pioraram além do limiar."""
+    regressoes = []
+    for nome, atual in resultado['medicoes'].items():
+        anterior = base['medicoes'].get(nome)
+        if not anterior:
+            continue
+        razao = atual['mediana_ms'] / max(anterior['mediana_ms'], 1e-6)
+        marca = ""
+        if razao > 1 + limiar:
+            regressoes.append(nome)
+            marca = "  <-- REGRESSÃO"
+        print(f"{nome:50s} {anterior['mediana_ms']:10.2f} -> {atual['mediana_ms']:10.2f} ms ({razao:5.2f}x){marca}")
+    return regressoes
+
+
+def main_suite():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    gerador.adicionar_argumentos_escala(parser)
+    parser.add_argument("--repeticoes", type=int, default=10)
+    parser.add_argument("--banco", help="Onde gravar o banco gerado (padrão: pasta temporária)")
+    parser.add_argument("--reusar", action="store_true", help="Usa o --banco existente em vez de gerar outro")
+    parser.add_argument("--saida", help="Arquivo JSON com os resultados")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior para detectar regressões")
+    parser.add_argument("--limiar", type=float, default=0.20, help="Piora tolerada da mediana (0.20 = 20%%)")
+    args = parser.parse_args()
+
+    parametros = gerador.parametros_escala(args)
+    caminho = args.banco or os.path.join(tempfile.mkdtemp(), "bench_suite.db")
+    inicio = time.perf_counter()
+    if not (args.reusar and os.path.exists(caminho)):
+        gerador.gerar_banco(caminho, anos=args.anos, seed=args.seed, **parametros)
+    app = create_app({'DATABASE': caminho})
+    print(f"Banco pronto em {time.perf_counter() - inicio:.1f}s: {caminho}")
+
+    resultado = {
+        'meta': {
+            'data': datetime.now().isoformat(timespec='seconds'),
+            'commit': _commit_git(),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+            'escala': args.escala,
+            'parametros': {**parametros, 'anos': args.anos, 'seed': args.seed},
+        },
+        'medicoes': {},
+    }
+    cliente = app.test_client()
+    with app.test_request_context():
+        resultado['meta']['linhas'] = gerador.contar_linhas(get_db())
+        for nome, preparar, funcao in montar_medicoes(cliente, args.seed):
+            resultado['medicoes'][nome] = medir(preparar, funcao, args.repeticoes)
+            tempos = resultado['medicoes'][nome]
+            print(f"{nome:50s} mediana {tempos['mediana_ms']:10.2f} ms   p95 {tempos['p95_ms']:10.2f} ms")
+
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as f:
+            json.dump(resultado, f, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            base = json.load(f)
+        print(f"\nComparação com {args.comparar} (commit {base['meta'].get('commit')}):")
+        regressoes = comparar(resultado, base, args.limiar)
+        if regressoes:
+            print(f"\n{len(regressoes)} medição(ões) pioraram mais de {args.limiar:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_suite()
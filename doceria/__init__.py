@@ -0,0 +1,45 @@
+"""
+Sistema de precificação e controle financeiro da doceria.
+
+O app é montado por create_app(config), que registra os blueprints de catálogo,
+precificação, operação e BI. Todo o estado de configuração (caminho do banco,
+PRAGMAs, tamanhos de cache) vem do config do app, então vários apps (ou workers
+com --preload) podem coexistir, cada um com o seu banco.
+"""
+from flask import Flask
+
+from . import bi, catalogo, db, instrumentacao, operacoes, precificacao, principal
+from .config import PASTA_PROJETO, Config
+from .arquivamento import arquivar_command
+from .custos import utility_processor
+from .exportacao import exportar_command
+from .importacao import atualizar_precos_command, import_vendas_command
+from .resumos import reconstruir_resumos_command
+from .tarefas import processar_tarefas_command
+
+
+def create_app(config=None):
+    """Cria o app Flask. 'config' (dict ou objeto) sobrescreve os valores de Config."""
+    app = Flask(__name__, root_path=PASTA_PROJETO)
+    app.config.from_object(Config)
+    if isinstance(config, dict):
+        app.config.update(config)
+    elif config is not None:
+        app.config.from_object(config)
+
+    app.teardown_appcontext(db.close_connection)
+    app.context_processor(utility_processor)
+
+    for blueprint in (principal.bp, catalogo.bp, precificacao.bp, operacoes.bp, bi.bp):
+        app.register_blueprint(blueprint)
+    for comando in (db.migrar_command, atualizar_precos_command, import_vendas_command,
+                    reconstruir_resumos_command, exportar_command, processar_tarefas_command, arquivar_command):
+        app.cli.add_command(comando)
+
+    if app.config['INSTRUMENTACAO']:
+        app.before_request(instrumentacao._iniciar_medicao_request)
+        app.after_request(instrumentacao._finalizar_medicao_request)
+        app.add_url_rule("/metrics", "metricas", instrumentacao.metricas)
+    if app.config['PRECARREGAR_BI']:
+        from . import analise  # noqa: F401
+    return app
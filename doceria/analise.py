@@ -0,0 +1,42 @@
+"""
+Análises do dashboard em pandas (+ plotly.js).
+
+Este módulo é importado SOB DEMANDA pelo blueprint de BI, na primeira vez que o
+dashboard precisa de uma série ou do plotly.js. Assim as telas do dia a dia
+(receitas, produtos, lançamentos) não pagam o tempo de import nem a memória do
+pandas. Para carregá-lo já na subida do servidor (ex: gunicorn --preload), use
+PRECARREGAR_BI=1.
+
+As funções recebem as linhas já lidas: o acesso ao banco fica no pacote.
+"""
+import pandas as pd
+
+
+def montar_evolucao_semanal(linhas):
+    """DataFrame (data, total_venda, valor, lucro_liquido) a partir das linhas (semana, total_vendido, total_gasto)."""
+    evolucao_df = pd.DataFrame([dict(row) for row in linhas], columns=['semana', 'total_vendido', 'total_gasto'])
+    evolucao_df = evolucao_df.rename(columns={'semana': 'data', 'total_vendido': 'total_venda', 'total_gasto': 'valor'})
+    evolucao_df['data'] = pd.to_datetime(evolucao_df['data'])
+    if not evolucao_df.empty:
+        # Mantém as semanas sem movimento com valor 0 (como o resample fazia)
+        semanas = pd.date_range(evolucao_df['data'].min(), evolucao_df['data'].max(), freq='7D')
+        evolucao_df = evolucao_df.groupby('data')[['total_venda', 'valor']].sum().reindex(semanas, fill_value=0)
+        evolucao_df = evolucao_df.rename_axis('data').reset_index()
+    evolucao_df['lucro_liquido'] = evolucao_df['total_venda'] - evolucao_df['valor']
+    return evolucao_df
+
+
+def montar_series_semanais(evolucao_df):
+    """Séries semanais em formato colunar (listas), prontas para virar JSON."""
+    return {
+        'data': evolucao_df['data'].dt.strftime('%Y-%m-%d').tolist(),
+        'total_venda': evolucao_df['total_venda'].tolist(),
+        'valor': evolucao_df['valor'].tolist(),
+        'lucro_liquido': evolucao_df['lucro_liquido'].tolist(),
+    }
+
+
+def get_plotly_js():
+    """Conteúdo do plotly.min.js que vem junto com o pacote Python."""
+    import plotly.offline
+    return plotly.offline.get_plotlyjs()
@@ -0,0 +1,328 @@
+"""
+Arquivo morto em Parquet dos meses fechados.
+
+As vendas, itens e despesas dos meses fechados saem do SQLite e vão para arquivos
+Parquet, um por tabela e mês (<pasta do arquivo>/<tabela>/<AAAA-MM>.parquet); no
+banco ficam só os meses em aberto. Os resumos (rollups) continuam no banco com o
+histórico inteiro, então KPIs, gráficos e rankings não mudam. Quem precisa das
+linhas (a listagem de Gerir Lançamentos e as exportações) lê só os meses do período
+(poda por partição), com memory map.
+
+O pyarrow é opcional: só é necessário para arquivar e para ler meses já arquivados.
+"""
+import os
+import shutil
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .db import get_db
+
+
+COLUNAS_ARQUIVO = {
+    # tabela: [(coluna, tipo do pyarrow)]. Os itens levam a data da venda para a poda por período.
+    'vendas': [('id', 'int64'), ('data', 'string'), ('total_venda', 'float64'), ('metodo_pagamento', 'string')],
+    'venda_itens': [('id', 'int64'), ('venda_id', 'int64'), ('produto_id', 'int64'), ('quantidade', 'int64'),
+                    ('preco_unitario_venda', 'float64'), ('custo_unitario_producao', 'float64'),
+                    ('data', 'string')],
+    'despesas': [('id', 'int64'), ('descricao', 'string'), ('valor', 'float64'), ('data', 'string'),
+                 ('categoria', 'string')],
+}
+
+SQL_LINHAS_MES = {
+    'vendas': """SELECT id, data, total_venda, metodo_pagamento FROM vendas
+                 WHERE data >= ? AND data < ? ORDER BY data, id""",
+    'venda_itens': """SELECT vi.id, vi.venda_id, vi.produto_id, vi.quantidade, vi.preco_unitario_venda,
+                             vi.custo_unitario_producao, v.data
+                      FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+                      WHERE v.data >= ? AND v.data < ?
+                      ORDER BY v.data, vi.venda_id, vi.id""",
+    'despesas': """SELECT id, descricao, valor, data, categoria FROM despesas
+                   WHERE data >= ? AND data < ? ORDER BY data, id""",
+}
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow  # Opcional: só é necessário para o arquivo morto
+        import pyarrow.compute
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Para arquivar ou ler meses arquivados instale o pacote pyarrow.")
+    return pyarrow
+
+
+def get_pasta_arquivo():
+    """Pasta do arquivo morto: PASTA_ARQUIVO ou, por padrão, '<banco>_arquivo' ao lado do banco."""
+    return current_app.config['PASTA_ARQUIVO'] or os.path.splitext(current_app.config['DATABASE'])[0] + "_arquivo"
+
+
+def _caminho_mes(tabela, mes):
+    return os.path.join(get_pasta_arquivo(), tabela, f"{mes}.parquet")
+
+
+def _limites_mes(mes):
+    """'2024-02' -> ('2024-02-01', '2024-03-01')."""
+    inicio = datetime.strptime(mes, '%Y-%m').date()
+    proximo = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio.isoformat(), proximo.isoformat()
+
+
+def _primeiro_mes_aberto(meses_abertos, hoje=None):
+    """Primeiro dia do mais antigo dos 'meses_abertos' meses mantidos no banco (o atual conta como um)."""
+    hoje = hoje or date.today()
+    indice = hoje.year * 12 + hoje.month - 1 - (meses_abertos - 1)
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def apagar_arquivo_morto():
+    """Remove os arquivos Parquet (usado no reset do banco)."""
+    shutil.rmtree(get_pasta_arquivo(), ignore_errors=True)
+
+
+# --- Arquivamento ---
+def _gravar_mes(pa, tabela, mes, linhas):
+    """Grava as linhas do mês no Parquet da tabela, juntando com o que já estava arquivado. Retorna o total."""
+    colunas = COLUNAS_ARQUIVO[tabela]
+    schema = pa.schema([(nome, tipo) for nome, tipo in colunas])
+    novas = pa.Table.from_pylist([dict(row) for row in linhas], schema=schema)
+    caminho = _caminho_mes(tabela, mes)
+    if os.path.exists(caminho):
+        # Mês reaberto (venda lançada com data antiga): mantém o arquivado, sem repetir ids
+        existentes = pa.parquet.read_table(caminho, schema=schema)
+        existentes = existentes.filter(pa.compute.invert(pa.compute.is_in(existentes['id'], value_set=novas['id'])))
+        novas = pa.concat_tables([existentes, novas]).sort_by([('data', 'ascending'), ('id', 'ascending')])
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = caminho + ".tmp"
+    pa.parquet.write_table(novas, temporario, compression='zstd')
+    os.replace(temporario, caminho)  # Quem está lendo nunca vê um arquivo pela metade
+    return novas.num_rows
+
+
+def arquivar_meses_fechados(meses_abertos=None):
+    """Move para o Parquet os meses anteriores aos 'meses_abertos' mais recentes. Retorna {mes: linhas}.
+
+    Cada mês é arquivado na sua própria transação (BEGIN IMMEDIATE): o arquivo é gravado
+    e as linhas saem do banco com o lock de escrita, então nenhuma venda lançada no meio
+    se perde, e o balcão só espera pelo mês que está sendo gravado.
+    """
+    pa = _importar_pyarrow()
+    meses_abertos = meses_abertos or current_app.config['ARQUIVO_MESES_ABERTOS']
+    limite = _primeiro_mes_aberto(meses_abertos).isoformat()
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("""SELECT substr(data, 1, 7) AS mes FROM vendas WHERE data < ?
+                      UNION SELECT substr(data, 1, 7) FROM despesas WHERE data < ?
+                      ORDER BY mes""", (limite, limite))
+    meses = [row['mes'] for row in cursor.fetchall()]
+
+    arquivados = {}
+    for mes in meses:
+        inicio, fim = _limites_mes(mes)
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            totais = {}
+            for tabela in COLUNAS_ARQUIVO:
+                cursor.execute(SQL_LINHAS_MES[tabela], (inicio, fim))
+                totais[tabela] = _gravar_mes(pa, tabela, mes, cursor.fetchall())
+            # Os resumos NÃO são alterados: o histórico continua nos rollups
+            cursor.execute("""DELETE FROM venda_itens
+                              WHERE venda_id IN (SELECT id FROM vendas WHERE data >= ? AND data < ?)""", (inicio, fim))
+            cursor.execute("DELETE FROM vendas WHERE data >= ? AND data < ?", (inicio, fim))
+            cursor.execute("DELETE FROM despesas WHERE data >= ? AND data < ?", (inicio, fim))
+            cursor.execute("""INSERT INTO meses_arquivados (mes, vendas, venda_itens, despesas, arquivado_em)
+                              VALUES(?, ?, ?, ?, ?)
+                              ON CONFLICT(mes) DO UPDATE SET vendas = excluded.vendas,
+                                  venda_itens = excluded.venda_itens, despesas = excluded.despesas,
+                                  arquivado_em = excluded.arquivado_em""",
+                           (mes, totais['vendas'], totais['venda_itens'], totais['despesas'],
+                            datetime.now().isoformat(timespec='seconds')))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        arquivados[mes] = sum(totais.values())
+    return arquivados
+
+
+# --- Leitura ---
+def get_meses_arquivados(data_inicio=None, data_fim=None):
+    """Meses arquivados ('AAAA-MM') que cruzam o período (poda por partição).
+
+    Num banco ainda sem a migração do arquivo (versão < 8) não há meses arquivados.
+    """
+    cursor = get_db().cursor()
+    if not cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'meses_arquivados'").fetchone():
+        return []
+    cursor.execute("SELECT mes FROM meses_arquivados WHERE mes >= ? AND mes <= ? ORDER BY mes",
+                   (data_inicio.isoformat()[:7] if data_inicio else '0000-00',
+                    data_fim.isoformat()[:7] if data_fim else '9999-99'))
+    return [row['mes'] for row in cursor.fetchall()]
+
+
+def ler_arquivo_morto(tabela, data_inicio=None, data_fim=None, colunas=None):
+    """pyarrow.Table com as linhas arquivadas da tabela no período [data_inicio, data_fim].
+
+    Só os Parquet dos meses do período são abertos (memory map) e só as 'colunas'
+    pedidas são lidas. Retorna None se nenhum mês do período foi arquivado.
+    """
+    meses = get_meses_arquivados(data_inicio, data_fim)
+    if not meses:
+        return None
+    pa = _importar_pyarrow()
+    filtros = []
+    if data_inicio:
+        filtros.append(('data', '>=', data_inicio.isoformat()))
+    if data_fim:
+        filtros.append(('data', '<', (data_fim + timedelta(days=1)).isoformat()))
+    tabelas = [pa.parquet.read_table(_caminho_mes(tabela, mes), columns=colunas, memory_map=True,
+                                     filters=filtros or None)
+               for mes in meses if os.path.exists(_caminho_mes(tabela, mes))]
+    return pa.concat_tables(tabelas) if tabelas else None
+
+
+def gerar_linhas_exportacao_arquivadas(nome, data_inicio=None, data_fim=None):
+    """Linhas (tuplas) arquivadas de uma exportação, nas mesmas colunas do SQL de exportacao.py, mês a mês."""
+    meses = get_meses_arquivados(data_inicio, data_fim) if nome in ('vendas', 'despesas') else []
+    if not meses:
+        return
+    cursor = get_db().cursor()
+    cursor.execute("SELECT id, nome FROM produtos")
+    nomes_produtos = {row['id']: row['nome'] for row in cursor.fetchall()}
+    for mes in meses:
+        # Um mês por vez: a memória fica limitada ao tamanho de um mês
+        inicio, fim = _limites_mes(mes)
+        inicio_mes = max(date.fromisoformat(inicio), data_inicio) if data_inicio else date.fromisoformat(inicio)
+        fim_mes = date.fromisoformat(fim) - timedelta(days=1)
+        fim_mes = min(fim_mes, data_fim) if data_fim else fim_mes
+        # Um mês arquivado de novo pode, até o commit, ter a mesma linha nos dois lados: sai só a do banco
+        cursor.execute(f"SELECT id FROM {nome} WHERE data >= ? AND data < ?",
+                       (inicio_mes.isoformat(), (fim_mes + timedelta(days=1)).isoformat()))
+        ids_banco = {row['id'] for row in cursor.fetchall()}
+        if nome == 'despesas':
+            despesas = ler_arquivo_morto('despesas', inicio_mes, fim_mes)
+            if despesas is None:
+                continue
+            for despesa in despesas.to_pylist():
+                if despesa['id'] not in ids_banco:
+                    yield (despesa['id'], despesa['data'], despesa['descricao'], despesa['categoria'], despesa['valor'])
+            continue
+
+        vendas = ler_arquivo_morto('vendas', inicio_mes, fim_mes)
+        itens = ler_arquivo_morto('venda_itens', inicio_mes, fim_mes)
+        if vendas is None or itens is None:
+            continue
+        vendas_por_id = {venda['id']: venda for venda in vendas.to_pylist() if venda['id'] not in ids_banco}
+        for item in sorted(itens.to_pylist(), key=lambda i: (i['data'], i['venda_id'], i['id'])):
+            venda = vendas_por_id.get(item['venda_id'])
+            if venda is None:
+                continue
+            preco, custo, quantidade = item['preco_unitario_venda'], item['custo_unitario_producao'], item['quantidade']
+            yield (venda['id'], venda['data'], venda['metodo_pagamento'], venda['total_venda'],
+                   item['produto_id'], nomes_produtos.get(item['produto_id'], 'Produto Excluído'), quantidade,
+                   preco, custo, preco * quantidade, (preco - custo) * quantidade)
+
+
+# --- Listagem Paginada (Gerir Lançamentos) ---
+def _filtro_chave(pc, chave, menor):
+    """Expressão (data, id) < chave (ou > chave, com menor=False) para o 'filters' do read_table."""
+    data, item_id = pc.field('data'), pc.field('id')
+    if menor:
+        return (data < chave[0]) | ((data == chave[0]) & (item_id < chave[1]))
+    return (data > chave[0]) | ((data == chave[0]) & (item_id > chave[1]))
+
+
+def get_pagina_arquivada(tabela, limite, apos=None, data_inicio=None, data_fim=None, filtros=None, produto_id=None,
+                         acima_de=None):
+    """Até 'limite' linhas arquivadas de 'vendas' ou 'despesas' para a listagem paginada (mais recentes primeiro).
+
+    Mesmos critérios de dao._buscar_pagina: (data, id) < apos, período [data_inicio, data_fim],
+    filtros de igualdade ({coluna: valor}) e, com produto_id, só as vendas com um item do
+    produto. 'acima_de' ((data, id) da última linha da página do banco, quando ela já está
+    cheia) descarta o que não entraria na página: os meses mais antigos nem são abertos.
+    Os predicados vão para o read_table (filters), que pula os row groups fora deles, e só
+    as linhas que sobram viram dicionários. Os meses são lidos do mais recente para o mais
+    antigo e a leitura para quando a página enche.
+    """
+    meses = [mes for mes in get_meses_arquivados(data_inicio, data_fim)
+             if (not apos or mes <= apos[0][:7]) and (not acima_de or mes >= acima_de[0][:7])]
+    if not meses:
+        return []
+    pa = _importar_pyarrow()
+    pc = pa.compute
+    condicoes = [pc.field(coluna) == valor for coluna, valor in (filtros or {}).items()]
+    if data_inicio:
+        condicoes.append(pc.field('data') >= data_inicio.isoformat())
+    if data_fim:
+        condicoes.append(pc.field('data') < (data_fim + timedelta(days=1)).isoformat())  # Fim inclusivo
+    if apos:
+        condicoes.append(_filtro_chave(pc, apos, menor=True))
+    if acima_de:
+        condicoes.append(_filtro_chave(pc, acima_de, menor=False))
+    colunas = [coluna for coluna, _ in COLUNAS_ARQUIVO[tabela]]
+
+    tabelas, total = [], 0
+    for mes in reversed(meses):
+        if not os.path.exists(_caminho_mes(tabela, mes)):
+            continue
+        condicoes_mes = list(condicoes)
+        if produto_id:
+            caminho_itens = _caminho_mes('venda_itens', mes)
+            if not os.path.exists(caminho_itens):
+                continue
+            vendas_do_produto = pa.parquet.read_table(caminho_itens, columns=['venda_id'], memory_map=True,
+                                                      filters=pc.field('produto_id') == produto_id)['venda_id']
+            if len(vendas_do_produto) == 0:
+                continue
+            condicoes_mes.append(pc.field('id').isin(vendas_do_produto))
+        filtro = None
+        for condicao in condicoes_mes:
+            filtro = condicao if filtro is None else filtro & condicao
+        encontradas = pa.parquet.read_table(_caminho_mes(tabela, mes), columns=colunas, memory_map=True,
+                                            filters=filtro)
+        if encontradas.num_rows:
+            tabelas.append(encontradas)
+            total += encontradas.num_rows
+        if total >= limite:
+            break
+    if not tabelas:
+        return []
+    pagina = pa.concat_tables(tabelas).sort_by([('data', 'descending'), ('id', 'descending')]).slice(0, limite)
+    return [{**linha, 'arquivada': True} for linha in pagina.to_pylist()]
+
+
+def get_itens_vendas_arquivadas(vendas):
+    """Itens (com o nome do produto, como em dao.get_itens_para_vendas) das vendas arquivadas informadas."""
+    ids_por_mes = {}
+    for venda in vendas:
+        ids_por_mes.setdefault(venda['data'][:7], set()).add(venda['id'])
+    if not ids_por_mes:
+        return []
+    pa = _importar_pyarrow()
+    cursor = get_db().cursor()
+    cursor.execute("SELECT id, nome FROM produtos")
+    nomes_produtos = {row['id']: row['nome'] for row in cursor.fetchall()}
+    itens = []
+    colunas = [coluna for coluna, _ in COLUNAS_ARQUIVO['venda_itens'] if coluna != 'data']
+    for mes, venda_ids in ids_por_mes.items():
+        if not os.path.exists(_caminho_mes('venda_itens', mes)):
+            continue
+        lidos = pa.parquet.read_table(_caminho_mes('venda_itens', mes), columns=colunas, memory_map=True,
+                                      filters=pa.compute.field('venda_id').isin(sorted(venda_ids)))
+        for item in lidos.to_pylist():
+            item['nome'] = nomes_produtos.get(item['produto_id'])  # None: 'Produto Excluído' na tela
+            itens.append(item)
+    return itens
+
+
+@click.command("arquivar")
+@with_appcontext
+@click.option("--meses-abertos", type=click.IntRange(min=1), help="Meses mantidos no banco (o atual conta como um).")
+def arquivar_command(meses_abertos):
+    """Move as vendas e despesas dos meses fechados para o arquivo morto em Parquet."""
+    arquivados = arquivar_meses_fechados(meses_abertos)
+    for mes, linhas in arquivados.items():
+        print(f"  {mes}: {linhas} linhas")
+    print(f"{len(arquivados)} meses arquivados em {get_pasta_arquivo()}")
@@ -0,0 +1,212 @@
+"""
+Blueprint de BI: dashboard financeiro e sua API JSON.
+
+O dashboard e a API JSON usam as mesmas funções. As séries dos gráficos ficam num
+cache LRU em memória (por processo), com chave (banco, periodo, versão dos dados).
+Os gráficos são desenhados no navegador com o plotly.js local, servido por
+/vendor/plotly-*.js. A parte em pandas/plotly fica em analise.py, importado na
+primeira chamada (import dentro das funções) ou na subida, com PRECARREGAR_BI=1.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from importlib import metadata
+
+from flask import Blueprint, Response, current_app, jsonify, render_template, request
+
+from .db import get_geracao_banco
+from .resumos import (JANELAS_COMPARACAO, METRICAS_MIX, get_comparacao_periodos, get_evolucao_semanal,
+                      get_ranking_produtos, get_top_bottom_produtos, get_versao_dados)
+
+bp = Blueprint('bi', __name__)
+
+PLOTLY_VERSAO = metadata.version("plotly")  # Lido dos metadados, sem importar o plotly
+_cache_graficos = OrderedDict()
+_cache_graficos_lock = threading.Lock()
+_plotly_js = None
+
+# Janelas mostradas na tabela de comparação do dashboard (crescimento da média por dia)
+JANELAS_TENDENCIA = ('periodo_anterior', 'ano_anterior', 'ultimas_4_semanas', 'ultimas_12_semanas')
+
+
+def calcular_crescimento(atual, anterior):
+    """Helper para calcular o crescimento percentual com segurança"""
+    if anterior is None or anterior == 0:
+        return None
+    try:
+        return (atual - anterior) / abs(anterior)
+    except TypeError:
+        return None
+
+
+# --- Dados do Dashboard (KPIs e Séries) ---
+def _get_periodo_filtro():
+    """Lê start_date/end_date da query string. Padrão: últimos 90 dias. Retorna (inicio, fim) como date."""
+    data_inicio_str = request.args.get('start_date')
+    data_fim_str = request.args.get('end_date')
+
+    # Define datas padrao(ultimos 90 dias) se nenhum filtro for aplicado
+    if not data_fim_str:
+        data_fim = datetime.now()
+    else:
+        data_fim = datetime.strptime(data_fim_str, '%Y-%m-%d')
+    if not data_inicio_str:
+        data_inicio = data_fim - timedelta(days=90)
+    else:
+        data_inicio = datetime.strptime(data_inicio_str, '%Y-%m-%d')
+
+    # Converte para date para comparações seguras
+    return data_inicio.date(), data_fim.date()
+
+
+def calcular_kpis_dashboard(data_inicio, data_fim):
+    """KPIs do periodo, crescimento do lucro vs semana e mês anteriores e as comparações de tendência.
+
+    Todas as janelas saem de uma única leitura do resumo diário (get_comparacao_periodos).
+    Nas comparações de tendência o crescimento é da média por dia, então janelas de
+    tamanhos diferentes do periodo (ex: últimas 4 semanas) também são comparáveis.
+    """
+    comparacao = get_comparacao_periodos(data_inicio, data_fim)
+    atual, janelas = comparacao['atual'], comparacao['janelas']
+    kpis_atual = atual['kpis']
+    dias_atual = max(atual['dias'], 1)  # Filtro com fim antes do inicio: periodo vazio
+
+    comparacoes = []
+    for nome in JANELAS_TENDENCIA:
+        janela = janelas[nome]
+        comparacoes.append({
+            'nome': nome,
+            'descricao': JANELAS_COMPARACAO[nome][0],
+            **janela,
+            'cresc_vendido': calcular_crescimento(kpis_atual['total_vendido'] / dias_atual,
+                                                  janela['kpis']['total_vendido'] / max(janela['dias'], 1)),
+            'cresc_lucro': calcular_crescimento(kpis_atual['lucro_liquido'] / dias_atual,
+                                                janela['kpis']['lucro_liquido'] / max(janela['dias'], 1)),
+        })
+
+    return {
+        'kpis': kpis_atual,
+        # Semana (7 dias) e mês (30 dias) antes do inicio do filtro, comparados pelo total
+        'cresc_semana': calcular_crescimento(kpis_atual['lucro_liquido'],
+                                             janelas['semana_anterior']['kpis']['lucro_liquido']),
+        'cresc_mes': calcular_crescimento(kpis_atual['lucro_liquido'],
+                                          janelas['mes_anterior']['kpis']['lucro_liquido']),
+        'comparacoes': comparacoes,
+        # Somas móveis de 4 e 12 semanas em cada dia do periodo (gráfico de tendência)
+        'moveis': {f"{dias // 7}_semanas": serie for dias, serie in comparacao['moveis'].items()},
+    }
+
+
+def calcular_series_dashboard(data_inicio, data_fim):
+    """Séries dos gráficos em formato colunar (listas), prontas para virar JSON."""
+    from . import analise
+    # Grafico 1 & 2: Evolução Semanal (lida dos resumos)
+    evolucao_df = get_evolucao_semanal(data_inicio, data_fim)
+    return {
+        'semanas': analise.montar_series_semanais(evolucao_df),
+        # Grafico 3, 4, 5 : Top Bottom (lido do resumo por produto, sem carregar os itens de venda)
+        'top_bottom': get_top_bottom_produtos(data_inicio, data_fim),
+    }
+
+
+def get_series_dashboard(data_inicio, data_fim):
+    """Retorna as séries do periodo a partir do cache, calculando-as só quando necessário."""
+    # O banco e a geração entram na chave porque um reset recomeça a versão do zero
+    chave = (current_app.config['DATABASE'], get_geracao_banco(), data_inicio, data_fim, get_versao_dados())
+    with _cache_graficos_lock:
+        if chave in _cache_graficos:
+            _cache_graficos.move_to_end(chave)
+            return _cache_graficos[chave]
+
+    series = calcular_series_dashboard(data_inicio, data_fim)
+
+    with _cache_graficos_lock:
+        _cache_graficos[chave] = series
+        _cache_graficos.move_to_end(chave)
+        while len(_cache_graficos) > current_app.config['CACHE_GRAFICOS_MAX']:
+            _cache_graficos.popitem(last=False)  # Remove o usado há mais tempo
+    return series
+
+
+def _resposta_json_condicional(nome, gerar_dados):
+    """Responde JSON com ETag (versão dos dados + periodo); devolve 304 se o cliente já tem a versão atual."""
+    try:
+        data_inicio, data_fim = _get_periodo_filtro()
+    except ValueError:
+        return jsonify({'erro': 'Datas inválidas. Use o formato AAAA-MM-DD.'}), 400
+
+    etag = f"{nome}-{get_versao_dados()}-{data_inicio.isoformat()}-{data_fim.isoformat()}"
+    if request.if_none_match.contains(etag):
+        resposta = Response(status=304)
+    else:
+        dados = gerar_dados(data_inicio, data_fim)
+        resposta = jsonify({
+            'periodo': {'inicio': data_inicio.isoformat(), 'fim': data_fim.isoformat()},
+            **dados,
+        })
+    resposta.set_etag(etag)
+    resposta.headers['Cache-Control'] = 'no-cache'  # Sempre revalida (barato: só compara a versão)
+    return resposta
+
+
+@bp.route("/api/financeiro/kpis")
+def api_financeiro_kpis():
+    return _resposta_json_condicional('kpis', calcular_kpis_dashboard)
+
+
+@bp.route("/api/financeiro/series")
+def api_financeiro_series():
+    return _resposta_json_condicional('series', get_series_dashboard)
+
+
+@bp.route("/api/financeiro/ranking")
+def api_financeiro_ranking():
+    """Ranking de produtos no periodo. Query: metrica (total_vendido, total_lucro_bruto ou
+    total_quantidade), n (padrão 10) e ordem (maiores ou menores)."""
+    metrica = request.args.get('metrica', 'total_vendido')
+    n = request.args.get('n', 10, type=int)
+    maiores = request.args.get('ordem', 'maiores') != 'menores'
+    if metrica not in METRICAS_MIX or n is None or n < 1:
+        return jsonify({'erro': f"Use metrica em ({', '.join(METRICAS_MIX)}) e n >= 1."}), 400
+    return _resposta_json_condicional(
+        f"ranking-{metrica}-{n}-{'maiores' if maiores else 'menores'}",
+        lambda inicio, fim: {'metrica': metrica,
+                             'produtos': get_ranking_produtos(inicio, fim, metrica, n, maiores)})
+
+
+@bp.route("/vendor/plotly-<versao>.min.js")
+def plotly_js(versao):
+    """Serve o plotly.js que vem junto com o pacote Python (funciona sem internet)."""
+    global _plotly_js
+    if _plotly_js is None:
+        from . import analise
+        _plotly_js = analise.get_plotly_js()
+    resposta = Response(_plotly_js, mimetype='application/javascript')
+    # A versão está na URL, então o navegador pode guardar o arquivo por tempo indeterminado
+    resposta.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resposta
+
+
+@bp.route("/financeiro/dashboard")
+def dashboard_financeiro():
+    # 1. Obter e Tratar Datas do Filtro
+    data_inicio_filtro, data_fim_filtro = _get_periodo_filtro()
+
+    # 2. KPIs e Crescimento % (os gráficos são buscados pelo navegador em /api/financeiro/series)
+    dados_kpis = calcular_kpis_dashboard(data_inicio_filtro, data_fim_filtro)
+
+    # 3. Enviar tudo para o Template
+    return render_template('dashboard.html',
+                           # KPIs
+                           kpis=dados_kpis['kpis'],
+                           cresc_semana=dados_kpis['cresc_semana'],
+                           cresc_mes=dados_kpis['cresc_mes'],
+                           # Comparações (periodo anterior, ano anterior, últimas semanas) e somas móveis
+                           comparacoes=dados_kpis['comparacoes'],
+                           moveis=dados_kpis['moveis'],
+                           # plotly.js local (carregado uma única vez pelo template)
+                           plotly_versao=PLOTLY_VERSAO,
+                           # Filtros (para preencher os campos de data)
+                           data_inicio=data_inicio_filtro.strftime('%Y-%m-%d'),
+                           data_fim=data_fim_filtro.strftime('%Y-%m-%d')
+                           )
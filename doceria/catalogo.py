@@ -0,0 +1,203 @@
+"""
+Blueprint do catálogo: ingredientes e custos adicionais.
+"""
+from flask import Blueprint, flash, redirect, render_template, request, url_for
+
+from .dao import (add_custo_adicional, add_ingrediente, add_ingrediente_receita, delete_custo_adicional,
+                  delete_ingrediente_db, get_custo_adicional_by_id, get_custos_adicionais, get_ingrediente,
+                  get_ingrediente_by_id, get_todos_ingredientes, is_ingrediente_em_uso, update_custo_adicional)
+from .importacao import atualizar_precos_ingredientes, ler_linhas_planilha
+from .tarefas import enfileirar_tarefa, get_tarefa
+
+bp = Blueprint('catalogo', __name__)
+
+
+@bp.route("/novo_ingrediente", methods=["GET", "POST"])
+def novo_ingrediente():
+    if request.method == "POST":
+        nome = request.form["nome"].lower().strip()
+        try:
+            preco = float(request.form["preco_embalagem"])
+            quantidade_embalagem = float(request.form["quant_embalagem"])
+            densidade = float(request.form.get("densidade", 1.0))
+        except (ValueError, KeyError):
+            flash("Preço, quantidade e densidade devem ser números.", "error")
+            return render_template("novo_ingrediente.html", **request.form)
+
+        existente = get_ingrediente(nome)
+        if existente:
+            flash(f"Ingrediente '{nome}' já existe.", "error")
+        else:
+            add_ingrediente(nome, preco, quantidade_embalagem, densidade)
+            flash(f"Ingrediente '{nome}' cadastrado com sucesso!", "success")
+
+        receita_id = request.form.get("receita_id")
+        if receita_id and receita_id.isdigit():
+            quantidade_original = request.form.get("quantidade_original")
+            unidade_original = request.form.get("unidade_original")
+            ingrediente = get_ingrediente(nome)
+            if ingrediente:
+                add_ingrediente_receita(int(receita_id), ingrediente['id'], float(quantidade_original),
+                                        unidade_original)
+                flash(f"Ingrediente '{nome}' adicionado à receita!", "success")
+            return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita_id))
+
+        return redirect(url_for("catalogo.gerir_ingredientes"))
+
+    return render_template("novo_ingrediente.html",
+                           nome=request.args.get("nome", ""),
+                           receita_id=request.args.get("receita_id"),
+                           quantidade_original=request.args.get("quantidade_original"),
+                           unidade_original=request.args.get("unidade_original"))
+
+
+# --- Rotas de Gestão de Ingredientes ---
+@bp.route("/ingredientes")
+def gerir_ingredientes():
+    todos_ingredientes = get_todos_ingredientes()
+    return render_template('gerir_ingredientes.html', ingredientes=todos_ingredientes)
+
+
+@bp.route("/ingredientes/atualizar_precos", methods=["GET", "POST"])
+def atualizar_precos_view():
+    if request.method == "POST":
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash("Selecione um arquivo CSV ou XLSX.", "error")
+            return redirect(url_for('catalogo.atualizar_precos_view'))
+        try:
+            linhas = list(ler_linhas_planilha(arquivo.filename, arquivo.read()))
+            if request.form.get('acao') == 'aplicar':
+                # A gravação e o recálculo de todos os custos rodam em segundo plano
+                tarefa_id = enfileirar_tarefa('atualizar_precos', {'linhas': linhas})
+                return redirect(url_for('catalogo.atualizar_precos_view', tarefa=tarefa_id))
+            relatorio = atualizar_precos_ingredientes(linhas, simular=True)
+        except Exception as e:
+            flash(f"Erro ao ler a tabela de preços: {e}", "error")
+            return redirect(url_for('catalogo.atualizar_precos_view'))
+
+        if relatorio['rejeitadas']:
+            flash(f"{len(relatorio['rejeitadas'])} linhas rejeitadas (veja o relatório).", "error")
+        return render_template('atualizar_precos.html', relatorio=relatorio, tarefa=None)
+
+    # ?tarefa=<id>: acompanha a aplicação enviada para a fila e mostra o relatório quando terminar
+    tarefa = get_tarefa(request.args['tarefa']) if request.args.get('tarefa', '').isdigit() else None
+    relatorio = None
+    if tarefa and tarefa['status'] == 'concluida':
+        relatorio = tarefa['resultado']
+        if relatorio['aplicado']:
+            flash(f"{len(relatorio['ingredientes'])} ingredientes atualizados com sucesso!", "success")
+        if relatorio['rejeitadas']:
+            flash(f"{len(relatorio['rejeitadas'])} linhas rejeitadas (veja o relatório).", "error")
+    elif tarefa and tarefa['status'] == 'erro':
+        flash(f"Erro ao aplicar a tabela de preços: {tarefa['mensagem']}", "error")
+    return render_template('atualizar_precos.html', relatorio=relatorio, tarefa=tarefa)
+
+
+@bp.route("/excluir_ingrediente_db/<int:ingrediente_id>", methods=["POST"])
+def excluir_ingrediente_db(ingrediente_id):
+    ingrediente = get_ingrediente_by_id(ingrediente_id)
+    if not ingrediente:
+        flash("Ingrediente não encontrado!", "error")
+        return redirect(url_for('catalogo.gerir_ingredientes'))
+    if is_ingrediente_em_uso(ingrediente_id):
+        flash(f"O ingrediente '{ingrediente['nome']}' não pode ser excluído porque está a ser utilizado.", "error")
+        return redirect(url_for('catalogo.gerir_ingredientes'))
+    delete_ingrediente_db(ingrediente_id)
+    flash(f"Ingrediente '{ingrediente['nome']}' excluído com sucesso!", "success")
+    return redirect(url_for('catalogo.gerir_ingredientes'))
+
+
+# --- Rotas de Custos Adicionais ---
+@bp.route("/custos_adicionais")
+def custos_adicionais():
+    custos = get_custos_adicionais()
+    return render_template("custos_adicionais.html", custos=custos)
+
+
+@bp.route("/novo_custo_adicional", methods=["GET", "POST"])
+def novo_custo_adicional():
+    if request.method == "POST":
+        try:
+            # 1. Obter dados do formulário
+            nome = request.form['nome'].strip()
+            tipo = request.form['tipo']
+            custo_unitario = float(request.form['custo_unitario'])
+
+            # Usar .get() para campos que podem estar vazios
+            unidade_medida = request.form.get('unidade_medida')
+
+            # Usar .get() com um valor padrão para números
+            vida_util_str = request.form.get('vida_util')
+            vida_util = int(vida_util_str) if vida_util_str and vida_util_str.isdigit() else None
+
+            descricao = request.form.get('descricao')
+
+            if not nome or not tipo or custo_unitario is None:
+                flash("Nome, Tipo e Custo Unitário são obrigatórios.", "error")
+                return render_template("novo_custo_adicional.html", **request.form)
+
+            # 2. Chamar sua função do "Passo 4" para salvar no DB
+            add_custo_adicional(nome, tipo, custo_unitario, unidade_medida, vida_util, descricao)
+
+            flash(f"Custo '{nome}' adicionado com sucesso!", "success")
+            return redirect(url_for('catalogo.custos_adicionais'))  # Redirecionar de volta para a lista
+
+        except Exception as e:
+            flash(f"Erro ao adicionar custo: {e}", "error")
+            # Re-renderiza o formulário mantendo os dados que o usuário digitou
+            return render_template("novo_custo_adicional.html", **request.form)
+
+    # Se for GET, apenas mostre a página
+    return render_template("novo_custo_adicional.html")
+
+
+@bp.route("/editar_custo_adicional/<int:custo_id>", methods=["GET", "POST"])
+def editar_custo_adicional(custo_id):
+    # Busca o custo no DB
+    custo = get_custo_adicional_by_id(custo_id)
+    if not custo:
+        flash("Custo adicional não encontrado!", "error")
+        return redirect(url_for('catalogo.custos_adicionais'))
+
+    if request.method == "POST":
+        try:
+            # 1. Coletar dados do formulário
+            nome = request.form['nome'].strip()
+            tipo = request.form['tipo']
+            custo_unitario = float(request.form['custo_unitario'])
+            unidade_medida = request.form.get('unidade_medida')
+            vida_util_str = request.form.get('vida_util')
+            vida_util = int(vida_util_str) if vida_util_str and vida_util_str.isdigit() else None
+            descricao = request.form.get('descricao')
+
+            if not nome or not tipo or custo_unitario is None:
+                flash("Nome, Tipo e Custo Unitário são obrigatórios.", "error")
+                # Passa o 'custo' original de volta para o template em caso de erro
+                return render_template("editar_custo_adicional.html", custo=custo)
+
+            # 2. Chamar a função de atualização do DB
+            update_custo_adicional(custo_id, nome, tipo, custo_unitario, unidade_medida, vida_util, descricao)
+            enfileirar_tarefa('recalcular_custos', unica=True)  # Deixa o cache pronto para as próximas telas
+
+            flash(f"Custo '{nome}' atualizado com sucesso!", "success")
+            return redirect(url_for('catalogo.custos_adicionais'))
+
+        except Exception as e:
+            flash(f"Erro ao atualizar custo: {e}", "error")
+            return render_template("editar_custo_adicional.html", custo=custo)
+
+    # Se for GET, apenas mostra a página de edição com os dados do custo
+    return render_template("editar_custo_adicional.html", custo=custo)
+
+
+@bp.route("/excluir_custo_adicional/<int:custo_id>", methods=["POST"])
+def excluir_custo_adicional(custo_id):
+    # (Opcional: Adicionar verificação se o custo está em uso em alguma receita)
+    custo = get_custo_adicional_by_id(custo_id)
+    if custo:
+        delete_custo_adicional(custo_id)
+        flash(f"Custo '{custo['nome']}' excluído com sucesso!", "success")
+    else:
+        flash("Custo não encontrado!", "error")
+    return redirect(url_for('catalogo.custos_adicionais'))
@@ -0,0 +1,51 @@
+"""
+Configuração padrão do app, lida das variáveis de ambiente.
+
+create_app(config) aceita um dict (ou objeto) que sobrescreve qualquer chave, ex:
+create_app({'DATABASE': '/tmp/teste.db'}) para rodar benchmarks num banco isolado.
+"""
+import os
+import tempfile
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Config:
+    SECRET_KEY = os.environ.get("SECRET_KEY", "uma-chave-secreta-padrao-para-desenvolvimento")
+    ADMIN_PASSWORD = "@Vinicius13"
+    # Caminho absoluto: o banco é o mesmo qualquer que seja a pasta de onde o servidor foi iniciado
+    DATABASE = os.environ.get("DATABASE", os.path.join(PASTA_PROJETO, "doceria.db"))
+
+    # Ajustes do SQLite
+    DB_JOURNAL_MODE = os.environ.get("DB_JOURNAL_MODE", "WAL")  # WAL: leitores não bloqueiam a escrita do balcão
+    DB_SYNCHRONOUS = os.environ.get("DB_SYNCHRONOUS", "NORMAL")  # Seguro com WAL e bem mais rápido que FULL
+    DB_CACHE_SIZE_KB = int(os.environ.get("DB_CACHE_SIZE_KB", 16384))  # Cache de páginas por conexão
+    DB_MMAP_SIZE = int(os.environ.get("DB_MMAP_SIZE", 64 * 1024 * 1024))  # Leitura via mmap (0 desliga)
+    DB_CACHED_STATEMENTS = int(os.environ.get("DB_CACHED_STATEMENTS", 512))  # Cache de queries preparadas
+    DB_REUTILIZAR_CONEXOES = os.environ.get("DB_REUTILIZAR_CONEXOES", "1") == "1"  # Uma conexão por thread
+
+    # Caches em memória (por processo/worker)
+    CACHE_GRAFICOS_MAX = int(os.environ.get("CACHE_GRAFICOS_MAX", 32))  # Periodos do dashboard guardados
+    PRECARREGAR_BI = os.environ.get("PRECARREGAR_BI", "0") == "1"  # Importa pandas/plotly já na subida
+
+    # Tarefas em segundo plano (ver tarefas.py)
+    TAREFAS_WORKERS = int(os.environ.get("TAREFAS_WORKERS", 1))  # 0 = executa no próprio request
+    # Tarefa 'executando' sem sinal de vida há mais que isso volta para a fila (quando o processo
+    # dono está em outra máquina; na mesma máquina basta ele ter morrido)
+    TAREFAS_TIMEOUT_MIN = int(os.environ.get("TAREFAS_TIMEOUT_MIN", 5))
+    PASTA_ARQUIVOS_TAREFAS = os.environ.get("PASTA_ARQUIVOS_TAREFAS",
+                                            os.path.join(tempfile.gettempdir(), "doceria_tarefas"))
+    TAREFAS_ARQUIVOS_HORAS = int(os.environ.get("TAREFAS_ARQUIVOS_HORAS", 24))  # Depois disso o arquivo é apagado
+
+    TAMANHO_LOTE_EXPORTACAO = int(os.environ.get("TAMANHO_LOTE_EXPORTACAO", 2000))  # Linhas por fetchmany
+
+    # Previsão de vendas e lista de compras (ver previsao.py)
+    PREVISAO_SEMANAS = int(os.environ.get("PREVISAO_SEMANAS", 26))  # Semanas de histórico usadas no ajuste
+
+    # Arquivo morto em Parquet (ver arquivamento.py)
+    PASTA_ARQUIVO = os.environ.get("PASTA_ARQUIVO")  # Padrão: '<banco>_arquivo' ao lado do banco
+    ARQUIVO_MESES_ABERTOS = int(os.environ.get("ARQUIVO_MESES_ABERTOS", 6))  # Meses que ficam no SQLite
+
+    # Instrumentação (ver instrumentacao.py)
+    INSTRUMENTACAO = os.environ.get("INSTRUMENTACAO", "0") == "1"
+    METRICAS_MAX_SQL = int(os.environ.get("METRICAS_MAX_SQL", 20))  # Comandos SQL listados em /metrics
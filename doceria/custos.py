@@ -0,0 +1,536 @@
+"""
+Regras de custo: conversão de unidades, cálculo escalar (referência), cálculo em
+lote com NumPy, cache materializado de custos e simulação de cenários (what-if).
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+from flask import g
+
+from .dao import get_custos_adicionais_receita, get_ingredientes_receita, get_produtos, get_receitas
+from .db import TAMANHO_BLOCO_IDS, blocos_de_ids, get_db
+
+
+# --- Funções de Lógica de Negócio ---
+# Tabela de conversão montada uma única vez (usada pelo cálculo escalar e pelo vetorizado)
+FATORES_CONVERSAO = {
+    'g': 1.0, 'kg': 1000.0, 'ml': 1.0, 'l': 1000.0,
+    'colher': 15.0, 'xícara': 240.0, 'unidade': 50.0, 'pitada': 0.5,
+}
+UNIDADES_DE_VOLUME = frozenset(['ml', 'l', 'colher', 'xícara'])
+
+
+def converter_para_gramas(quantidade, unidade, densidade=1.0):
+    fator = FATORES_CONVERSAO.get(unidade, 1.0)
+    if unidade in UNIDADES_DE_VOLUME:
+        return quantidade * fator * (densidade or 1.0)
+    return quantidade * fator
+
+
+def calcular_custo_ingrediente(preco_embalagem, quant_embalagem, qtd_convertida_gramas):
+    if quant_embalagem > 0:
+        return (preco_embalagem / quant_embalagem) * qtd_convertida_gramas
+    return 0
+
+
+def calcular_custo_adicional_total(receita_id):
+    total = 0
+    custos_na_receita = get_custos_adicionais_receita(receita_id)
+    for custo in custos_na_receita:
+        custo_unitario = custo['custo_unitario']
+        vida_util = custo['vida_util']
+        if vida_util and vida_util > 0:
+            total += (custo_unitario / vida_util) * custo['quantidade_utilizada']
+        else:
+            total += custo_unitario * custo['quantidade_utilizada']
+    return total
+
+
+def calcular_custo_total_receita(receita_id):
+    ingredientes = get_ingredientes_receita(receita_id)
+    custo_ingredientes = 0
+    for ingr in ingredientes:
+        qtd_gramas = converter_para_gramas(ingr['quantidade'], ingr['unidade'], ingr['densidade'])
+        custo_ingredientes += calcular_custo_ingrediente(ingr['preco_embalagem'], ingr['quant_embalagem'], qtd_gramas)
+    custo_adicionais = calcular_custo_adicional_total(receita_id)
+    return custo_ingredientes + custo_adicionais
+
+
+def calcular_custo_produto(produto_id):
+    db = get_db()
+    cursor = db.cursor()
+
+    # 1. Modificamos a query para buscar também o 'rendimento' da receita
+    cursor.execute("""
+        SELECT pc.fracao_receita, r.id as receita_id, r.rendimento
+        FROM produto_composicao pc
+        JOIN receitas r ON pc.receita_id = r.id
+        WHERE pc.produto_id = ?
+    """, (produto_id,))
+
+    composicao = cursor.fetchall()
+    custo_total_produto = 0
+
+    for item in composicao:
+        # 2. Get cost of the ENTIRE batch (e.g., R$ 100)
+        custo_total_da_receita = calcular_custo_total_receita(item['receita_id'])
+
+        # 3. Get the yield of the batch (e.g., 30 units)
+        rendimento_receita = item['rendimento']
+
+        # 4. (Segurança) Evita divisão por zero se o rendimento for 0 ou Nulo
+        if not rendimento_receita or rendimento_receita <= 0:
+            rendimento_receita = 1
+
+            # 5. ESTA É A MUDANÇA: Calcula o custo POR UNIDADE
+        # (e.g., R$ 100 / 30 units = R$ 3.33 per unit)
+        custo_unitario_da_receita = custo_total_da_receita / rendimento_receita
+
+        # 6. Get the quantity of units used in this product (e.g., 1 unit)
+        # (Assumindo que 'fracao_receita' é usado como 'quantidade')
+        quantidade_utilizada = item['fracao_receita']
+
+        # 7. Add to total cost (e.g., R$ 3.33 * 1 unit)
+        custo_total_produto += custo_unitario_da_receita * quantidade_utilizada
+
+    return custo_total_produto
+
+
+# --- Cálculo de Custos em Lote (vetorizado com NumPy) ---
+# As funções acima calculam UM id por vez (1 + 2xN queries por produto) e são a
+# REFERÊNCIA das regras de custo. As funções abaixo calculam o catálogo inteiro:
+# carregam todas as linhas de receita_ingredientes em arrays, convertem as unidades
+# pela tabela FATORES_CONVERSAO e somam por receita de uma vez (np.bincount).
+# As operações são feitas na mesma ordem das funções escalares, então o resultado é
+# idêntico bit a bit (confira com: python benchmarks/bench_custos.py).
+def _fatores_das_unidades(unidades):
+    """Retorna (fator, é_volume) em arrays, consultando a tabela uma vez por unidade distinta."""
+    codigo_por_unidade = {}
+    codigos = np.array([codigo_por_unidade.setdefault(u, len(codigo_por_unidade)) for u in unidades],
+                       dtype=np.intp)
+    fatores = np.array([FATORES_CONVERSAO.get(u, 1.0) for u in codigo_por_unidade])
+    volume = np.array([u in UNIDADES_DE_VOLUME for u in codigo_por_unidade], dtype=bool)
+    return fatores[codigos], volume[codigos]
+
+
+def _converter_para_gramas_vetorizado(quantidade, unidades, densidade):
+    """converter_para_gramas para arrays: a densidade só vale para volume ('densidade or 1.0')."""
+    fator, eh_volume = _fatores_das_unidades(unidades)
+    densidade_efetiva = np.where(eh_volume & ~np.isnan(densidade) & (densidade != 0), densidade, 1.0)
+    return quantidade * fator * densidade_efetiva
+
+
+def _custo_adicional_vetorizado(custo_unitario, vida_util, quantidade_utilizada):
+    """Regra de calcular_custo_adicional_total, linha a linha: rateia pela vida útil quando houver."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(vida_util > 0, (custo_unitario / vida_util) * quantidade_utilizada,
+                        custo_unitario * quantidade_utilizada)
+
+
+def _somar_por_receita(ids_linhas, valores, ids_receitas):
+    """Soma 'valores' por receita, na ordem das linhas (igual ao '+=' do cálculo escalar)."""
+    posicoes = np.searchsorted(ids_receitas, ids_linhas)
+    posicoes = np.minimum(posicoes, max(len(ids_receitas) - 1, 0))
+    existe = ids_receitas[posicoes] == ids_linhas if len(ids_receitas) else np.zeros(len(ids_linhas), bool)
+    return np.bincount(posicoes[existe], weights=valores[existe], minlength=len(ids_receitas))
+
+
+def calcular_custos_receitas(receita_ids=None, precos=None):
+    """Retorna {receita_id: custo_do_lote} para TODAS as receitas.
+
+    Se 'receita_ids' for informado, calcula apenas essas receitas (em blocos de
+    TAMANHO_BLOCO_IDS ids: o custo de cada receita não depende das outras).
+    'precos' ({ingrediente_id: (preco_embalagem, quant_embalagem)}) substitui os preços
+    do banco no cálculo, sem gravar nada (pré-visualização de uma tabela de preços).
+    """
+    if receita_ids is not None:
+        receita_ids = sorted(set(receita_ids))
+        if len(receita_ids) > TAMANHO_BLOCO_IDS:
+            custos = {}
+            for bloco in blocos_de_ids(receita_ids):
+                custos.update(calcular_custos_receitas(bloco, precos))
+            return custos
+    db = get_db()
+    cursor = db.cursor()
+    cursor.row_factory = None  # Tuplas simples: mais rápidas de transpor em colunas
+
+    # Filtro opcional por id (mesma técnica de placeholders de get_itens_para_vendas)
+    filtro_receitas, filtro_ri, filtro_rca, params = '', '', '', ()
+    if receita_ids is not None:
+        placeholders = ','.join('?' for _ in receita_ids)
+        filtro_receitas = f"WHERE id IN ({placeholders})"
+        filtro_ri = f"WHERE ri.receita_id IN ({placeholders})"
+        filtro_rca = f"WHERE rca.receita_id IN ({placeholders})"
+        params = tuple(receita_ids)
+
+    # 1. Todas as receitas começam com custo 0 (receitas sem ingredientes/custos)
+    cursor.execute(f"SELECT id FROM receitas {filtro_receitas} ORDER BY id", params)
+    ids_receitas = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+
+    # 2. Ingredientes de todas as receitas em UMA query, na ordem do cálculo escalar
+    cursor.execute(f'''
+        SELECT ri.receita_id, ri.quantidade, ri.unidade, i.densidade,
+               i.preco_embalagem, i.quant_embalagem, i.id
+        FROM receita_ingredientes ri
+        JOIN ingredientes i ON ri.ingrediente_id = i.id
+        {filtro_ri}
+        ORDER BY ri.receita_id, ri.id
+    ''', params)
+    linhas = cursor.fetchall()
+    receita, quantidade, unidade, densidade, preco, quant_embalagem, ingrediente = (
+        zip(*linhas) if linhas else ((),) * 7)
+    if precos:
+        preco = [precos[i][0] if i in precos else p for i, p in zip(ingrediente, preco)]
+        quant_embalagem = [precos[i][1] if i in precos else q for i, q in zip(ingrediente, quant_embalagem)]
+    receita = np.array(receita, dtype=np.int64)
+    quantidade = np.array(quantidade, dtype=float)
+    densidade = np.array(densidade, dtype=float)  # NULL vira NaN
+    preco = np.array(preco, dtype=float)
+    quant_embalagem = np.array(quant_embalagem, dtype=float)
+
+    qtd_gramas = _converter_para_gramas_vetorizado(quantidade, unidade, densidade)
+    # calcular_custo_ingrediente: embalagem sem quantidade custa 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        custo_itens = np.where(quant_embalagem > 0, (preco / quant_embalagem) * qtd_gramas, 0.0)
+    custo_ingredientes = _somar_por_receita(receita, custo_itens, ids_receitas)
+
+    # 3. Custos adicionais linha a linha
+    cursor.execute(f'''
+        SELECT rca.receita_id, ca.custo_unitario, ca.vida_util, rca.quantidade_utilizada
+        FROM receita_custos_adicionais rca
+        JOIN custos_adicionais ca ON rca.custo_adicional_id = ca.id
+        {filtro_rca}
+        ORDER BY rca.receita_id, rca.id
+    ''', params)
+    linhas = cursor.fetchall()
+    receita, custo_unitario, vida_util, quantidade_utilizada = zip(*linhas) if linhas else ((),) * 4
+    receita = np.array(receita, dtype=np.int64)
+    custo_unitario = np.array(custo_unitario, dtype=float)
+    vida_util = np.array(vida_util, dtype=float)
+    quantidade_utilizada = np.array(quantidade_utilizada, dtype=float)
+    custo_adicionais = _somar_por_receita(
+        receita, _custo_adicional_vetorizado(custo_unitario, vida_util, quantidade_utilizada), ids_receitas)
+
+    return dict(zip(ids_receitas.tolist(), (custo_ingredientes + custo_adicionais).tolist()))
+
+
+def calcular_custos_unitarios_receitas(custos_receitas=None):
+    """Retorna {receita_id: custo_por_unidade} (custo do lote / rendimento)."""
+    if custos_receitas is None:
+        custos_receitas = calcular_custos_receitas()
+    cursor = get_db().cursor()
+    cursor.execute("SELECT id, rendimento FROM receitas")
+    custos_unitarios = {}
+    for row in cursor.fetchall():
+        rendimento = row['rendimento']
+        # Mesma proteção contra divisão por zero de calcular_custo_produto
+        if not rendimento or rendimento <= 0:
+            rendimento = 1
+        custos_unitarios[row['id']] = custos_receitas.get(row['id'], 0) / rendimento
+    return custos_unitarios
+
+
+def calcular_custos_produtos(custos_receitas=None):
+    """Retorna {produto_id: custo_unitario} para TODOS os produtos.
+
+    Aceita um dicionário de custos de receitas já calculado para reaproveitá-lo.
+    """
+    custos_unitarios_receitas = calcular_custos_unitarios_receitas(custos_receitas)
+    cursor = get_db().cursor()
+
+    cursor.execute("SELECT id FROM produtos")
+    custos = {row['id']: 0 for row in cursor.fetchall()}
+
+    cursor.execute("SELECT produto_id, receita_id, fracao_receita FROM produto_composicao")
+    for item in cursor.fetchall():
+        custo_unitario_receita = custos_unitarios_receitas.get(item['receita_id'])
+        if custo_unitario_receita is None:
+            continue  # Receita inexistente (o JOIN de calcular_custo_produto também a ignora)
+        custos[item['produto_id']] = custos.get(item['produto_id'], 0) + custo_unitario_receita * item['fracao_receita']
+    return custos
+
+
+# --- Cache Materializado de Custos ---
+# Recalcula só o que os 'invalidar_*' (dao.py) marcaram como sujo. Os triggers da
+# migração 9 contam as escritas que deixam o cache incompleto (versao_dados,
+# domínio 'custos_sujos'): com o contador em 0 a leitura é uma linha, sem transação.
+def _get_custos_sujos(cursor):
+    """Valor do contador de custos sujos (None num banco sem a migração 9: trata como sujo)."""
+    try:
+        row = cursor.execute("SELECT versao FROM versao_dados WHERE dominio = 'custos_sujos'").fetchone()
+    except sqlite3.OperationalError:
+        return None  # Sem a tabela versao_dados (versão < 6)
+    return row[0] if row else None
+
+
+def atualizar_cache_custos():
+    """Recalcula (em lote) somente as entradas sujas/ausentes do cache de custos.
+
+    Sem nada sujo não abre transação nem faz commit (a escrita pendente de quem
+    chamou, se houver, continua aberta).
+    """
+    db = get_db()
+    cursor = db.cursor()
+    if _get_custos_sujos(cursor) == 0:
+        return
+    if not db.in_transaction:
+        cursor.execute("BEGIN IMMEDIATE")
+        if _get_custos_sujos(cursor) == 0:  # Outro worker recalculou enquanto esperávamos o lock
+            db.commit()
+            return
+
+    # 1. Receitas sem entrada no cache
+    cursor.execute("""
+        SELECT r.id, r.rendimento FROM receitas r
+        LEFT JOIN custos_receitas_cache c ON c.receita_id = r.id
+        WHERE c.receita_id IS NULL
+    """)
+    receitas_sujas = cursor.fetchall()
+    if receitas_sujas:
+        ids = [row['id'] for row in receitas_sujas]
+        custos_lote = calcular_custos_receitas(ids)
+        linhas = []
+        for row in receitas_sujas:
+            rendimento = row['rendimento']
+            if not rendimento or rendimento <= 0:
+                rendimento = 1
+            custo_lote = custos_lote.get(row['id'], 0)
+            linhas.append((row['id'], custo_lote, custo_lote / rendimento))
+        cursor.executemany("""INSERT OR REPLACE INTO custos_receitas_cache
+                              (receita_id, custo_lote, custo_unitario) VALUES(?,?,?)""", linhas)
+
+    # 2. Produtos sem entrada no cache: soma direto no SQL a partir do cache das receitas
+    cursor.execute("""
+        INSERT OR REPLACE INTO custos_produtos_cache (produto_id, custo_unitario)
+        SELECT p.id, COALESCE(SUM(c.custo_unitario * pc.fracao_receita), 0)
+        FROM produtos p
+        LEFT JOIN produto_composicao pc ON pc.produto_id = p.id
+        LEFT JOIN custos_receitas_cache c ON c.receita_id = pc.receita_id
+        WHERE p.id NOT IN (SELECT produto_id FROM custos_produtos_cache)
+        GROUP BY p.id
+    """)
+    if _get_custos_sujos(cursor) is not None:
+        cursor.execute("UPDATE versao_dados SET versao = 0 WHERE dominio = 'custos_sujos'")
+    db.commit()
+
+
+def get_custos_receitas_cache():
+    """Retorna ({receita_id: custo_lote}, {receita_id: custo_unitario}) a partir do cache."""
+    atualizar_cache_custos()
+    cursor = get_db().cursor()
+    cursor.execute("SELECT receita_id, custo_lote, custo_unitario FROM custos_receitas_cache")
+    custos_lote, custos_unitarios = {}, {}
+    for row in cursor.fetchall():
+        custos_lote[row['receita_id']] = row['custo_lote']
+        custos_unitarios[row['receita_id']] = row['custo_unitario']
+    return custos_lote, custos_unitarios
+
+
+def get_custos_produtos_cache():
+    """Retorna {produto_id: custo_unitario} a partir do cache."""
+    atualizar_cache_custos()
+    cursor = get_db().cursor()
+    cursor.execute("SELECT produto_id, custo_unitario FROM custos_produtos_cache")
+    return {row['produto_id']: row['custo_unitario'] for row in cursor.fetchall()}
+
+
+def _memoizar_por_request(funcao):
+    """Envolve uma função de custo com um cache que vive apenas durante o request atual.
+
+    Evita que um template recalcule (e re-consulte o DB) o mesmo id várias vezes.
+    """
+    def wrapper(item_id):
+        memo = g.setdefault('_memo_custos', {})
+        chave = (funcao.__name__, item_id)
+        if chave not in memo:
+            memo[chave] = funcao(item_id)
+        return memo[chave]
+    return wrapper
+
+
+def utility_processor():
+    # As listagens recebem os custos já calculados em lote (ver calcular_custos_*).
+    # Estas funções ficam disponíveis apenas como fallback, memoizadas por request.
+    return dict(
+        calcular_custo_total_receita=_memoizar_por_request(calcular_custo_total_receita),
+        calcular_custo_produto=_memoizar_por_request(calcular_custo_produto)
+    )
+
+
+def get_receitas_com_custos():
+    """Busca as receitas já com as colunas 'custo_total' e 'custo_unitario' (lidas do cache de custos)."""
+    custos_lote, custos_unitarios = get_custos_receitas_cache()
+    receitas = []
+    for row in get_receitas():
+        receita = dict(row)
+        receita['custo_total'] = custos_lote.get(row['id'], 0)
+        receita['custo_unitario'] = custos_unitarios.get(row['id'], 0)
+        receitas.append(receita)
+    return receitas
+
+
+def get_produtos_com_custos():
+    """Busca os produtos já com a coluna 'custo_producao' (lida do cache de custos)."""
+    custos_produtos = get_custos_produtos_cache()
+    produtos = []
+    for row in get_produtos():
+        produto = dict(row)
+        produto['custo_producao'] = custos_produtos.get(row['id'], 0)
+        produtos.append(produto)
+    return produtos
+
+
+# --- Simulação de Cenários (What-if) ---
+# O catálogo é "compilado" uma vez em matrizes NumPy (grafo de custos):
+#   ingrediente --(gramas)--> receita --(÷ rendimento × fração)--> produto
+# Cada cenário só troca vetores (preços, rendimentos, preços de venda) e o custo de
+# todos os produtos sai de duas multiplicações de matrizes. Vários cenários são
+# avaliados juntos (uma linha por cenário). Nada é gravado no banco.
+def compilar_grafo_custos():
+    """Lê o catálogo e retorna o grafo de custos em memória (dicionário de arrays)."""
+    cursor = get_db().cursor()
+    cursor.row_factory = None
+
+    cursor.execute("SELECT id, nome, preco_embalagem, quant_embalagem FROM ingredientes ORDER BY id")
+    ingredientes = cursor.fetchall()
+    cursor.execute("SELECT id, nome, rendimento FROM receitas ORDER BY id")
+    receitas = cursor.fetchall()
+    cursor.execute("SELECT id, nome, preco_venda FROM produtos ORDER BY id")
+    produtos = cursor.fetchall()
+
+    pos_ingrediente = {row[0]: i for i, row in enumerate(ingredientes)}
+    pos_receita = {row[0]: i for i, row in enumerate(receitas)}
+    pos_produto = {row[0]: i for i, row in enumerate(produtos)}
+
+    # Matriz receitas x ingredientes com os gramas usados por lote
+    gramas = np.zeros((len(receitas), len(ingredientes)))
+    cursor.execute("SELECT receita_id, ingrediente_id, quantidade, unidade, densidade FROM receita_ingredientes ri "
+                   "JOIN ingredientes i ON ri.ingrediente_id = i.id")
+    linhas = [row for row in cursor.fetchall() if row[0] in pos_receita]
+    if linhas:
+        receita, ingrediente, quantidade, unidade, densidade = zip(*linhas)
+        qtd_gramas = _converter_para_gramas_vetorizado(np.array(quantidade, dtype=float), unidade,
+                                                       np.array(densidade, dtype=float))
+        np.add.at(gramas, ([pos_receita[r] for r in receita], [pos_ingrediente[i] for i in ingrediente]),
+                  qtd_gramas)
+
+    # Custos adicionais não mudam nos cenários: já entram somados por receita
+    custo_adicional = np.zeros(len(receitas))
+    cursor.execute("SELECT rca.receita_id, ca.custo_unitario, ca.vida_util, rca.quantidade_utilizada "
+                   "FROM receita_custos_adicionais rca JOIN custos_adicionais ca ON rca.custo_adicional_id = ca.id")
+    linhas = [row for row in cursor.fetchall() if row[0] in pos_receita]
+    if linhas:
+        receita, custo_unitario, vida_util, quantidade_utilizada = zip(*linhas)
+        np.add.at(custo_adicional, [pos_receita[r] for r in receita], _custo_adicional_vetorizado(
+            np.array(custo_unitario, dtype=float), np.array(vida_util, dtype=float),
+            np.array(quantidade_utilizada, dtype=float)))
+
+    # Matriz produtos x receitas com as frações de cada receita no produto
+    fracoes = np.zeros((len(produtos), len(receitas)))
+    cursor.execute("SELECT produto_id, receita_id, fracao_receita FROM produto_composicao")
+    for produto_id, receita_id, fracao in cursor.fetchall():
+        if produto_id in pos_produto and receita_id in pos_receita:
+            fracoes[pos_produto[produto_id], pos_receita[receita_id]] += fracao
+
+    return {
+        'pos_ingrediente': pos_ingrediente,
+        'pos_receita': pos_receita,
+        'pos_produto': pos_produto,
+        'produtos': [{'id': row[0], 'nome': row[1]} for row in produtos],
+        'receitas': [{'id': row[0], 'nome': row[1]} for row in receitas],
+        'ingredientes': [{'id': row[0], 'nome': row[1]} for row in ingredientes],
+        'preco_embalagem': np.array([row[2] for row in ingredientes], dtype=float),
+        'quant_embalagem': np.array([row[3] for row in ingredientes], dtype=float),
+        'rendimento': np.array([row[2] or 0 for row in receitas], dtype=float),
+        'preco_venda': np.array([row[2] for row in produtos], dtype=float),
+        'gramas': gramas,
+        'custo_adicional': custo_adicional,
+        'fracoes': fracoes,
+    }
+
+
+def get_mix_vendas(dias=30):
+    """Quantidade vendida por produto e despesas dos últimos 'dias' (lidas dos resumos)."""
+    desde = (datetime.now().date() - timedelta(days=dias - 1)).isoformat()
+    cursor = get_db().cursor()
+    cursor.execute("""SELECT produto_id, SUM(total_quantidade) AS quantidade FROM resumo_produto_diario
+                      WHERE data >= ? AND produto_id != 0 GROUP BY produto_id""", (desde,))
+    mix = {row['produto_id']: row['quantidade'] for row in cursor.fetchall()}
+    cursor.execute("SELECT COALESCE(SUM(total_gasto), 0) AS despesas FROM resumo_diario WHERE data >= ?", (desde,))
+    return mix, cursor.fetchone()['despesas']
+
+
+def _posicao(grafo, tipo, item_id):
+    try:
+        return grafo[f'pos_{tipo}'][int(item_id)]
+    except (KeyError, ValueError, TypeError):
+        raise ValueError(f"{tipo} {item_id} não existe")
+
+
+def simular_cenarios(grafo, cenarios, mix=None, despesas=0):
+    """Avalia todos os cenários de uma vez. Retorna uma lista de resultados (um por cenário).
+
+    Cada cenário é um dicionário com (todas as chaves são opcionais):
+      variacao_geral_ingredientes: fator sobre todos os preços (1.10 = +10%)
+      variacao_ingredientes: {ingrediente_id: fator}
+      rendimentos: {receita_id: novo_rendimento}
+      precos_venda: {produto_id: novo_preco}
+      markup: preço de venda = custo x markup para todos os produtos (ex: 3, 3.5, 4)
+      mix: {produto_id: quantidade} (substitui o mix geral deste cenário)
+    """
+    num_cenarios = len(cenarios)
+    preco_embalagem = np.tile(grafo['preco_embalagem'], (num_cenarios, 1))
+    rendimento = np.tile(grafo['rendimento'], (num_cenarios, 1))
+    preco_venda = np.tile(grafo['preco_venda'], (num_cenarios, 1))
+    markup = np.full(num_cenarios, np.nan)
+    # O mix geral vira um vetor uma única vez; só os cenários com mix próprio o substituem
+    mix_geral = np.zeros(len(grafo['produtos']))
+    for produto_id, quantidade in (mix or {}).items():
+        mix_geral[_posicao(grafo, 'produto', produto_id)] = float(quantidade)
+    quantidades = np.tile(mix_geral, (num_cenarios, 1))
+
+    # 1. Monta as entradas de cada cenário (linha s das matrizes)
+    for s, cenario in enumerate(cenarios):
+        preco_embalagem[s] *= float(cenario.get('variacao_geral_ingredientes', 1.0))
+        for ingrediente_id, fator in (cenario.get('variacao_ingredientes') or {}).items():
+            preco_embalagem[s, _posicao(grafo, 'ingrediente', ingrediente_id)] *= float(fator)
+        for receita_id, novo_rendimento in (cenario.get('rendimentos') or {}).items():
+            rendimento[s, _posicao(grafo, 'receita', receita_id)] = float(novo_rendimento)
+        for produto_id, novo_preco in (cenario.get('precos_venda') or {}).items():
+            preco_venda[s, _posicao(grafo, 'produto', produto_id)] = float(novo_preco)
+        if cenario.get('markup') is not None:
+            markup[s] = float(cenario['markup'])
+        if cenario.get('mix'):
+            quantidades[s] = 0
+            for produto_id, quantidade in cenario['mix'].items():
+                quantidades[s, _posicao(grafo, 'produto', produto_id)] = float(quantidade)
+
+    # 2. Custos: ingredientes -> receitas -> produtos (mesmas regras do cálculo escalar)
+    preco_por_grama = np.divide(preco_embalagem, grafo['quant_embalagem'],
+                                out=np.zeros_like(preco_embalagem), where=grafo['quant_embalagem'] > 0)
+    custo_lote = preco_por_grama @ grafo['gramas'].T + grafo['custo_adicional']
+    custo_unitario_receita = custo_lote / np.where(rendimento > 0, rendimento, 1)
+    custo_produto = custo_unitario_receita @ grafo['fracoes'].T
+
+    # 3. Preço, margem e projeção do mix
+    com_markup = ~np.isnan(markup)
+    preco_venda[com_markup] = custo_produto[com_markup] * markup[com_markup, None]
+    margem = preco_venda - custo_produto
+    receita_projetada = (preco_venda * quantidades).sum(axis=1)
+    custo_projetado = (custo_produto * quantidades).sum(axis=1)
+
+    resultados = []
+    for s in range(num_cenarios):
+        lucro_bruto = receita_projetada[s] - custo_projetado[s]
+        resultados.append({
+            'custo_unitario': custo_produto[s].tolist(),
+            'preco_venda': preco_venda[s].tolist(),
+            'margem_bruta': margem[s].tolist(),
+            'receita_projetada': float(receita_projetada[s]),
+            'custo_projetado': float(custo_projetado[s]),
+            'lucro_bruto_projetado': float(lucro_bruto),
+            'lucro_liquido_projetado': float(lucro_bruto - despesas),
+            'margem_bruta_pct': float(lucro_bruto / receita_projetada[s]) if receita_projetada[s] else None,
+        })
+    return resultados
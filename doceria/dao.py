@@ -0,0 +1,592 @@
+"""
+Camada de acesso ao banco (DAO): catálogo, receitas, produtos e lançamentos.
+
+As funções de escrita mantêm na MESMA transação o cache de custos (invalidar_*)
+e os resumos financeiros (resumos.py).
+"""
+import sqlite3
+from datetime import timedelta
+
+from .arquivamento import get_pagina_arquivada
+from .db import blocos_de_ids, get_db
+from .resumos import (_aplicar_venda_nos_resumos, _incrementar_versao_dados, _mover_resumo_produto_para_excluido,
+                      _somar_nos_resumos)
+
+
+# --- Seção Ingredientes ---
+def get_ingrediente(nome):
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM ingredientes WHERE nome = ?", (nome,))
+    return cursor.fetchone()
+
+
+def get_todos_ingredientes():
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM ingredientes ORDER BY nome")
+    return cursor.fetchall()
+
+
+def is_ingrediente_em_uso(ingrediente_id):
+    cursor = get_db().cursor()
+    cursor.execute("SELECT 1 FROM receita_ingredientes WHERE ingrediente_id = ?", (ingrediente_id,))
+    return cursor.fetchone() is not None
+
+
+def delete_ingrediente_db(ingrediente_id):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("DELETE FROM ingredientes WHERE id = ?", (ingrediente_id,))
+    db.commit()
+
+
+def get_ingrediente_by_id(id):
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM ingredientes WHERE id = ?", (id,))
+    return cursor.fetchone()
+
+
+def add_ingrediente(nome, preco, quantidade, densidade=1.0):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO ingredientes (nome, preco_embalagem, quant_embalagem, densidade) VALUES(?,?,?,?)",
+        (nome, preco, quantidade, densidade))
+    db.commit()
+
+
+# --- Seção Receitas ---
+def get_receitas():
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM receitas ORDER BY nome")
+    return cursor.fetchall()
+
+
+def get_receita(receita_id):
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM receitas WHERE id = ?", (receita_id,))
+    return cursor.fetchone()
+
+
+def add_receita(nome, descricao, rendimento):
+    try:
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("INSERT INTO receitas (nome, descricao, rendimento) VALUES(?,?,?)",
+                       (nome, descricao, rendimento))
+        db.commit()
+        return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return None
+
+
+def update_receita(receita_id, novo_nome, nova_descricao, novo_rendimento):
+    try:
+        db = get_db()
+        cursor = db.cursor()
+        cursor.execute("UPDATE receitas SET nome = ?, descricao = ?, rendimento = ? WHERE id = ?",
+                       (novo_nome, nova_descricao, novo_rendimento, receita_id))
+        invalidar_custos_receitas([receita_id])  # O rendimento muda o custo unitário
+        db.commit()
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
+def delete_receita(receita_id):
+    db = get_db()
+    cursor = db.cursor()
+    invalidar_custos_receitas([receita_id])
+    cursor.execute("DELETE FROM receitas WHERE id = ?", (receita_id,))
+    db.commit()
+
+
+# ... (após a função delete_receita)
+
+
+def duplicar_receita_db(receita_id):
+    """
+    Duplica uma receita existente, incluindo seus ingredientes e custos.
+    Retorna o ID da nova receita criada.
+    """
+    db = get_db()
+    cursor = db.cursor()
+
+    try:
+        # 1. Busca a receita original
+        receita_original = get_receita(receita_id)
+        if not receita_original:
+            return None
+
+        # 2. Cria um novo nome para a cópia (evitando erro de UNIQUE)
+        novo_nome = f"{receita_original['nome']} (Cópia)"
+
+        # 3. Insere a nova receita (a cópia)
+        cursor.execute("INSERT INTO receitas (nome, descricao, rendimento) VALUES(?,?,?)",
+                       (novo_nome, receita_original['descricao'], receita_original['rendimento']))
+
+        # 4. Pega o ID da nova receita que acabamos de criar
+        nova_receita_id = cursor.lastrowid
+
+        # 5. Busca ingredientes da receita original
+        ingredientes_originais = get_ingredientes_receita(receita_id)
+        for ingr in ingredientes_originais:
+            # 6. Insere os ingredientes na nova receita
+            cursor.execute(
+                """INSERT INTO receita_ingredientes 
+                   (receita_id, ingrediente_id, quantidade, unidade) 
+                   VALUES(?,?,?,?)""",
+                (nova_receita_id, ingr['ingrediente_id'], ingr['quantidade'], ingr['unidade'])
+            )
+
+        # 7. Busca custos adicionais da receita original
+        custos_originais = get_custos_adicionais_receita(receita_id)
+        for custo in custos_originais:
+            # 8. Insere os custos na nova receita
+            cursor.execute(
+                """INSERT INTO receita_custos_adicionais
+                   (receita_id, custo_adicional_id, quantidade_utilizada)
+                   VALUES(?,?,?)""",
+                (nova_receita_id, custo['custo_adicional_id'], custo['quantidade_utilizada'])
+            )
+
+        db.commit()
+        return nova_receita_id  # Retorna o ID da cópia
+
+    except Exception:
+        db.rollback()  # Desfaz tudo se algo der errado
+        return None
+
+
+# --- Seção Relação Receitas <--> Ingredientes ---
+def get_ingredientes_receita(receita_id):
+    cursor = get_db().cursor()
+    cursor.execute(
+        '''
+        SELECT ri.id, i.nome, ri.quantidade, ri.unidade, i.densidade, 
+               i.preco_embalagem, i.quant_embalagem, 
+               i.id as ingrediente_id 
+        FROM receita_ingredientes ri
+        JOIN ingredientes i ON ri.ingrediente_id = i.id
+        WHERE ri.receita_id = ?
+        ORDER BY ri.id
+        ''', (receita_id,))
+    return cursor.fetchall()
+
+
+def add_ingrediente_receita(receita_id, ingrediente_id, quantidade, unidade):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(
+        "INSERT INTO receita_ingredientes (receita_id, ingrediente_id, quantidade, unidade) VALUES(?,?,?,?)",
+        (receita_id, ingrediente_id, quantidade, unidade))
+    invalidar_custos_receitas([receita_id])
+    db.commit()
+
+
+def get_ingrediente_receita_by_id(ingrediente_receita_id):
+    cursor = get_db().cursor()
+    cursor.execute(
+        '''
+        SELECT ri.*, i.nome
+        FROM receita_ingredientes ri
+        JOIN ingredientes i ON ri.ingrediente_id = i.id
+        WHERE ri.id = ?
+        ''', (ingrediente_receita_id,))
+    return cursor.fetchone()
+
+
+def update_ingrediente_receita(ingrediente_receita_id, nova_quantidade, nova_unidade):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('UPDATE receita_ingredientes SET quantidade = ?, unidade = ? WHERE id = ?',
+                   (nova_quantidade, nova_unidade, ingrediente_receita_id))
+    cursor.execute('SELECT receita_id FROM receita_ingredientes WHERE id = ?', (ingrediente_receita_id,))
+    invalidar_custos_receitas(row['receita_id'] for row in cursor.fetchall())
+    db.commit()
+
+
+def delete_ingrediente_receita(ingrediente_receita_id):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('SELECT receita_id FROM receita_ingredientes WHERE id = ?', (ingrediente_receita_id,))
+    invalidar_custos_receitas(row['receita_id'] for row in cursor.fetchall())
+    cursor.execute('DELETE FROM receita_ingredientes WHERE id = ?', (ingrediente_receita_id,))
+    db.commit()
+
+
+# --- Seção Custos Adicionais ---
+def get_custos_adicionais():
+    cursor = get_db().cursor()
+    cursor.execute('SELECT * FROM custos_adicionais ORDER BY tipo, nome')
+    return cursor.fetchall()
+
+
+def get_custo_adicional_by_id(custo_id):
+    cursor = get_db().cursor()
+    cursor.execute('SELECT * FROM custos_adicionais WHERE id = ?', (custo_id,))
+    return cursor.fetchone()
+
+
+def add_custo_adicional(nome, tipo, custo_unitario, unidade_medida, vida_util, descricao):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('''INSERT INTO custos_adicionais
+        (nome,tipo,custo_unitario,unidade_medida,vida_util, descricao)
+            VALUES(?,?,?,?,?,?)''',
+                   (nome, tipo, custo_unitario, unidade_medida, vida_util, descricao))
+    db.commit()
+
+
+def update_custo_adicional(custo_id, nome, tipo, custo_unitario, unidade_medida, vida_util, descricao):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute(''' UPDATE custos_adicionais
+                            SET nome = ?, tipo = ?, custo_unitario = ?, unidade_medida = ?, vida_util = ?, descricao = ?
+                            WHERE id = ?''',
+                   (nome, tipo, custo_unitario, unidade_medida, vida_util, descricao, custo_id))
+    invalidar_custos_custo_adicional(custo_id)
+    db.commit()
+
+
+def delete_custo_adicional(custos_id):
+    db = get_db()
+    cursor = db.cursor()
+    invalidar_custos_custo_adicional(custos_id)
+    cursor.execute('DELETE FROM custos_adicionais WHERE id = ?', (custos_id,))
+    db.commit()
+
+
+# --- Seção Relação Receita <--> Custos Adicionais ---
+def get_custos_adicionais_receita(receita_id):
+    cursor = get_db().cursor()
+    cursor.execute('''SELECT rca.id, ca.nome, ca.tipo, rca.quantidade_utilizada,
+                    ca.custo_unitario, ca.unidade_medida, ca.vida_util, ca.descricao,
+                    ca.id as custo_adicional_id
+                    FROM receita_custos_adicionais rca
+                    JOIN custos_adicionais ca ON rca.custo_adicional_id = ca.id
+                    WHERE rca.receita_id = ?
+                    ORDER BY rca.id''', (receita_id,))
+    return cursor.fetchall()
+
+
+def add_custo_adicional_receita(receita_id, custo_id, quantidade):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('''INSERT INTO receita_custos_adicionais
+                        (receita_id, custo_adicional_id, quantidade_utilizada)
+                        VALUES(?,?,?)''',
+                   (receita_id, custo_id, quantidade))
+    invalidar_custos_receitas([receita_id])
+    db.commit()
+
+
+def delete_custo_adicional_receita(custo_receita_id):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('SELECT receita_id FROM receita_custos_adicionais WHERE id = ?', (custo_receita_id,))
+    invalidar_custos_receitas(row['receita_id'] for row in cursor.fetchall())
+    cursor.execute('''DELETE FROM receita_custos_adicionais WHERE id = ?''', (custo_receita_id,))
+    db.commit()
+
+
+def get_custo_adicional_receita_by_id(custo_receita_id):
+    cursor = get_db().cursor()
+    cursor.execute('SELECT * FROM receita_custos_adicionais WHERE id = ?', (custo_receita_id,))
+    return cursor.fetchone()
+
+
+# --- Seção de Produtos ---
+def get_produtos():
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM produtos ORDER BY nome")
+    return cursor.fetchall()
+
+
+def get_produto_by_id(produto_id):
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM produtos WHERE id = ?", (produto_id,))
+    return cursor.fetchone()
+
+
+def add_produto(nome, preco_venda, composicao):
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        cursor.execute("INSERT INTO produtos (nome, preco_venda) VALUES (?, ?)", (nome, preco_venda))
+        produto_id = cursor.lastrowid
+        for item in composicao:
+            receita_id = item['receita_id']
+            fracao = item['fracao']
+            cursor.execute("INSERT INTO produto_composicao (produto_id, receita_id, fracao_receita) VALUES (?, ?, ?)",
+                           (produto_id, receita_id, fracao))
+        db.commit()
+        return produto_id
+    except sqlite3.IntegrityError:
+        db.rollback()
+        return None
+
+
+def delete_produto(produto_id):
+    db = get_db()
+    cursor = db.cursor()
+    invalidar_custos_produto(produto_id)
+    _mover_resumo_produto_para_excluido(cursor, produto_id)
+    _incrementar_versao_dados(cursor)  # Os nomes nos gráficos mudam
+    # O 'ON DELETE SET NULL' de venda_itens deixa os itens vendidos sem produto
+    cursor.execute("DELETE FROM produtos WHERE id = ?", (produto_id,))
+    db.commit()
+
+
+def get_composicao_produto(produto_id):
+    """Busca a composição de um produto (receitas e frações)."""
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT r.id, r.nome, pc.fracao_receita
+        FROM produto_composicao pc
+        JOIN receitas r ON pc.receita_id = r.id
+        WHERE pc.produto_id = ?
+    """, (produto_id,))
+    return cursor.fetchall()
+
+
+def update_produto(produto_id, nome, preco_venda, composicao):
+    """Atualiza um produto e sua composição em uma única transação."""
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        # 1. Atualiza a tabela principal 'produtos'
+        cursor.execute("UPDATE produtos SET nome = ?, preco_venda = ? WHERE id = ?",
+                       (nome, preco_venda, produto_id))
+
+        # 2. Deleta a composição antiga (e marca o custo do produto como sujo)
+        cursor.execute("DELETE FROM produto_composicao WHERE produto_id = ?", (produto_id,))
+        invalidar_custos_produto(produto_id)
+        _incrementar_versao_dados(cursor)  # Um produto renomeado muda os nomes nos gráficos
+
+        # 3. Insere a nova composição
+        for item in composicao:
+            receita_id = item['receita_id']
+            fracao = item['fracao']
+            cursor.execute("""
+                INSERT INTO produto_composicao (produto_id, receita_id, fracao_receita) 
+                VALUES (?, ?, ?)
+            """, (produto_id, int(receita_id), float(fracao)))
+
+        db.commit()
+        return True
+    except sqlite3.IntegrityError:
+        db.rollback()  # Desfaz tudo se o nome do produto já existir
+        return False
+
+
+# --- Cache Materializado de Custos ---
+# Dependências: ingrediente -> receita_ingredientes -> receita -> produto_composicao -> produto
+#               custos_adicionais -> receita_custos_adicionais -> receita
+# Os escritores chamam as funções 'invalidar_*' ANTES do seu commit, para que a
+# invalidação faça parte da mesma transação. Elas apagam só as chaves afetadas.
+def invalidar_custos_receitas(receita_ids):
+    """Marca como sujas as receitas informadas e os produtos que as utilizam."""
+    cursor = get_db().cursor()
+    for bloco in blocos_de_ids(receita_ids):
+        placeholders = ','.join('?' for _ in bloco)
+        cursor.execute(f"""
+            DELETE FROM custos_produtos_cache
+            WHERE produto_id IN (SELECT produto_id FROM produto_composicao WHERE receita_id IN ({placeholders}))
+        """, bloco)
+        cursor.execute(f"DELETE FROM custos_receitas_cache WHERE receita_id IN ({placeholders})", bloco)
+
+
+def invalidar_custos_ingredientes(ingrediente_ids):
+    """Marca como sujas as receitas (e produtos) que usam os ingredientes informados."""
+    invalidar_custos_receitas(get_receitas_dos_ingredientes(ingrediente_ids))
+
+
+def get_receitas_dos_ingredientes(ingrediente_ids):
+    """Ids (sem repetição) das receitas que usam algum dos ingredientes informados."""
+    cursor = get_db().cursor()
+    receita_ids = set()
+    for bloco in blocos_de_ids(ingrediente_ids):
+        cursor.execute(f"""SELECT DISTINCT receita_id FROM receita_ingredientes
+                           WHERE ingrediente_id IN ({','.join('?' for _ in bloco)})""", bloco)
+        receita_ids.update(row['receita_id'] for row in cursor.fetchall())
+    return sorted(receita_ids)
+
+
+def invalidar_custos_custo_adicional(custo_id):
+    """Marca como sujas as receitas (e produtos) que usam o custo adicional informado."""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT DISTINCT receita_id FROM receita_custos_adicionais WHERE custo_adicional_id = ?",
+                   (custo_id,))
+    invalidar_custos_receitas(row['receita_id'] for row in cursor.fetchall())
+
+
+def invalidar_custos_produto(produto_id):
+    """Marca como sujo apenas o produto informado."""
+    get_db().cursor().execute("DELETE FROM custos_produtos_cache WHERE produto_id = ?", (produto_id,))
+
+
+# --- Funções do Módulo Financeiro ---
+def add_despesa(descricao, valor, data, categoria):
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("INSERT INTO despesas (descricao, valor, data, categoria) VALUES(?,?,?,?)",
+                   (descricao, valor, data, categoria))
+    _somar_nos_resumos(cursor, data, total_gasto=valor)
+    db.commit()
+
+
+def add_venda(venda_itens, data, metodo_pagamento):
+    db = get_db()
+    cursor = db.cursor()
+    total_venda = sum(item['quantidade'] * item['preco_venda'] for item in venda_itens)
+    cursor.execute("INSERT INTO vendas (data, total_venda, metodo_pagamento) VALUES(?,?,?)",
+                   (data, total_venda, metodo_pagamento))
+    venda_id = cursor.lastrowid
+    for item in venda_itens:
+        cursor.execute(
+            """INSERT INTO venda_itens
+            (venda_id, produto_id, quantidade, preco_unitario_venda, custo_unitario_producao)
+            VALUES(?,?,?,?,?)""",
+            (venda_id, item['produto_id'], item['quantidade'], item['preco_venda'], item['custo_producao']))
+    _aplicar_venda_nos_resumos(venda_id, 1)
+    db.commit()
+
+
+def get_despesas_recentes(limite=20):
+    """Busca as N despesas mais recentes."""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM despesas ORDER BY data DESC, id DESC LIMIT ?", (limite,))
+    return cursor.fetchall()
+
+
+def delete_despesa(despesa_id):
+    """Exclui uma despesa específica do banco."""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT data, valor FROM despesas WHERE id = ?", (despesa_id,))
+    despesa = cursor.fetchone()
+    if despesa:
+        _somar_nos_resumos(cursor, despesa['data'], total_gasto=-despesa['valor'])
+    cursor.execute("DELETE FROM despesas WHERE id = ?", (despesa_id,))
+    db.commit()
+
+
+def get_vendas_recentes(limite=20):
+    """Busca as N vendas mais recentes."""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT * FROM vendas ORDER BY data DESC, id DESC LIMIT ?", (limite,))
+    return cursor.fetchall()
+
+
+def delete_venda(venda_id):
+    """Exclui uma venda específica do banco.
+    O 'ON DELETE CASCADE' na tabela venda_itens cuidará dos itens.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    _aplicar_venda_nos_resumos(venda_id, -1)
+    cursor.execute("DELETE FROM vendas WHERE id = ?", (venda_id,))
+    db.commit()
+
+
+def get_itens_para_vendas(venda_ids):
+        """
+        Busca todos os itens e nomes de produtos para uma lista de IDs de venda.
+        """
+        if not venda_ids:
+            return []
+
+        # Cria a string de placeholders (?,?,?) para a query SQL
+        placeholders = ','.join('?' for _ in venda_ids)
+
+        cursor = get_db().cursor()
+        # Junta com a tabela 'produtos' para pegar o 'nome' do produto
+        cursor.execute(f"""
+            SELECT vi.*, p.nome
+            FROM venda_itens vi
+            LEFT JOIN produtos p ON vi.produto_id = p.id
+            WHERE vi.venda_id IN ({placeholders})
+        """, tuple(venda_ids))  # Passa os IDs como uma tupla
+        return cursor.fetchall()
+
+
+# --- Paginação por Cursor (Keyset) ---
+# Em vez de OFFSET (que relê todas as linhas puladas), cada página continua a partir
+# da última linha vista: WHERE (data, id) < (ultima_data, ultimo_id). Com o índice
+# (data, id) o custo de uma página é o mesmo no início ou anos atrás no histórico.
+def _codificar_cursor(row):
+    return f"{row['data']}_{row['id']}" if row else None
+
+
+def _decodificar_cursor(cursor_pagina):
+    """'2024-05-10_123' -> ('2024-05-10', 123). Cursor inválido volta para a primeira página."""
+    try:
+        data, item_id = cursor_pagina.rsplit('_', 1)
+        return data, int(item_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _buscar_pagina(tabela, condicoes, params, limite, apos, filtros_arquivo):
+    """Executa a query paginada e retorna (linhas, cursor_da_proxima_pagina).
+
+    As linhas dos meses arquivados (arquivamento.py) entram na mesma ordem (data, id),
+    com 'filtros_arquivo' equivalentes às 'condicoes' do SQL.
+    """
+    condicoes, params = list(condicoes), list(params)
+    chave = _decodificar_cursor(apos)
+    if chave:
+        condicoes.append("(data, id) < (?, ?)")
+        params.extend(chave)
+    where = f"WHERE {' AND '.join(condicoes)}" if condicoes else ''
+    cursor = get_db().cursor()
+    # Busca 1 linha a mais só para saber se existe próxima página
+    cursor.execute(f"SELECT * FROM {tabela} {where} ORDER BY data DESC, id DESC LIMIT ?", params + [limite + 1])
+    linhas = cursor.fetchall()
+    # Com a página do banco cheia, só as arquivadas mais novas que a última linha dela entram (em geral, nenhuma)
+    acima_de = (linhas[-1]['data'], linhas[-1]['id']) if len(linhas) > limite else None
+    arquivadas = get_pagina_arquivada(tabela, limite + 1, chave, acima_de=acima_de, **filtros_arquivo)
+    if arquivadas:
+        # Uma linha nos dois lados (arquivamento interrompido) aparece uma vez só, a do banco
+        ids = {row['id'] for row in linhas}
+        linhas = sorted(linhas + [linha for linha in arquivadas if linha['id'] not in ids],
+                        key=lambda row: (row['data'], row['id']), reverse=True)
+    proxima = _codificar_cursor(linhas[limite - 1]) if len(linhas) > limite else None
+    return linhas[:limite], proxima
+
+
+def _filtro_periodo(data_inicio, data_fim):
+    condicoes, params = [], []
+    if data_inicio:
+        condicoes.append("data >= ?")
+        params.append(data_inicio.isoformat())
+    if data_fim:
+        condicoes.append("data < ?")  # Fim inclusivo (mesmo critério das exportações)
+        params.append((data_fim + timedelta(days=1)).isoformat())
+    return condicoes, params
+
+
+def get_vendas_pagina(limite=20, apos=None, data_inicio=None, data_fim=None, metodo_pagamento=None,
+                      produto_id=None):
+    """Página de vendas (mais recentes primeiro) com filtros opcionais. Retorna (vendas, cursor_proxima)."""
+    condicoes, params = _filtro_periodo(data_inicio, data_fim)
+    if metodo_pagamento:
+        condicoes.append("metodo_pagamento = ?")
+        params.append(metodo_pagamento)
+    if produto_id:
+        condicoes.append("EXISTS (SELECT 1 FROM venda_itens vi WHERE vi.venda_id = vendas.id AND vi.produto_id = ?)")
+        params.append(produto_id)
+    filtros_arquivo = dict(data_inicio=data_inicio, data_fim=data_fim, produto_id=produto_id,
+                           filtros={'metodo_pagamento': metodo_pagamento} if metodo_pagamento else None)
+    return _buscar_pagina('vendas', condicoes, params, limite, apos, filtros_arquivo)
+
+
+def get_despesas_pagina(limite=20, apos=None, data_inicio=None, data_fim=None, categoria=None):
+    """Página de despesas (mais recentes primeiro) com filtros opcionais. Retorna (despesas, cursor_proxima)."""
+    condicoes, params = _filtro_periodo(data_inicio, data_fim)
+    if categoria:
+        condicoes.append("categoria = ?")
+        params.append(categoria)
+    filtros_arquivo = dict(data_inicio=data_inicio, data_fim=data_fim,
+                           filtros={'categoria': categoria} if categoria else None)
+    return _buscar_pagina('despesas', condicoes, params, limite, apos, filtros_arquivo)
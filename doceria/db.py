@@ -0,0 +1,431 @@
+"""
+Conexão com o SQLite e migrações do schema.
+
+Cada thread do servidor reaproveita a sua conexão (DB_REUTILIZAR_CONEXOES), aberta
+com as PRAGMAs do config do app. O caminho do banco também vem do config, então
+apps criados com create_app({'DATABASE': ...}) diferentes não se misturam.
+"""
+import os
+import threading
+
+import click
+import sqlite3
+from flask import current_app, g
+from flask.cli import with_appcontext
+
+from .instrumentacao import _ConexaoInstrumentada
+
+
+_bancos_migrados = set()  # Arquivos de banco já verificados/migrados neste processo
+_conexoes_thread = threading.local()  # Conexão reaproveitada por cada thread do servidor WSGI
+_geracao_banco = 0  # Incrementada quando o arquivo do banco é recriado (reset)
+_inodes_banco = {}  # Caminho do banco -> inode do arquivo visto por último neste processo
+# Ids por 'IN (?, ...)': abaixo do limite de parâmetros do SQLite (SQLITE_MAX_VARIABLE_NUMBER, 999 em builds antigos)
+TAMANHO_BLOCO_IDS = 500
+
+
+def conectar_db(caminho=None):
+    """Abre uma conexão nova com as PRAGMAs de desempenho e integridade aplicadas."""
+    config = current_app.config
+    db = sqlite3.connect(caminho or config['DATABASE'], cached_statements=config['DB_CACHED_STATEMENTS'],
+                         factory=_ConexaoInstrumentada if config['INSTRUMENTACAO'] else sqlite3.Connection)
+    db.row_factory = sqlite3.Row
+    db.execute(f"PRAGMA journal_mode = {config['DB_JOURNAL_MODE']}")
+    db.execute(f"PRAGMA synchronous = {config['DB_SYNCHRONOUS']}")
+    db.execute(f"PRAGMA cache_size = -{config['DB_CACHE_SIZE_KB']}")  # Valor negativo = KiB
+    db.execute(f"PRAGMA mmap_size = {config['DB_MMAP_SIZE']}")
+    # Sem isto os 'ON DELETE CASCADE / SET NULL' do schema não têm efeito
+    db.execute("PRAGMA foreign_keys = ON")
+    return db
+
+
+def _inode_banco(caminho):
+    """Inode do arquivo do banco (None se ele não existe, ex: ':memory:' ou apagado)."""
+    try:
+        return os.stat(caminho).st_ino
+    except OSError:
+        return None
+
+
+def _get_conexao_thread():
+    """Retorna a conexão desta thread, abrindo uma nova se o banco mudou ou foi recriado.
+
+    O reset (fechar_conexoes) só avisa as threads do próprio processo. Os outros
+    workers (ex: gunicorn) percebem o arquivo recriado pelo inode, que muda: sem isso
+    continuariam gravando no arquivo antigo, já apagado.
+    """
+    global _geracao_banco
+    caminho = current_app.config['DATABASE']
+    inode = _inode_banco(caminho)
+    if _inodes_banco.get(caminho, inode) != inode:
+        _geracao_banco += 1  # Recriado: as conexões e os caches em memória deste processo ficam velhos
+    chave = (caminho, _geracao_banco)
+    db = getattr(_conexoes_thread, 'db', None)
+    if db is not None and getattr(_conexoes_thread, 'chave', None) == chave:
+        return db
+    if db is not None:
+        db.close()
+    db = _conexoes_thread.db = conectar_db()
+    _conexoes_thread.chave = chave
+    _inodes_banco[caminho] = _inode_banco(caminho)  # O connect cria o arquivo se ele não existia
+    return db
+
+
+def fechar_conexoes():
+    """Fecha a conexão desta thread e força as demais threads a reconectar."""
+    global _geracao_banco
+    db = getattr(_conexoes_thread, 'db', None)
+    if db is not None:
+        db.close()
+        _conexoes_thread.db = None
+    _geracao_banco += 1
+
+
+def blocos_de_ids(ids, tamanho=TAMANHO_BLOCO_IDS):
+    """Divide os ids em listas de até 'tamanho' itens, uma por query com 'IN (?, ...)'."""
+    ids = list(ids)
+    for comeco in range(0, len(ids), tamanho):
+        yield ids[comeco:comeco + tamanho]
+
+
+def get_geracao_banco():
+    """Muda a cada fechar_conexoes (ex: reset): entra na chave dos caches em memória."""
+    return _geracao_banco
+
+
+def get_db():
+    db = getattr(g, '_database', None)
+    if db is None:
+        reutilizar = current_app.config['DB_REUTILIZAR_CONEXOES']
+        db = g._database = _get_conexao_thread() if reutilizar else conectar_db()
+        # Garante o schema atualizado também quando o app sobe sem passar por init_db (ex: WSGI)
+        caminho = current_app.config['DATABASE']
+        if caminho not in _bancos_migrados:
+            aplicar_migracoes(db)
+            _bancos_migrados.add(caminho)
+    return db
+
+
+def close_connection(exception):
+    db = g.pop('_database', None)
+    if db is None:
+        return
+    if current_app.config['DB_REUTILIZAR_CONEXOES']:
+        # A conexão volta para a thread: só desfaz o que ficou sem commit (ex: erro no meio da rota)
+        if db.in_transaction:
+            db.rollback()
+    else:
+        db.close()
+
+
+# --- Migrações do Schema ---
+# O schema evolui por migrações numeradas. A versão aplicada fica gravada no
+# próprio arquivo do banco (PRAGMA user_version), então um doceria.db antigo é
+# atualizado só com as migrações que faltam. Para mudar o schema, adicione uma
+# nova função _migracao_N e registre-a em MIGRACOES (nunca altere as antigas).
+def _migracao_1_schema_base(cursor):
+    # Tabelas de Custo
+    cursor.execute('''CREATE TABLE IF NOT EXISTS ingredientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        nome TEXT UNIQUE NOT NULL, 
+        preco_embalagem REAL NOT NULL,
+        quant_embalagem REAL NOT NULL, 
+        densidade REAL DEFAULT 1.0 )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS receitas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        nome TEXT UNIQUE NOT NULL, descricao TEXT,
+        rendimento INTEGER NOT NULL DEFAULT 1 )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS receita_ingredientes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        receita_id INTEGER NOT NULL, 
+        ingrediente_id INTEGER NOT NULL,
+        quantidade REAL NOT NULL, 
+        unidade TEXT NOT NULL,
+        FOREIGN KEY (receita_id) REFERENCES receitas (id) ON DELETE CASCADE,
+        FOREIGN KEY (ingrediente_id) REFERENCES ingredientes (id) ON DELETE CASCADE )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS custos_adicionais (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        nome TEXT UNIQUE NOT NULL, 
+        tipo TEXT NOT NULL,
+        custo_unitario REAL NOT NULL, 
+        unidade_medida TEXT, 
+        vida_util INTEGER, descricao TEXT )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS receita_custos_adicionais (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        receita_id INTEGER NOT NULL, 
+        custo_adicional_id INTEGER NOT NULL,
+        quantidade_utilizada REAL NOT NULL,
+        FOREIGN KEY (receita_id) REFERENCES receitas (id) ON DELETE CASCADE,
+        FOREIGN KEY (custo_adicional_id) REFERENCES custos_adicionais (id) ON DELETE CASCADE )''')
+
+    # Tabelas Financeiras
+    cursor.execute('''CREATE TABLE IF NOT EXISTS despesas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        descricao TEXT NOT NULL, 
+        valor REAL NOT NULL,
+        data DATE NOT NULL, categoria TEXT )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS vendas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        data DATE NOT NULL, 
+        total_venda REAL NOT NULL, 
+        metodo_pagamento TEXT )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS produtos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        nome TEXT UNIQUE NOT NULL,
+        preco_venda REAL NOT NULL
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS produto_composicao (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        produto_id INTEGER NOT NULL,
+        receita_id INTEGER NOT NULL,
+        fracao_receita REAL NOT NULL,
+        FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE,
+        FOREIGN KEY (receita_id) REFERENCES receitas (id) ON DELETE CASCADE
+    )''')
+    cursor.execute('''CREATE TABLE IF NOT EXISTS venda_itens (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, 
+        venda_id INTEGER NOT NULL, 
+        produto_id INTEGER,
+        quantidade INTEGER NOT NULL, 
+        preco_unitario_venda REAL NOT NULL, 
+        custo_unitario_producao REAL NOT NULL,
+        FOREIGN KEY (venda_id) REFERENCES vendas (id) ON DELETE CASCADE,
+        FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE SET NULL )''')
+
+
+def _migracao_2_cache_custos(cursor):
+    # Tabelas de Cache de Custos (materializadas a partir das tabelas de custo).
+    # A ausência de uma linha significa "suja": ela é recalculada na próxima leitura.
+    cursor.execute('''CREATE TABLE IF NOT EXISTS custos_receitas_cache (
+        receita_id INTEGER PRIMARY KEY,
+        custo_lote REAL NOT NULL,
+        custo_unitario REAL NOT NULL,
+        FOREIGN KEY (receita_id) REFERENCES receitas (id) ON DELETE CASCADE )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS custos_produtos_cache (
+        produto_id INTEGER PRIMARY KEY,
+        custo_unitario REAL NOT NULL,
+        FOREIGN KEY (produto_id) REFERENCES produtos (id) ON DELETE CASCADE )''')
+
+
+def _backfill_resumos_v3(cursor):
+    # Back-fill dos resumos como era quando as migrações 3 e 5 foram escritas (antes de
+    # versao_dados e do arquivo morto). Fica congelado aqui: mudanças em resumos.py não
+    # podem alterar o que uma migração antiga faz num banco velho.
+    cursor.execute("DELETE FROM resumo_diario")
+    cursor.execute("DELETE FROM resumo_semanal")
+    cursor.execute("DELETE FROM resumo_produto_diario")
+    cursor.execute("""
+        INSERT INTO resumo_diario (data, total_vendido, total_gasto, total_quantidade, num_vendas)
+        SELECT data, SUM(total_vendido), SUM(total_gasto), SUM(total_quantidade), SUM(num_vendas)
+        FROM (
+            SELECT date(data) AS data, total_venda AS total_vendido, 0 AS total_gasto,
+                   0 AS total_quantidade, 1 AS num_vendas
+            FROM vendas
+            UNION ALL
+            SELECT date(v.data), 0, 0, vi.quantidade, 0
+            FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+            UNION ALL
+            SELECT date(data), 0, valor, 0, 0
+            FROM despesas
+        )
+        GROUP BY data
+    """)
+    cursor.execute("""
+        INSERT INTO resumo_semanal (semana, total_vendido, total_gasto, total_quantidade, num_vendas)
+        SELECT date(data, 'weekday 0', '-6 days'), SUM(total_vendido), SUM(total_gasto),
+               SUM(total_quantidade), SUM(num_vendas)
+        FROM resumo_diario
+        GROUP BY 1
+    """)
+    cursor.execute("""
+        INSERT INTO resumo_produto_diario (data, produto_id, total_quantidade, total_vendido, total_lucro_bruto)
+        SELECT date(v.data), COALESCE(vi.produto_id, 0),
+               SUM(vi.quantidade),
+               SUM(vi.preco_unitario_venda * vi.quantidade),
+               SUM((vi.preco_unitario_venda - vi.custo_unitario_producao) * vi.quantidade)
+        FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+        GROUP BY 1, 2
+    """)
+
+
+def _migracao_3_resumos_financeiros(cursor):
+    # Tabelas de Resumo Financeiro (rollups mantidos a cada venda/despesa)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS resumo_diario (
+        data DATE PRIMARY KEY,
+        total_vendido REAL NOT NULL DEFAULT 0,
+        total_gasto REAL NOT NULL DEFAULT 0,
+        total_quantidade INTEGER NOT NULL DEFAULT 0,
+        num_vendas INTEGER NOT NULL DEFAULT 0 )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS resumo_semanal (
+        semana DATE PRIMARY KEY,
+        total_vendido REAL NOT NULL DEFAULT 0,
+        total_gasto REAL NOT NULL DEFAULT 0,
+        total_quantidade INTEGER NOT NULL DEFAULT 0,
+        num_vendas INTEGER NOT NULL DEFAULT 0 )''')
+
+    cursor.execute('''CREATE TABLE IF NOT EXISTS resumo_produto_diario (
+        data DATE NOT NULL,
+        produto_id INTEGER NOT NULL,
+        total_quantidade INTEGER NOT NULL DEFAULT 0,
+        total_vendido REAL NOT NULL DEFAULT 0,
+        total_lucro_bruto REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (data, produto_id) )''')
+
+    # Banco antigo (com histórico mas sem resumos): faz o back-fill
+    _backfill_resumos_v3(cursor)
+
+
+def _migracao_4_indices(cursor):
+    # Chaves estrangeiras usadas em todos os cálculos de custo e na invalidação do cache
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_receita_ingredientes_receita ON receita_ingredientes (receita_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_receita_ingredientes_ingrediente ON receita_ingredientes (ingrediente_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_receita_custos_receita ON receita_custos_adicionais (receita_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_receita_custos_custo ON receita_custos_adicionais (custo_adicional_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produto_composicao_produto ON produto_composicao (produto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produto_composicao_receita ON produto_composicao (receita_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_venda_itens_venda ON venda_itens (venda_id)")
+    # (data, id) cobre os filtros por faixa de data e o ORDER BY data DESC, id DESC das listagens
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas (data, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_despesas_data ON despesas (data, id)")
+
+
+def _migracao_5_limpa_orfaos(cursor):
+    # Até aqui as conexões não ativavam 'PRAGMA foreign_keys', então os ON DELETE do
+    # schema nunca rodaram. Aplica agora o efeito que eles teriam tido nas linhas órfãs.
+    # (Os cálculos de custo e os resumos já ignoravam essas linhas via JOIN.)
+    cursor.execute("DELETE FROM venda_itens WHERE venda_id NOT IN (SELECT id FROM vendas)")
+    cursor.execute("""UPDATE venda_itens SET produto_id = NULL
+                      WHERE produto_id IS NOT NULL AND produto_id NOT IN (SELECT id FROM produtos)""")
+    cursor.execute("""DELETE FROM produto_composicao
+                      WHERE produto_id NOT IN (SELECT id FROM produtos)
+                         OR receita_id NOT IN (SELECT id FROM receitas)""")
+    cursor.execute("""DELETE FROM receita_ingredientes
+                      WHERE receita_id NOT IN (SELECT id FROM receitas)
+                         OR ingrediente_id NOT IN (SELECT id FROM ingredientes)""")
+    cursor.execute("""DELETE FROM receita_custos_adicionais
+                      WHERE receita_id NOT IN (SELECT id FROM receitas)
+                         OR custo_adicional_id NOT IN (SELECT id FROM custos_adicionais)""")
+    cursor.execute("DELETE FROM custos_receitas_cache WHERE receita_id NOT IN (SELECT id FROM receitas)")
+    cursor.execute("DELETE FROM custos_produtos_cache WHERE produto_id NOT IN (SELECT id FROM produtos)")
+    # Itens que perderam o produto passam para o grupo "produto excluído" (id 0) dos resumos
+    _backfill_resumos_v3(cursor)
+
+
+def _migracao_6_versao_dados(cursor):
+    # Contador incrementado a cada escrita que muda o dashboard (usado como chave de cache)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS versao_dados (
+        dominio TEXT PRIMARY KEY,
+        versao INTEGER NOT NULL DEFAULT 0 )''')
+    cursor.execute("INSERT OR IGNORE INTO versao_dados (dominio, versao) VALUES ('financeiro', 0)")
+
+
+def _migracao_7_tarefas(cursor):
+    # Fila das tarefas em segundo plano (ver tarefas.py)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS tarefas (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT NOT NULL,
+        parametros TEXT NOT NULL DEFAULT '{}',
+        status TEXT NOT NULL DEFAULT 'pendente',
+        progresso REAL NOT NULL DEFAULT 0,
+        mensagem TEXT,
+        resultado TEXT,
+        criada_em TIMESTAMP NOT NULL,
+        iniciada_em TIMESTAMP,
+        concluida_em TIMESTAMP )''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tarefas_status ON tarefas (status, id)")
+
+
+def _migracao_8_meses_arquivados(cursor):
+    # Meses cujas vendas/despesas foram movidas para o arquivo morto em Parquet (ver arquivamento.py)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS meses_arquivados (
+        mes TEXT PRIMARY KEY,
+        vendas INTEGER NOT NULL DEFAULT 0,
+        venda_itens INTEGER NOT NULL DEFAULT 0,
+        despesas INTEGER NOT NULL DEFAULT 0,
+        arquivado_em TIMESTAMP NOT NULL )''')
+
+
+def _migracao_9_custos_sujos(cursor):
+    # Contador de entradas do cache de custos por recalcular (ver custos.atualizar_cache_custos).
+    # Os triggers pegam toda escrita que deixa o cache incompleto: invalidação (DELETE direto
+    # ou em cascata) e receita/produto novo, que ainda não tem linha no cache.
+    cursor.execute("INSERT OR IGNORE INTO versao_dados (dominio, versao) VALUES ('custos_sujos', 1)")
+    for nome, evento in (('receita_nova', 'AFTER INSERT ON receitas'),
+                         ('produto_novo', 'AFTER INSERT ON produtos'),
+                         ('cache_receita_invalidado', 'AFTER DELETE ON custos_receitas_cache'),
+                         ('cache_produto_invalidado', 'AFTER DELETE ON custos_produtos_cache')):
+        cursor.execute(f"""CREATE TRIGGER IF NOT EXISTS trg_custos_sujos_{nome} {evento}
+                           BEGIN UPDATE versao_dados SET versao = versao + 1 WHERE dominio = 'custos_sujos'; END""")
+
+
+def _migracao_10_dono_tarefas(cursor):
+    # Quem está executando cada tarefa ('host:pid') e quando deu sinal de vida pela última vez:
+    # só volta para a fila a tarefa cujo processo morreu (ver tarefas._reservar_proxima_tarefa)
+    cursor.execute("ALTER TABLE tarefas ADD COLUMN executor TEXT")
+    cursor.execute("ALTER TABLE tarefas ADD COLUMN batimento_em TIMESTAMP")
+
+
+MIGRACOES = [
+    (1, _migracao_1_schema_base),
+    (2, _migracao_2_cache_custos),
+    (3, _migracao_3_resumos_financeiros),
+    (4, _migracao_4_indices),
+    (5, _migracao_5_limpa_orfaos),
+    (6, _migracao_6_versao_dados),
+    (7, _migracao_7_tarefas),
+    (8, _migracao_8_meses_arquivados),
+    (9, _migracao_9_custos_sujos),
+    (10, _migracao_10_dono_tarefas),
+]
+
+
+def aplicar_migracoes(db, ate_versao=None):
+    """Aplica, em ordem, as migrações ainda não aplicadas. Retorna a versão final do schema.
+
+    Cada migração roda na sua própria transação (BEGIN IMMEDIATE), junto com a
+    atualização do user_version: ou ela é aplicada por inteiro, ou nada muda.
+    """
+    cursor = db.cursor()
+    for numero, migracao in MIGRACOES:
+        if ate_versao is not None and numero > ate_versao:
+            break
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] >= numero:
+            continue
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Relê a versão já com o lock: outro worker pode ter migrado antes
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] >= numero:
+                db.rollback()
+                continue
+            migracao(cursor)
+            cursor.execute(f"PRAGMA user_version = {numero}")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    cursor.execute("PRAGMA user_version")
+    return cursor.fetchone()[0]
+
+
+def init_db():
+    """Aplica as migrações pendentes no banco do app atual (precisa de um app context)."""
+    versao = aplicar_migracoes(get_db())
+    _bancos_migrados.add(current_app.config['DATABASE'])
+    print(f"Banco de dados inicializado com sucesso! (schema versão {versao})")
+
+
+@click.command("migrar")
+@with_appcontext
+def migrar_command():
+    """Aplica as migrações pendentes no banco de dados."""
+    init_db()
@@ -0,0 +1,160 @@
+"""
+Exportação (CSV / XLSX).
+
+As exportações são geradores: as linhas saem do SQLite em lotes (fetchmany) e
+são escritas na resposta aos poucos, então a memória fica constante mesmo para
+anos de histórico. As queries seguem a ordem dos índices (sem ordenação temporária).
+O tamanho do lote vem do config (TAMANHO_LOTE_EXPORTACAO). As linhas dos meses
+já arquivados em Parquet (arquivamento.py) saem antes das que estão no banco.
+"""
+import csv
+import io
+import tempfile
+import time
+from datetime import timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .arquivamento import gerar_linhas_exportacao_arquivadas
+from .custos import atualizar_cache_custos
+from .db import get_db
+
+
+EXPORTACOES = {
+    # nome: (SQL, filtra por periodo?)
+    'vendas': ("""
+        SELECT v.id AS venda_id, v.data, v.metodo_pagamento, v.total_venda AS total_venda,
+               vi.produto_id, COALESCE(p.nome, 'Produto Excluído') AS produto, vi.quantidade,
+               vi.preco_unitario_venda, vi.custo_unitario_producao,
+               vi.preco_unitario_venda * vi.quantidade AS total_item,
+               (vi.preco_unitario_venda - vi.custo_unitario_producao) * vi.quantidade AS lucro_bruto_item
+        FROM vendas v
+        JOIN venda_itens vi ON vi.venda_id = v.id
+        LEFT JOIN produtos p ON p.id = vi.produto_id
+        WHERE v.data >= ? AND v.data < ?
+        ORDER BY v.data, v.id, vi.id
+    """, True),
+    'despesas': ("""
+        SELECT id AS despesa_id, data, descricao, categoria, valor
+        FROM despesas
+        WHERE data >= ? AND data < ?
+        ORDER BY data, id
+    """, True),
+    'custos': ("""
+        SELECT p.id AS produto_id, p.nome AS produto, p.preco_venda,
+               COALESCE(c.custo_unitario, 0) AS custo_producao,
+               p.preco_venda - COALESCE(c.custo_unitario, 0) AS margem_bruta,
+               CASE WHEN p.preco_venda > 0
+                    THEN (p.preco_venda - COALESCE(c.custo_unitario, 0)) / p.preco_venda END AS margem_pct
+        FROM produtos p
+        LEFT JOIN custos_produtos_cache c ON c.produto_id = p.id
+        ORDER BY p.nome
+    """, False),
+    # Tabela de preços atual, nas colunas que a atualização de preços (importacao.py) lê: serve de modelo
+    'ingredientes': ("""
+        SELECT nome, preco_embalagem, quant_embalagem
+        FROM ingredientes
+        ORDER BY nome
+    """, False),
+}
+
+
+def gerar_linhas_exportacao(nome, data_inicio=None, data_fim=None):
+    """Gera o cabeçalho e depois as linhas (tuplas) da exportação, em lotes de fetchmany."""
+    sql, filtra_periodo = EXPORTACOES[nome]
+    params = ()
+    if filtra_periodo:
+        params = (data_inicio.isoformat() if data_inicio else '0000-01-01',
+                  (data_fim + timedelta(days=1)).isoformat() if data_fim else '9999-12-31')
+    if nome == 'custos':
+        atualizar_cache_custos()  # A planilha de custos sai do cache materializado
+
+    tamanho_lote = current_app.config['TAMANHO_LOTE_EXPORTACAO']
+    cursor = get_db().cursor()
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    yield tuple(coluna[0] for coluna in cursor.description)
+    yield from gerar_linhas_exportacao_arquivadas(nome, data_inicio, data_fim)
+    while True:
+        lote = cursor.fetchmany(tamanho_lote)
+        if not lote:
+            break
+        yield from lote
+
+
+def gerar_csv(linhas):
+    """Converte as linhas em pedaços de texto CSV (um pedaço por lote de linhas)."""
+    tamanho_lote = current_app.config['TAMANHO_LOTE_EXPORTACAO']
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    for numero, linha in enumerate(linhas, start=1):
+        escritor.writerow(linha)
+        if numero % tamanho_lote == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gerar_xlsx(linhas, titulo):
+    """Gera o XLSX em pedaços de bytes.
+
+    O openpyxl em modo write_only grava as linhas direto num arquivo temporário
+    (memória constante); o arquivo é então enviado em blocos.
+    """
+    try:
+        import openpyxl  # Opcional: só é necessário para exportar em .xlsx
+    except ImportError:
+        raise ValueError("Para exportar em .xlsx instale o pacote openpyxl (ou use CSV).")
+    planilha = openpyxl.Workbook(write_only=True)
+    aba = planilha.create_sheet(titulo)
+    for linha in linhas:
+        aba.append(linha)
+    with tempfile.TemporaryFile() as arquivo:
+        planilha.save(arquivo)
+        arquivo.seek(0)
+        while True:
+            bloco = arquivo.read(64 * 1024)
+            if not bloco:
+                break
+            yield bloco
+
+
+def exportar_para_arquivo(nome, formato, destino, data_inicio=None, data_fim=None):
+    """Grava a exportação num arquivo (ou file-like) e retorna o número de linhas de dados."""
+    contador = {'linhas': -1}  # Não conta o cabeçalho
+
+    def linhas_contadas():
+        for linha in gerar_linhas_exportacao(nome, data_inicio, data_fim):
+            contador['linhas'] += 1
+            yield linha
+
+    if formato == 'xlsx':
+        for bloco in gerar_xlsx(linhas_contadas(), nome):
+            destino.write(bloco)
+    else:
+        for pedaco in gerar_csv(linhas_contadas()):
+            destino.write(pedaco)
+    return contador['linhas']
+
+
+@click.command("exportar")
+@with_appcontext
+@click.argument("nome", type=click.Choice(list(EXPORTACOES)))
+@click.option("--formato", type=click.Choice(['csv', 'xlsx']), default='csv')
+@click.option("--inicio", type=click.DateTime(formats=['%Y-%m-%d']), help="Data inicial (AAAA-MM-DD).")
+@click.option("--fim", type=click.DateTime(formats=['%Y-%m-%d']), help="Data final, inclusiva (AAAA-MM-DD).")
+@click.option("--saida", type=click.Path(dir_okay=False), help="Arquivo de saída (padrão: <nome>.<formato>).")
+def exportar_command(nome, formato, inicio, fim, saida):
+    """Exporta vendas (com itens), despesas, a planilha de custos ou a tabela de preços dos ingredientes."""
+    saida = saida or f"{nome}.{formato}"
+    inicio_exportacao = time.perf_counter()
+    if formato == 'xlsx':
+        with open(saida, 'wb') as destino:
+            linhas = exportar_para_arquivo(nome, formato, destino, inicio and inicio.date(), fim and fim.date())
+    else:
+        with open(saida, 'w', newline='', encoding='utf-8') as destino:
+            linhas = exportar_para_arquivo(nome, formato, destino, inicio and inicio.date(), fim and fim.date())
+    print(f"{linhas} linhas exportadas para {saida} em {time.perf_counter() - inicio_exportacao:.2f}s")
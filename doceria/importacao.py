@@ -0,0 +1,369 @@
+"""
+Entrada de dados em lote: planilhas de preços dos fornecedores e importação de vendas.
+"""
+import csv
+import io
+import json
+import time
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+
+from .custos import (calcular_custos_produtos, calcular_custos_receitas, calcular_custos_unitarios_receitas,
+                     get_custos_produtos_cache, get_custos_receitas_cache)
+from .dao import get_produtos, get_receitas, get_receitas_dos_ingredientes, get_todos_ingredientes
+from .db import blocos_de_ids, get_db
+from .resumos import _aplicar_lote_no_resumo_produto, _somar_nos_resumos
+
+
+# --- Leitura de Planilhas (CSV / XLSX) ---
+def _ler_numero(valor):
+    """Converte '12,50' ou '12.50' em float (planilhas em português usam vírgula)."""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    return float(str(valor).strip().replace(',', '.'))
+
+
+def _detectar_delimitador_csv(texto):
+    """Excel em português salva CSV com ';'. Decide pelo cabeçalho."""
+    cabecalho = texto.split('\n', 1)[0]
+    return ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+
+
+def ler_linhas_planilha(nome_arquivo, conteudo):
+    """Gera dicionários {coluna_minuscula: valor} de um CSV ou XLSX, uma linha por vez.
+
+    'conteudo' são os bytes do arquivo. O XLSX é lido em modo read_only (streaming),
+    sem carregar a planilha inteira na memória. Cada dicionário traz também '_linha'.
+    """
+    if nome_arquivo.lower().endswith('.xlsx'):
+        try:
+            import openpyxl  # Opcional: só é necessário para planilhas do Excel
+        except ImportError:
+            raise ValueError("Para ler arquivos .xlsx instale o pacote openpyxl (ou envie um CSV).")
+        planilha = openpyxl.load_workbook(io.BytesIO(conteudo), read_only=True, data_only=True)
+        try:
+            linhas = planilha.active.iter_rows(values_only=True)
+            colunas = [str(c or '').strip().lower() for c in next(linhas, ())]
+            for numero_linha, valores in enumerate(linhas, start=2):
+                if any(v not in (None, '') for v in valores):
+                    yield {'_linha': numero_linha, **dict(zip(colunas, valores))}
+        finally:
+            planilha.close()
+    else:
+        texto = conteudo.decode('utf-8-sig')
+        leitor = csv.DictReader(io.StringIO(texto), delimiter=_detectar_delimitador_csv(texto))
+        for numero_linha, linha in enumerate(leitor, start=2):
+            yield {'_linha': numero_linha,
+                   **{(chave or '').strip().lower(): (valor or '').strip() for chave, valor in linha.items()}}
+
+
+# --- Atualização de Preços de Ingredientes em Lote ---
+# Os fornecedores mandam a tabela de preços todo mês (centenas de itens). As linhas
+# (nome, preco_embalagem, quant_embalagem) são aplicadas numa ÚNICA transação com
+# executemany e o impacto é calculado com o cálculo em lote (sem loop por produto).
+def _diff_custos(ids, nomes, antes, depois):
+    """Lista [{id, nome, antes, depois, variacao, variacao_pct}] ordenada pela maior variação."""
+    diff = []
+    for item_id in ids:
+        custo_antes, custo_depois = antes.get(item_id, 0), depois.get(item_id, 0)
+        diff.append({
+            'id': item_id,
+            'nome': nomes.get(item_id, ''),
+            'antes': custo_antes,
+            'depois': custo_depois,
+            'variacao': custo_depois - custo_antes,
+            'variacao_pct': (custo_depois - custo_antes) / custo_antes if custo_antes else None,
+        })
+    diff.sort(key=lambda item: abs(item['variacao']), reverse=True)
+    return diff
+
+
+def atualizar_precos_ingredientes(linhas, simular=False):
+    """Aplica (ou, com simular=True, só pré-visualiza) uma tabela de preços de ingredientes.
+
+    'linhas' é um iterável de dicionários com nome, preco_embalagem e quant_embalagem
+    (opcional: sem ela a embalagem atual é mantida). Retorna o relatório com as linhas
+    rejeitadas e o antes/depois do custo unitário das receitas e produtos afetados.
+    """
+    inicio = time.perf_counter()
+    db = get_db()
+    cursor = db.cursor()
+
+    # 1. Validação: tudo é conferido antes de qualquer escrita
+    ingredientes_por_nome = {row['nome'].strip().lower(): row for row in get_todos_ingredientes()}
+    atualizacoes, rejeitadas = {}, []
+    for linha in linhas:
+        nome = str(linha.get('nome') or '').strip().lower()
+        ingrediente = ingredientes_por_nome.get(nome)
+        try:
+            if ingrediente is None:
+                raise ValueError(f"ingrediente não encontrado '{nome}'")
+            try:
+                preco = _ler_numero(linha.get('preco_embalagem'))
+            except (TypeError, ValueError):
+                raise ValueError(f"preço inválido '{linha.get('preco_embalagem')}'")
+            quantidade = linha.get('quant_embalagem')
+            try:
+                quantidade = ingrediente['quant_embalagem'] if quantidade in (None, '') else _ler_numero(quantidade)
+            except ValueError:
+                raise ValueError(f"quantidade da embalagem inválida '{quantidade}'")
+            if preco < 0 or quantidade <= 0:
+                raise ValueError("preço deve ser >= 0 e quantidade da embalagem > 0")
+        except ValueError as e:
+            rejeitadas.append({'linha': linha.get('_linha'), 'nome': nome, 'erro': str(e)})
+            continue
+        atualizacoes[ingrediente['id']] = (ingrediente, preco, quantidade)  # Nome repetido: vale a última linha
+
+    relatorio = {'ingredientes': [], 'receitas': [], 'produtos': [], 'rejeitadas': rejeitadas,
+                 'aplicado': False, 'segundos': 0}
+    if not atualizacoes:
+        relatorio['segundos'] = time.perf_counter() - inicio
+        return relatorio
+
+    # 2. Custos atuais (cache) e dependentes afetados
+    custos_lote_antes, custos_unitarios_antes = get_custos_receitas_cache()
+    custos_produtos_antes = get_custos_produtos_cache()
+    ingrediente_ids = list(atualizacoes)
+    receita_ids = get_receitas_dos_ingredientes(ingrediente_ids)
+    produto_ids = set()
+    for bloco in blocos_de_ids(receita_ids):
+        cursor.execute(f"""SELECT DISTINCT produto_id FROM produto_composicao
+                           WHERE receita_id IN ({','.join('?' for _ in bloco)})""", bloco)
+        produto_ids.update(row['produto_id'] for row in cursor.fetchall())
+    produto_ids = sorted(produto_ids)
+
+    # 3. Recálculo. A pré-visualização só lê: os preços novos entram no cálculo em memória
+    # e o lock de escrita não é pego. Na aplicação, os preços e os custos recalculados
+    # (já prontos para o relatório) vão para o banco e para o cache na mesma transação.
+    if simular:
+        precos = {ingrediente_id: (preco, quantidade)
+                  for ingrediente_id, (_, preco, quantidade) in atualizacoes.items()}
+        custos_lote_depois = {**custos_lote_antes, **calcular_custos_receitas(receita_ids, precos)}
+        custos_unitarios_depois = calcular_custos_unitarios_receitas(custos_lote_depois)
+        custos_produtos_depois = calcular_custos_produtos(custos_lote_depois)
+    else:
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.executemany("UPDATE ingredientes SET preco_embalagem = ?, quant_embalagem = ? WHERE id = ?",
+                               [(preco, quantidade, ingrediente_id)
+                                for ingrediente_id, (_, preco, quantidade) in atualizacoes.items()])
+            # Com o lock: uma receita editada no meio não deixa o cache com um custo velho
+            custos_lote_depois = {**custos_lote_antes, **calcular_custos_receitas(receita_ids)}
+            custos_unitarios_depois = calcular_custos_unitarios_receitas(custos_lote_depois)
+            custos_produtos_depois = calcular_custos_produtos(custos_lote_depois)
+            cursor.executemany("""INSERT OR REPLACE INTO custos_receitas_cache (receita_id, custo_lote, custo_unitario)
+                                  VALUES(?,?,?)""",
+                               [(receita_id, custos_lote_depois[receita_id], custos_unitarios_depois[receita_id])
+                                for receita_id in receita_ids])
+            cursor.executemany("INSERT OR REPLACE INTO custos_produtos_cache (produto_id, custo_unitario) VALUES(?,?)",
+                               [(produto_id, custos_produtos_depois[produto_id]) for produto_id in produto_ids])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+    # 4. Relatório (diff)
+    relatorio['ingredientes'] = [{
+        'nome': ingrediente['nome'],
+        'preco_antes': ingrediente['preco_embalagem'], 'preco_depois': preco,
+        'quant_antes': ingrediente['quant_embalagem'], 'quant_depois': quantidade,
+    } for ingrediente, preco, quantidade in atualizacoes.values()]
+    relatorio['receitas'] = _diff_custos(receita_ids, {r['id']: r['nome'] for r in get_receitas()},
+                                         custos_unitarios_antes, custos_unitarios_depois)
+    relatorio['produtos'] = _diff_custos(produto_ids, {p['id']: p['nome'] for p in get_produtos()},
+                                         custos_produtos_antes, custos_produtos_depois)
+    relatorio['aplicado'] = not simular
+    relatorio['segundos'] = time.perf_counter() - inicio
+    return relatorio
+
+
+@click.command("atualizar-precos")
+@with_appcontext
+@click.argument("arquivo", type=click.Path(exists=True, dir_okay=False))
+@click.option("--simular", is_flag=True, help="Só mostra o impacto, sem gravar.")
+def atualizar_precos_command(arquivo, simular):
+    """Atualiza os preços dos ingredientes a partir de um CSV ou XLSX (nome, preco_embalagem, quant_embalagem)."""
+    with open(arquivo, 'rb') as f:
+        relatorio = atualizar_precos_ingredientes(ler_linhas_planilha(arquivo, f.read()), simular=simular)
+    acao = "simulados" if simular else "atualizados"
+    print(f"{len(relatorio['ingredientes'])} ingredientes {acao} em {relatorio['segundos']:.2f}s")
+    for titulo, chave in (("Receitas (custo por unidade)", 'receitas'), ("Produtos (custo de produção)", 'produtos')):
+        print(f"\n{titulo}:")
+        for item in relatorio[chave]:
+            pct = f"{item['variacao_pct'] * 100:+.1f}%" if item['variacao_pct'] is not None else "n/a"
+            print(f"  {item['nome']}: R$ {item['antes']:.2f} -> R$ {item['depois']:.2f} ({pct})")
+    for rejeitada in relatorio['rejeitadas']:
+        print(f"  Rejeitada linha {rejeitada['linha']}: {rejeitada['erro']}")
+
+
+# --- Importação de Vendas em Lote ---
+# Para feiras e conciliação de apps de delivery: centenas de pedidos num único arquivo.
+# Os pedidos são validados antes de qualquer escrita; os válidos entram com executemany
+# numa ÚNICA transação e os inválidos voltam no relatório com o motivo.
+FORMATOS_DATA_IMPORTACAO = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+def ler_vendas_csv(texto):
+    """Lê um CSV com uma linha por item e agrupa as linhas do mesmo 'pedido' numa venda.
+
+    Colunas: pedido, data, metodo_pagamento, produto (id ou nome), quantidade, preco_venda (opcional).
+    Sem a coluna 'pedido', cada linha vira uma venda.
+    """
+    vendas = {}
+    leitor = csv.DictReader(io.StringIO(texto), delimiter=_detectar_delimitador_csv(texto))
+    for numero_linha, linha in enumerate(leitor, start=2):
+        linha = {(chave or '').strip().lower(): (valor or '').strip() for chave, valor in linha.items()}
+        pedido = linha.get('pedido') or f"linha {numero_linha}"
+        if pedido not in vendas:
+            vendas[pedido] = {'pedido': pedido, 'data': linha.get('data'),
+                              'metodo_pagamento': linha.get('metodo_pagamento'), 'itens': []}
+        vendas[pedido]['itens'].append({'produto': linha.get('produto') or linha.get('produto_id'),
+                                        'quantidade': linha.get('quantidade'),
+                                        'preco_venda': linha.get('preco_venda')})
+    return list(vendas.values())
+
+
+def ler_vendas_json(texto):
+    """Lê [{data, metodo_pagamento, itens: [{produto_id|produto, quantidade, preco_venda}]}] ou {"vendas": [...]}."""
+    dados = json.loads(texto)
+    if isinstance(dados, dict):
+        dados = dados.get('vendas', [])
+    if not isinstance(dados, list):
+        raise ValueError("esperada uma lista de vendas ou {\"vendas\": [...]}")
+    vendas = []
+    for posicao, venda in enumerate(dados, start=1):
+        itens = (venda.get('itens') or []) if isinstance(venda, dict) else None
+        if not isinstance(itens, list) or not all(isinstance(item, dict) for item in itens):
+            raise ValueError(f"venda {posicao}: esperado {{data, metodo_pagamento, itens: [{{...}}]}}")
+        itens = [{'produto': item.get('produto_id', item.get('produto')),
+                  'quantidade': item.get('quantidade'),
+                  'preco_venda': item.get('preco_venda')} for item in itens]
+        vendas.append({'pedido': str(venda.get('pedido') or f"venda {posicao}"), 'data': venda.get('data'),
+                       'metodo_pagamento': venda.get('metodo_pagamento'), 'itens': itens})
+    return vendas
+
+
+def _validar_venda_importada(venda, produtos_por_id, produtos_por_nome, custos_produtos):
+    """Retorna (data, metodo, [(produto_id, qtd, preco, custo)]) ou lança ValueError com o motivo."""
+    data = None
+    for formato in FORMATOS_DATA_IMPORTACAO:
+        try:
+            data = datetime.strptime(str(venda['data'] or '').strip(), formato).date().isoformat()
+            break
+        except ValueError:
+            continue
+    if data is None:
+        raise ValueError(f"data inválida '{venda['data']}'")
+    if not venda['itens']:
+        raise ValueError("venda sem itens")
+
+    itens = []
+    for item in venda['itens']:
+        referencia = str(item['produto'] if item['produto'] is not None else '').strip()
+        produto = (produtos_por_id.get(int(referencia)) if referencia.isdigit()
+                   else produtos_por_nome.get(referencia.lower()))
+        if produto is None:
+            raise ValueError(f"produto não encontrado '{referencia}'")
+        try:
+            quantidade = _ler_numero(item['quantidade'])
+        except (TypeError, ValueError):
+            raise ValueError(f"quantidade inválida '{item['quantidade']}'")
+        if quantidade <= 0 or quantidade != int(quantidade):
+            raise ValueError(f"quantidade inválida '{item['quantidade']}'")
+        if item['preco_venda'] in (None, ''):
+            preco = produto['preco_venda']  # Sem preço no arquivo: usa o preço de tabela
+        else:
+            try:
+                preco = _ler_numero(item['preco_venda'])
+            except ValueError:
+                raise ValueError(f"preço inválido '{item['preco_venda']}'")
+            if preco < 0:
+                raise ValueError(f"preço inválido '{item['preco_venda']}'")
+        itens.append((produto['id'], int(quantidade), preco, custos_produtos.get(produto['id'], 0)))
+    return data, venda['metodo_pagamento'] or 'Outro', itens
+
+
+def importar_vendas(vendas):
+    """Valida e grava um lote de vendas numa única transação. Retorna o relatório da importação."""
+    inicio = time.perf_counter()
+    db = get_db()
+
+    # 1. Custos e produtos resolvidos UMA vez para o lote inteiro
+    custos_produtos = get_custos_produtos_cache()
+    produtos = get_produtos()
+    produtos_por_id = {p['id']: p for p in produtos}
+    produtos_por_nome = {p['nome'].strip().lower(): p for p in produtos}
+
+    # 2. Validação (nada é gravado ainda)
+    validas, rejeitadas = [], []
+    for venda in vendas:
+        try:
+            validas.append(_validar_venda_importada(venda, produtos_por_id, produtos_por_nome, custos_produtos))
+        except ValueError as e:
+            rejeitadas.append({'pedido': venda['pedido'], 'erro': str(e)})
+
+    # 3. Gravação em lote: ids reservados com o lock de escrita já obtido
+    num_itens = 0
+    total_vendido = 0
+    if validas:
+        cursor = db.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            cursor.execute("""SELECT MAX(COALESCE((SELECT MAX(id) FROM vendas), 0),
+                                     COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'vendas'), 0))""")
+            primeiro_id = cursor.fetchone()[0] + 1
+            linhas_vendas, linhas_itens = [], []
+            resumo_por_dia = {}
+            for venda_id, (data, metodo, itens) in enumerate(validas, start=primeiro_id):
+                total_venda = sum(quantidade * preco for _, quantidade, preco, _ in itens)
+                linhas_vendas.append((venda_id, data, total_venda, metodo))
+                linhas_itens.extend((venda_id, *item) for item in itens)
+                dia = resumo_por_dia.setdefault(data, [0, 0, 0])
+                dia[0] += total_venda
+                dia[1] += sum(quantidade for _, quantidade, _, _ in itens)
+                dia[2] += 1
+            cursor.executemany("INSERT INTO vendas (id, data, total_venda, metodo_pagamento) VALUES(?,?,?,?)",
+                               linhas_vendas)
+            cursor.executemany("""INSERT INTO venda_itens
+                                  (venda_id, produto_id, quantidade, preco_unitario_venda, custo_unitario_producao)
+                                  VALUES(?,?,?,?,?)""", linhas_itens)
+
+            # 4. Resumos: um upsert por dia do lote e um INSERT ... SELECT para os produtos
+            for data, (vendido, quantidade, num_vendas) in resumo_por_dia.items():
+                _somar_nos_resumos(cursor, data, total_vendido=vendido, total_quantidade=quantidade,
+                                   num_vendas=num_vendas)
+            _aplicar_lote_no_resumo_produto(cursor, primeiro_id, primeiro_id + len(validas) - 1)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        num_itens = len(linhas_itens)
+        total_vendido = sum(linha[2] for linha in linhas_vendas)
+
+    segundos = time.perf_counter() - inicio
+    return {
+        'vendas_importadas': len(validas),
+        'itens_importados': num_itens,
+        'total_vendido': total_vendido,
+        'rejeitadas': rejeitadas,
+        'segundos': segundos,
+        'vendas_por_segundo': len(validas) / segundos if segundos > 0 else 0,
+    }
+
+
+@click.command("import-vendas")
+@with_appcontext
+@click.argument("arquivo", type=click.Path(exists=True, dir_okay=False))
+def import_vendas_command(arquivo):
+    """Importa vendas em lote de um arquivo CSV ou JSON."""
+    with open(arquivo, encoding='utf-8-sig') as f:
+        texto = f.read()
+    vendas = ler_vendas_json(texto) if arquivo.lower().endswith('.json') else ler_vendas_csv(texto)
+    relatorio = importar_vendas(vendas)
+    print(f"{relatorio['vendas_importadas']} vendas ({relatorio['itens_importados']} itens, "
+          f"R$ {relatorio['total_vendido']:.2f}) importadas em {relatorio['segundos']:.2f}s "
+          f"({relatorio['vendas_por_segundo']:.0f} vendas/s)")
+    for rejeitada in relatorio['rejeitadas']:
+        print(f"  Rejeitada {rejeitada['pedido']}: {rejeitada['erro']}")
@@ -0,0 +1,130 @@
+"""
+Instrumentação (opcional) de requests e comandos SQL.
+
+Com INSTRUMENTACAO=1 as conexões são abertas com uma factory que cronometra cada
+comando SQL (execute + fetch) e cada request é medido. Os números saem em /metrics
+(formato Prometheus) e no header Server-Timing. Desligada (padrão), nada disso é
+registrado: a conexão é a sqlite3.Connection normal e não há hooks por request.
+Os hooks e a rota /metrics são registrados por create_app.
+"""
+import sqlite3
+import threading
+import time
+
+from flask import Response, current_app, request
+
+_metricas_lock = threading.Lock()
+_metricas_rotas = {}  # (endpoint, metodo, status) -> [requests, segundos, comandos_sql, segundos_sql]
+_metricas_sql = {}  # sql normalizado -> [execucoes, segundos, maior_tempo]
+_metricas_request = threading.local()  # Contadores do request em andamento nesta thread
+
+
+def _registrar_sql(sql, segundos):
+    atual = getattr(_metricas_request, 'atual', None)
+    if atual is not None:
+        atual['comandos_sql'] += 1
+        atual['segundos_sql'] += segundos
+    sql = ' '.join(sql.split())[:200]
+    with _metricas_lock:
+        estatistica = _metricas_sql.setdefault(sql, [0, 0.0, 0.0])
+        estatistica[0] += 1
+        estatistica[1] += segundos
+        estatistica[2] = max(estatistica[2], segundos)
+
+
+class _CursorInstrumentado(sqlite3.Cursor):
+    """Cursor que cronometra o execute e os fetch* (o SQLite só percorre as linhas no fetch)."""
+
+    def _medir(self, metodo, sql, *args):
+        inicio = time.perf_counter()
+        try:
+            return metodo(*args)
+        finally:
+            _registrar_sql(sql, time.perf_counter() - inicio)
+
+    def execute(self, sql, parametros=()):
+        self._sql = sql
+        return self._medir(super().execute, sql, sql, parametros)
+
+    def executemany(self, sql, parametros):
+        self._sql = sql
+        return self._medir(super().executemany, sql, sql, parametros)
+
+    def fetchone(self):
+        return self._medir(super().fetchone, getattr(self, '_sql', ''))
+
+    def fetchmany(self, *args):
+        return self._medir(super().fetchmany, getattr(self, '_sql', ''), *args)
+
+    def fetchall(self):
+        return self._medir(super().fetchall, getattr(self, '_sql', ''))
+
+
+class _ConexaoInstrumentada(sqlite3.Connection):
+    """Conexão cujos cursores (inclusive os de db.execute e do pandas) são instrumentados."""
+
+    def cursor(self, factory=_CursorInstrumentado):
+        return super().cursor(factory)
+
+
+def _iniciar_medicao_request():
+    _metricas_request.atual = {'inicio': time.perf_counter(), 'comandos_sql': 0, 'segundos_sql': 0.0}
+
+
+def _finalizar_medicao_request(resposta):
+    atual = getattr(_metricas_request, 'atual', None)
+    if atual is None:
+        return resposta
+    _metricas_request.atual = None
+    segundos = time.perf_counter() - atual['inicio']
+    chave = (request.endpoint or 'desconhecido', request.method, resposta.status_code)
+    with _metricas_lock:
+        rota = _metricas_rotas.setdefault(chave, [0, 0.0, 0, 0.0])
+        rota[0] += 1
+        rota[1] += segundos
+        rota[2] += atual['comandos_sql']
+        rota[3] += atual['segundos_sql']
+    # Respostas em streaming (exportações) ainda não terminaram aqui: o valor cobre só o início
+    resposta.headers['Server-Timing'] = (
+        f'app;dur={segundos * 1000:.1f}, '
+        f'sql;dur={atual["segundos_sql"] * 1000:.1f};desc="{atual["comandos_sql"]} comandos"')
+    return resposta
+
+
+def _rotulo_prometheus(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def gerar_metricas_prometheus(max_sql=20):
+    """Texto no formato de exposição do Prometheus com as métricas por rota e os SQL mais lentos."""
+    with _metricas_lock:
+        rotas = {chave: list(valores) for chave, valores in _metricas_rotas.items()}
+        mais_lentos = sorted(_metricas_sql.items(), key=lambda item: item[1][1], reverse=True)[:max_sql]
+
+    linhas = []
+    metricas_rotas = (
+        ('doceria_http_requests_total', 'counter', 'Requests atendidos.', 0),
+        ('doceria_http_request_duration_seconds_total', 'counter', 'Tempo total gasto nos requests.', 1),
+        ('doceria_sql_statements_total', 'counter', 'Comandos SQL executados pelos requests.', 2),
+        ('doceria_sql_duration_seconds_total', 'counter', 'Tempo total de SQL (execute + fetch) nos requests.', 3),
+    )
+    for nome, tipo, ajuda, indice in metricas_rotas:
+        linhas += [f'# HELP {nome} {ajuda}', f'# TYPE {nome} {tipo}']
+        for (endpoint, metodo, status), valores in sorted(rotas.items()):
+            linhas.append(f'{nome}{{endpoint="{_rotulo_prometheus(endpoint)}",method="{metodo}",status="{status}"}} '
+                          f'{valores[indice]}')
+
+    metricas_sql = (
+        ('doceria_sql_statement_calls_total', 'counter', 'Execuções do comando SQL.', 0),
+        ('doceria_sql_statement_seconds_total', 'counter', 'Tempo total do comando SQL.', 1),
+        ('doceria_sql_statement_seconds_max', 'gauge', 'Execução mais lenta do comando SQL.', 2),
+    )
+    for nome, tipo, ajuda, indice in metricas_sql:
+        linhas += [f'# HELP {nome} {ajuda} (top {max_sql} por tempo total)', f'# TYPE {nome} {tipo}']
+        for sql, valores in mais_lentos:
+            linhas.append(f'{nome}{{sql="{_rotulo_prometheus(sql)}"}} {valores[indice]}')
+    return '\n'.join(linhas) + '\n'
+
+
+def metricas():
+    return Response(gerar_metricas_prometheus(current_app.config['METRICAS_MAX_SQL']), mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,328 @@
+"""
+Blueprint de operação: produtos, lançamentos financeiros, importação e exportação.
+"""
+import itertools
+import json
+from datetime import datetime
+
+from flask import (Blueprint, Response, flash, jsonify, redirect, render_template, request, stream_with_context,
+                   url_for)
+
+from .arquivamento import get_itens_vendas_arquivadas
+from .custos import get_produtos_com_custos
+from .dao import (add_despesa, add_produto, add_venda, delete_despesa, delete_produto, delete_venda,
+                  get_composicao_produto, get_despesas_pagina, get_itens_para_vendas, get_produto_by_id, get_produtos,
+                  get_receitas, get_vendas_pagina, update_produto)
+from .exportacao import EXPORTACOES, gerar_csv, gerar_linhas_exportacao, gerar_xlsx
+from .importacao import importar_vendas, ler_vendas_csv, ler_vendas_json
+from .tarefas import enfileirar_tarefa
+
+bp = Blueprint('operacoes', __name__)
+
+
+# --- Rotas de Produtos
+@bp.route("/produtos")
+def gerir_produtos():
+    produtos = get_produtos_com_custos()
+    return render_template("gerir_produtos.html", produtos=produtos)
+
+
+@bp.route("/produtos/novo", methods=['GET', 'POST'])
+def criar_produto():
+    if request.method == 'POST':
+        nome = request.form.get('nome')
+        try:
+            preco_venda = float(request.form.get('preco_venda'))
+        except (ValueError, TypeError):
+            flash("Preço de venda inválido.", "error")
+            return redirect(url_for('operacoes.criar_produto'))
+        composicao_json = request.form.get('composicao_json')
+        composicao = json.loads(composicao_json) if composicao_json else []
+        if not nome or not preco_venda or not composicao:
+            flash("Todos os campos são obrigatórios.", "error")
+            return render_template('criar_produto.html', receitas=get_receitas())
+        else:
+            produto_id = add_produto(nome, preco_venda, composicao)
+            if produto_id:
+                flash(f"Produto '{nome}' criado com sucesso!", "success")
+                return redirect(url_for('operacoes.gerir_produtos'))
+            else:
+                flash(f"Já existe um produto com o nome '{nome}'.", "error")
+                return render_template('criar_produto.html', receitas=get_receitas())
+    receitas = get_receitas()
+    return render_template('criar_produto.html', receitas=receitas)
+
+
+@bp.route("/produtos/excluir/<int:produto_id>", methods=['POST'])
+def excluir_produto(produto_id):
+    """Busca as informações no Banco de Dados"""
+    produto = get_produto_by_id(produto_id)
+    if produto:
+        delete_produto(produto_id)
+        flash(f"Produto '{produto['nome']}' excluído com sucesso.", "success")
+    else:
+        flash("Produto não encontrado.", "error")
+    return redirect(url_for('operacoes.gerir_produtos'))
+
+
+@bp.route("/produtos/editar/<int:produto_id>", methods=['GET', 'POST'])
+def editar_produto(produto_id):
+    # (Lógica da Etapa 3 da nossa explicação)
+    produto = get_produto_by_id(produto_id)
+    if not produto:
+        flash("Produto não encontrado!", "error")
+        return redirect(url_for('operacoes.gerir_produtos'))
+
+    if request.method == 'POST':
+        # (Lógica da Etapa 5 da nossa explicação)
+        nome = request.form.get('nome')
+        try:
+            preco_venda = float(request.form.get('preco_venda'))
+        except (ValueError, TypeError):
+            flash("Preço de venda inválido.", "error")
+            # Recarregar a página em caso de erro, buscando os dados novamente
+            composicao_atual = get_composicao_produto(produto_id)
+            todas_receitas = get_receitas()
+            composicao_list = [dict(row) for row in composicao_atual]  # Converte para dict
+            return render_template('editar_produto.html',
+                                   produto=produto,
+                                   composicao_json=json.dumps(composicao_list),
+                                   receitas=todas_receitas)
+
+        composicao_json = request.form.get('composicao_json')
+        composicao = json.loads(composicao_json) if composicao_json else []
+
+        if not nome or not preco_venda or not composicao:
+            flash("Todos os campos (Nome, Preço e Composição) são obrigatórios.", "error")
+        else:
+            # (Lógica da Etapa 6 da nossa explicação)
+            sucesso = update_produto(produto_id, nome, preco_venda, composicao)
+            if sucesso:
+                flash(f"Produto '{nome}' atualizado com sucesso!", "success")
+                return redirect(url_for('operacoes.gerir_produtos'))
+            else:
+                flash(f"Já existe um produto com o nome '{nome}'.", "error")
+
+        # Se chegou aqui, deu erro. Recarregar a página com os dados
+        composicao_atual = get_composicao_produto(produto_id)
+        todas_receitas = get_receitas()
+        composicao_list = [dict(row) for row in composicao_atual]
+        return render_template('editar_produto.html',
+                               produto=produto,
+                               composicao_json=json.dumps(composicao_list),
+                               receitas=todas_receitas)
+
+    # (Lógica da Etapa 3 da nossa explicação - Método GET)
+    # Busca os dados para preencher o formulário
+    composicao_atual = get_composicao_produto(produto_id)
+    todas_receitas = get_receitas()
+
+    # Precisamos converter o sqlite3.Row para um dict, para que o json.dumps funcione
+    composicao_list = [dict(row) for row in composicao_atual]
+
+    return render_template('editar_produto.html',
+                           produto=produto,
+                           # Passamos o JSON para o JavaScript
+                           composicao_json=json.dumps(composicao_list),
+                           # Passamos a lista de receitas para o dropdown
+                           receitas=todas_receitas)
+
+
+# --- Rotas Financeiras (Atualizadas) ---
+@bp.route("/financeiro/lancamentos", methods=['GET', 'POST'])
+def lancamentos_financeiros():
+    if request.method == 'POST':
+        form_type = request.form.get('form_type')
+        if form_type == 'venda':
+            try:
+                data = request.form.get('data_venda')
+                metodo_pagamento = request.form.get('metodo_pagamento')
+                itens_json = request.form.get('venda_itens_json')
+                venda_itens = json.loads(itens_json)
+                if not venda_itens:
+                    flash('Adicione pelo menos um item à venda.', 'error')
+                else:
+                    add_venda(venda_itens, data, metodo_pagamento)
+                    flash('Venda registada com sucesso!', 'success')
+            except Exception as e:
+                flash(f'Erro ao registar venda: {e}', 'error')
+
+        elif form_type == 'despesa':
+            try:
+                data = request.form.get('data_despesa')
+                descricao = request.form.get('descricao')
+                valor = float(request.form.get('valor'))
+                categoria = request.form.get('categoria')
+                add_despesa(descricao, valor, data, categoria)
+                flash('Despesa registada com sucesso!', 'success')
+            except Exception as e:
+                flash(f'Erro ao registar despesa: {e}', 'error')
+
+        return redirect(url_for('operacoes.lancamentos_financeiros'))
+
+    # --- LÓGICA GET (carrega produtos com o custo de produção já calculado em lote) ---
+    produtos = get_produtos_com_custos()
+    return render_template('lancamentos.html', produtos=produtos)
+
+
+@bp.route("/financeiro/importar_vendas", methods=['GET', 'POST'])
+def importar_vendas_view():
+    if request.method == 'POST':
+        # Integração (ex: app de delivery): corpo JSON, resposta JSON com o relatório
+        if request.is_json:
+            try:
+                vendas = ler_vendas_json(request.get_data(as_text=True))
+            except (ValueError, AttributeError) as e:
+                return jsonify({'erro': f'JSON inválido: {e}'}), 400
+            return jsonify(importar_vendas(vendas))
+
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo CSV ou JSON.', 'error')
+            return redirect(url_for('operacoes.importar_vendas_view'))
+        try:
+            texto = arquivo.read().decode('utf-8-sig')
+            if arquivo.filename.lower().endswith('.json'):
+                vendas = ler_vendas_json(texto)
+            else:
+                vendas = ler_vendas_csv(texto)
+            relatorio = importar_vendas(vendas)
+        except Exception as e:
+            flash(f'Erro ao importar vendas: {e}', 'error')
+            return redirect(url_for('operacoes.importar_vendas_view'))
+
+        if relatorio['vendas_importadas']:
+            flash(f"{relatorio['vendas_importadas']} vendas importadas com sucesso!", 'success')
+        if relatorio['rejeitadas']:
+            flash(f"{len(relatorio['rejeitadas'])} vendas rejeitadas (veja o relatório).", 'error')
+        return render_template('importar_vendas.html', relatorio=relatorio)
+
+    return render_template('importar_vendas.html', relatorio=None)
+
+
+@bp.route("/financeiro/gerir")
+def gerir_lancamentos():
+    # 1. Filtros e cursores da query string (cada lista tem o seu cursor)
+    filtros = {chave: request.args.get(chave, '') for chave in
+               ('start_date', 'end_date', 'metodo_pagamento', 'categoria', 'produto_id')}
+    try:
+        data_inicio = datetime.strptime(filtros['start_date'], '%Y-%m-%d').date() if filtros['start_date'] else None
+        data_fim = datetime.strptime(filtros['end_date'], '%Y-%m-%d').date() if filtros['end_date'] else None
+    except ValueError:
+        flash("Datas inválidas no filtro.", "error")
+        data_inicio = data_fim = None
+    por_pagina = min(max(request.args.get('por_pagina', 20, type=int), 1), 100)
+    produto_id = request.args.get('produto_id', type=int)
+
+    # 2. Busca só a página atual de cada lista (keyset: custo constante em qualquer profundidade)
+    vendas_pagina, proxima_vendas = get_vendas_pagina(
+        por_pagina, request.args.get('vendas_apos'), data_inicio, data_fim,
+        filtros['metodo_pagamento'] or None, produto_id)
+    despesas_pagina, proxima_despesas = get_despesas_pagina(
+        por_pagina, request.args.get('despesas_apos'), data_inicio, data_fim, filtros['categoria'] or None)
+
+    # 3. Busca TODOS os itens das vendas da página em UMA ÚNICA query (e os das vendas arquivadas nos Parquet)
+    arquivadas = [v for v in vendas_pagina if 'arquivada' in v.keys()]
+    itens_para_vendas = get_itens_para_vendas([v['id'] for v in vendas_pagina if 'arquivada' not in v.keys()])
+    itens_para_vendas += get_itens_vendas_arquivadas(arquivadas)
+
+    # 4. Agrupa os itens por venda_id em um dicionário (para consulta rápida)
+    itens_map = {}
+    for item in itens_para_vendas:
+        itens_map.setdefault(item['venda_id'], []).append(item)
+
+    # 5. "Enriquece" a lista de vendas, adicionando os itens a cada uma
+    vendas_enriquecidas = []
+    for venda_row in vendas_pagina:
+        venda_dict = dict(venda_row)  # Converte a linha do DB para um dicionário
+        # Adiciona a lista de itens (ou uma lista vazia se não houver)
+        venda_dict['itens'] = itens_map.get(venda_row['id'], [])
+        vendas_enriquecidas.append(venda_dict)
+
+    # 6. Links de navegação: mantêm os filtros e o cursor da outra lista
+    args_atuais = {chave: valor for chave, valor in request.args.items() if valor}
+    url_proxima_vendas = url_for('operacoes.gerir_lancamentos', **{**args_atuais, 'vendas_apos': proxima_vendas}) \
+        if proxima_vendas else None
+    url_proxima_despesas = url_for('operacoes.gerir_lancamentos', **{**args_atuais, 'despesas_apos': proxima_despesas}) \
+        if proxima_despesas else None
+
+    return render_template('gerir_lancamentos.html',
+                           vendas=vendas_enriquecidas,
+                           despesas=despesas_pagina,
+                           produtos=get_produtos(),
+                           filtros=filtros,
+                           por_pagina=por_pagina,
+                           paginando_vendas='vendas_apos' in args_atuais,
+                           paginando_despesas='despesas_apos' in args_atuais,
+                           url_proxima_vendas=url_proxima_vendas,
+                           url_proxima_despesas=url_proxima_despesas,
+                           url_inicio_vendas=url_for('operacoes.gerir_lancamentos', **{k: v for k, v in args_atuais.items()
+                                                                            if k != 'vendas_apos'}),
+                           url_inicio_despesas=url_for('operacoes.gerir_lancamentos', **{k: v for k, v in args_atuais.items()
+                                                                              if k != 'despesas_apos'}))
+
+
+@bp.route("/financeiro/excluir_venda/<int:venda_id>", methods=['POST'])
+def excluir_venda(venda_id):
+    try:
+        delete_venda(venda_id)
+        flash("Venda excluída com sucesso!", "success")
+    except Exception as e:
+        flash(f"Erro ao excluir venda: {e}", "error")
+    # CORREÇÃO AQUI:
+    return redirect(url_for('operacoes.gerir_lancamentos'))
+
+
+@bp.route("/financeiro/excluir_despesa/<int:despesa_id>", methods=['POST'])
+def excluir_despesa(despesa_id):
+    try:
+        delete_despesa(despesa_id)
+        flash("Despesa excluída com sucesso!", "success")
+    except Exception as e:
+        flash(f"Erro ao excluir despesa: {e}", "error")
+    # CORREÇÃO AQUI:
+    return redirect(url_for('operacoes.gerir_lancamentos'))
+
+
+@bp.route("/exportar/<nome>")
+def exportar(nome):
+    """Download de vendas, despesas, custos ou preços dos ingredientes. Query: formato=csv|xlsx, start_date, end_date.
+
+    Com assincrono=1 o arquivo é gerado por uma tarefa em segundo plano (ver /tarefas).
+    """
+    if nome not in EXPORTACOES:
+        return Response("Exportação não encontrada.", status=404)
+    formato = request.args.get('formato', 'csv')
+    try:
+        data_inicio = datetime.strptime(request.args['start_date'], '%Y-%m-%d').date() \
+            if request.args.get('start_date') else None
+        data_fim = datetime.strptime(request.args['end_date'], '%Y-%m-%d').date() \
+            if request.args.get('end_date') else None
+    except ValueError:
+        return Response("Datas inválidas. Use o formato AAAA-MM-DD.", status=400)
+
+    if request.args.get('assincrono'):
+        # Histórico grande: gera o arquivo em segundo plano e o download fica na tela de tarefas
+        enfileirar_tarefa('exportar', {'nome': nome, 'formato': 'xlsx' if formato == 'xlsx' else 'csv',
+                                       'inicio': data_inicio and data_inicio.isoformat(),
+                                       'fim': data_fim and data_fim.isoformat()})
+        flash("Exportação enviada para a fila. O arquivo aparece aqui quando ficar pronto.", "success")
+        return redirect(url_for('principal.tarefas'))
+
+    linhas = gerar_linhas_exportacao(nome, data_inicio, data_fim)
+    if formato == 'xlsx':
+        try:
+            corpo = gerar_xlsx(linhas, nome)
+            primeiro_bloco = next(corpo)  # Valida o openpyxl antes de começar a resposta
+        except ValueError as e:
+            return Response(str(e), status=400)
+        corpo = itertools.chain([primeiro_bloco], corpo)
+        mimetype = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    else:
+        corpo = gerar_csv(linhas)
+        mimetype = 'text/csv; charset=utf-8'
+
+    arquivo = f"{nome}_{datetime.now().strftime('%Y%m%d')}.{'xlsx' if formato == 'xlsx' else 'csv'}"
+    # stream_with_context mantém o app context (e a conexão em g) vivo enquanto o gerador roda
+    return Response(stream_with_context(corpo), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename="{arquivo}"'})
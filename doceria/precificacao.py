@@ -0,0 +1,326 @@
+"""
+Blueprint de precificação: receitas, seus ingredientes e custos, a simulação de cenários e a lista de compras.
+"""
+import time
+
+from flask import Blueprint, flash, jsonify, redirect, render_template, request, url_for
+
+from .custos import (calcular_custo_adicional_total, calcular_custo_ingrediente, calcular_custo_total_receita,
+                     compilar_grafo_custos, converter_para_gramas, get_mix_vendas, get_receitas_com_custos,
+                     simular_cenarios)
+from .dao import (add_custo_adicional_receita, add_ingrediente_receita, add_receita, delete_custo_adicional_receita,
+                  delete_ingrediente_receita, delete_receita, duplicar_receita_db, get_custo_adicional_receita_by_id,
+                  get_custos_adicionais, get_custos_adicionais_receita, get_ingrediente, get_ingrediente_receita_by_id,
+                  get_ingredientes_receita, get_receita, update_ingrediente_receita, update_receita)
+from .previsao import METODOS_PREVISAO, calcular_lista_compras
+from .tarefas import enfileirar_tarefa
+
+bp = Blueprint('precificacao', __name__)
+
+
+@bp.route("/receitas")
+def gerir_receitas():
+    receitas = get_receitas_com_custos()
+    return render_template('gerir_receitas.html', receitas=receitas)
+
+
+@bp.route("/criar_receita", methods=["GET", "POST"])
+def criar_receita():
+    if request.method == "POST":
+        nome_receita = request.form["nome_receita"].strip()
+        descricao = request.form["descricao"].strip()
+        try:
+            rendimento = int(request.form.get("rendimento", 1))
+            if rendimento <= 0: rendimento = 1
+        except (ValueError, TypeError):
+            rendimento = 1
+        if not nome_receita:
+            flash("O nome da receita nao pode estar vazio!", "error")
+            return render_template("criar_receita.html", nome_receita=nome_receita, descricao=descricao)
+        receita_id = add_receita(nome_receita, descricao, rendimento)
+        if receita_id is None:
+            flash(f"Ja existe uma receita com o nome '{nome_receita}'.", "error")
+            return render_template("criar_receita.html", nome_receita=nome_receita, descricao=descricao)
+        flash(f"Receita '{nome_receita}' criada com sucesso!", "success")
+        return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita_id))
+    return render_template("criar_receita.html")
+
+
+@bp.route("/editar_receita/<int:receita_id>", methods=["GET", "POST"])
+def editar_receita(receita_id):
+    receita = get_receita(receita_id)
+    if not receita:
+        flash("Receita não encontrada!", "error")
+        return redirect(url_for("precificacao.gerir_receitas"))
+    if request.method == "POST":
+        novo_nome = request.form["nome_receita"].strip()
+        nova_descricao = request.form["descricao"].strip()
+        try:
+            novo_rendimento = int(request.form.get("rendimento", 1))
+            if novo_rendimento <= 0: novo_rendimento = 1
+        except (ValueError, TypeError):
+            novo_rendimento = 1
+        if not novo_nome:
+            flash("O nome da receita não pode estar vazio!", "error")
+            return render_template("editar_receita.html", receita=receita)
+        if update_receita(receita_id, novo_nome, nova_descricao, novo_rendimento):
+            flash(f"Receita '{novo_nome}' atualizada com sucesso!", "success")
+            return redirect(url_for("precificacao.gerir_receitas"))
+        else:
+            flash(f"Já existe uma receita com o nome '{novo_nome}'.", "error")
+            receita_editada = {'id': receita_id, 'nome': novo_nome, 'descricao': nova_descricao,
+                               'rendimento': novo_rendimento}
+            return render_template("editar_receita.html", receita=receita_editada)
+    return render_template("editar_receita.html", receita=receita)
+
+
+@bp.route("/receitas/excluir/<int:receita_id>", methods=["POST"])
+def excluir_receita(receita_id):
+    receita = get_receita(receita_id)
+    if receita:
+        delete_receita(receita_id)
+        flash(f"Receita '{receita['nome']}' excluída com sucesso!", "success")
+    else:
+        flash("Receita não encontrada!", "error")
+    return redirect(url_for("precificacao.gerir_receitas"))
+
+
+@bp.route("/receitas/duplicar/<int:receita_id>", methods=["POST"])
+def duplicar_receita(receita_id):
+    nova_receita_id = duplicar_receita_db(receita_id)
+
+    if nova_receita_id:
+        flash("Receita duplicada com sucesso! Você está editando a cópia.", "success")
+        # Redireciona o usuário diretamente para a página de EDIÇÃO da nova cópia
+        return redirect(url_for('precificacao.editar_receita', receita_id=nova_receita_id))
+    else:
+        flash("Erro ao duplicar a receita.", "error")
+        return redirect(url_for('precificacao.gerir_receitas'))
+
+
+@bp.route("/receita/<int:receita_id>")
+def ver_receita(receita_id):
+    receita = get_receita(receita_id)
+    if not receita:
+        flash("Receita não encontrada!", "error")
+        return redirect(url_for("precificacao.gerir_receitas"))
+
+    # 1. Obter ingredientes e calcular o custo de CADA UM (necessário para a lista no HTML)
+    ingredientes_db = get_ingredientes_receita(receita_id)
+    ingredientes_com_custo = []
+    custo_ingredientes_total = 0
+
+    for ingr in ingredientes_db:
+        # Reutiliza suas funções de cálculo
+        qtd_gramas = converter_para_gramas(ingr['quantidade'], ingr['unidade'], ingr['densidade'])
+        custo_item = calcular_custo_ingrediente(ingr['preco_embalagem'], ingr['quant_embalagem'], qtd_gramas)
+
+        # Converte a linha do DB (sqlite3.Row) para um dicionário para podermos adicionar a chave 'custo'
+        ingr_dict = dict(ingr)
+        ingr_dict['custo'] = custo_item
+        ingredientes_com_custo.append(ingr_dict)
+
+        # Soma o custo total dos ingredientes
+        custo_ingredientes_total += custo_item
+
+    # 2. Obter custos adicionais (a lista)
+    custos_adicionais_db = get_custos_adicionais_receita(receita_id)
+
+    # 3. Calcular o total dos custos adicionais (usando sua função que já existe)
+    custo_adicional_total = calcular_custo_adicional_total(receita_id)
+
+    # 4. Calcular o Custo Total da Receita
+    custo_total = custo_ingredientes_total + custo_adicional_total
+
+
+    rendimento = receita['rendimento']
+
+    # Garante que o rendimento (que vem do DB) não é Nulo ou 0
+    if not rendimento or rendimento == 0:
+        rendimento = 1  # Evita erro de divisão por zero
+
+    custo_unitario = custo_total / rendimento
+    # ==============================================
+
+    # 5. Enviar tudo para o template
+    return render_template("ver_receita.html",
+                           receita=receita,
+                           ingredientes=ingredientes_com_custo,
+                           custos_adicionais=custos_adicionais_db,
+                           custo_ingredientes=custo_ingredientes_total,
+                           custo_adicional_total=custo_adicional_total,
+                           custo_total=custo_total,
+                           custo_unitario=custo_unitario)  # <-- Nova variável enviada
+
+
+@bp.route("/adicionar_ingredientes/<int:receita_id>", methods=["GET", "POST"])
+def adicionar_ingredientes(receita_id):
+    receita = get_receita(receita_id)
+    if not receita:
+        flash("Receita não encontrada!", "error")
+        return redirect(url_for("precificacao.gerir_receitas"))
+    if request.method == "POST":
+        nome_ingrediente = request.form["nome_ingrediente"].lower().strip()
+        try:
+            quantidade = float(request.form["quantidade"])
+        except ValueError:
+            flash("A quantidade deve ser um número.", "error")
+            return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita_id))
+        unidade = request.form["unidade"]
+        ingrediente_cadastrado = get_ingrediente(nome_ingrediente)
+        if not ingrediente_cadastrado:
+            return redirect(url_for("catalogo.novo_ingrediente", nome=nome_ingrediente, receita_id=receita_id,
+                                    quantidade_original=quantidade, unidade_original=unidade))
+        add_ingrediente_receita(receita_id, ingrediente_cadastrado['id'], quantidade, unidade)
+        flash(f"Ingrediente '{nome_ingrediente}' adicionado à receita!", "success")
+        return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita_id))
+    ingredientes_db = get_ingredientes_receita(receita_id)
+    custo_total = calcular_custo_total_receita(receita_id)
+    return render_template("adicionar_ingredientes.html",
+                           receita=receita,
+                           ingredientes=ingredientes_db,
+                           custo_total=custo_total)
+
+
+@bp.route("/editar_ingrediente/<int:ingrediente_receita_id>", methods=["GET", "POST"])
+def editar_ingrediente(ingrediente_receita_id):
+    ingrediente_receita = get_ingrediente_receita_by_id(ingrediente_receita_id)
+    if not ingrediente_receita:
+        flash("Ingrediente da receita não encontrado!", "error")
+        return redirect(url_for("precificacao.gerir_receitas"))
+    receita = get_receita(ingrediente_receita['receita_id'])
+    if request.method == "POST":
+        try:
+            nova_quantidade = float(request.form["quantidade"])
+        except ValueError:
+            flash("A quantidade deve ser um número.", "error")
+            return redirect(url_for("precificacao.editar_ingrediente", ingrediente_receita_id=ingrediente_receita_id))
+        nova_unidade = request.form["unidade"]
+        update_ingrediente_receita(ingrediente_receita_id, nova_quantidade, nova_unidade)
+        enfileirar_tarefa('recalcular_custos', unica=True)  # Recalcula a receita e os produtos fora do request
+        flash("Ingrediente atualizado com sucesso!", "success")
+        return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita['id']))
+    return render_template("editar_ingrediente.html",
+                           receita=receita,
+                           ingrediente=ingrediente_receita)
+
+
+@bp.route("/excluir_ingrediente/<int:ingrediente_receita_id>", methods=["POST"])
+def excluir_ingrediente(ingrediente_receita_id):
+    ingrediente_receita = get_ingrediente_receita_by_id(ingrediente_receita_id)
+    if ingrediente_receita:
+        receita_id = ingrediente_receita['receita_id']
+        delete_ingrediente_receita(ingrediente_receita_id)
+        flash("Ingrediente removido da receita!", "success")
+        return redirect(url_for("precificacao.adicionar_ingredientes", receita_id=receita_id))
+    flash("Ingrediente da receita não encontrado!", "error")
+    return redirect(url_for("precificacao.gerir_receitas"))
+
+
+@bp.route("/adicionar_custo_receita/<int:receita_id>", methods=["GET", "POST"])
+def adicionar_custo_receita(receita_id):
+    receita = get_receita(receita_id)
+    if not receita:
+        flash("Receita não encontrada!", "error")
+        return redirect(url_for('precificacao.gerir_receitas'))
+
+    if request.method == "POST":
+        try:
+            custo_id = int(request.form['custo_adicional_id'])
+            quantidade = float(request.form['quantidade_utilizada'])
+
+            if not custo_id or quantidade <= 0:
+                flash("Selecione um custo e uma quantidade válida.", "error")
+            else:
+                add_custo_adicional_receita(receita_id, custo_id, quantidade)
+                flash("Custo adicionado à receita!", "success")
+
+        except Exception as e:
+            flash(f"Erro ao adicionar custo: {e}", "error")
+
+        # Redireciona de volta para a mesma página (GET) para mostrar a lista atualizada
+        return redirect(url_for('precificacao.adicionar_custo_receita', receita_id=receita_id))
+
+    # (Método GET)
+    # Busca os custos que já estão na receita
+    custos_na_receita = get_custos_adicionais_receita(receita_id)
+    # Busca todos os custos disponíveis no catálogo
+    todos_custos_disponiveis = get_custos_adicionais()
+
+    return render_template("adicionar_custo_receita.html",
+                           receita=receita,
+                           custos_da_receita=custos_na_receita,
+                           todos_custos=todos_custos_disponiveis)
+
+
+@bp.route("/excluir_custo_receita/<int:custo_receita_id>", methods=["POST"])
+def excluir_custo_receita(custo_receita_id):
+    # Usamos a nova função helper que criamos
+    custo_associado = get_custo_adicional_receita_by_id(custo_receita_id)
+
+    if custo_associado:
+        # Guarda o ID da receita ANTES de deletar
+        receita_id = custo_associado['receita_id']
+
+        delete_custo_adicional_receita(custo_receita_id)
+        flash("Custo removido da receita!", "success")
+
+        # Redireciona de volta para a página de "adicionar custos" daquela receita
+        return redirect(url_for('precificacao.adicionar_custo_receita', receita_id=receita_id))
+
+    flash("Associação de custo não encontrada!", "error")
+    return redirect(url_for('precificacao.gerir_receitas'))
+
+
+# --- Simulação de Cenários (What-if) ---
+@bp.route("/api/simulacao", methods=['POST'])
+def api_simulacao():
+    """Recebe {"cenarios": [...], "mix": {...}, "despesas": x, "dias_mix": 30} e devolve os resultados.
+
+    Sem "mix", usa as quantidades vendidas (e as despesas) dos últimos 'dias_mix' dias.
+    Os valores por produto vêm em listas na mesma ordem de "produtos".
+    """
+    dados = request.get_json(silent=True) or {}
+    cenarios = dados.get('cenarios') or [{}]
+    if not isinstance(cenarios, list):
+        return jsonify({'erro': "'cenarios' deve ser uma lista"}), 400
+    try:
+        dias_mix = int(str(dados.get('dias_mix', 30)))  # Recusa 2.5 e true
+    except (ValueError, TypeError):
+        dias_mix = 0
+    if dias_mix < 1:
+        return jsonify({'erro': "'dias_mix' deve ser um número inteiro maior que zero"}), 400
+
+    inicio = time.perf_counter()
+    if 'mix' in dados:
+        mix, despesas = dados['mix'], dados.get('despesas', 0)
+    else:
+        mix, despesas = get_mix_vendas(dias_mix)
+    grafo = compilar_grafo_custos()
+    try:
+        resultados = simular_cenarios(grafo, cenarios, mix=mix, despesas=float(despesas))
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'erro': str(e)}), 400
+
+    return jsonify({
+        'produtos': grafo['produtos'],
+        'cenarios': resultados,
+        'segundos': time.perf_counter() - inicio,
+    })
+
+
+# --- Previsão de Vendas (Lista de Compras) ---
+@bp.route("/api/compras/previsao")
+def api_lista_compras():
+    """Lista de compras dos próximos dias a partir da previsão de vendas de cada produto.
+
+    Query: dias (1 a 28, padrão 7) e metodo (suavizacao ou sazonal). A previsão é
+    calculada uma vez por dia; a conversão em receitas e ingredientes usa o catálogo atual.
+    """
+    dias = request.args.get('dias', 7, type=int)
+    metodo = request.args.get('metodo', 'suavizacao')
+    if dias is None or not 1 <= dias <= 28 or metodo not in METODOS_PREVISAO:
+        return jsonify({'erro': f"Use dias entre 1 e 28 e metodo em ({', '.join(METODOS_PREVISAO)})."}), 400
+    inicio = time.perf_counter()
+    lista = calcular_lista_compras(dias, metodo)
+    return jsonify({**lista, 'segundos': time.perf_counter() - inicio})
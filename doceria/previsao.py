@@ -0,0 +1,180 @@
+"""
+Previsão das vendas por produto e da demanda de ingredientes (lista de compras).
+
+As vendas diárias de cada produto saem do resumo por produto e dia
+(resumo_produto_diario) numa matriz produtos x dias, e a projeção dos próximos dias
+é feita para todos os produtos de uma vez (cada operação vale para a matriz inteira),
+em NumPy, sem serviço externo:
+  - 'suavizacao': suavização exponencial com sazonalidade semanal (Holt-Winters
+    aditivo, sem tendência). As constantes de cada produto são escolhidas numa grade,
+    pelo menor erro das previsões de um passo à frente no histórico;
+  - 'sazonal': sazonal ingênuo, cada dia repete o mesmo dia da semana passada.
+As unidades previstas viram gramas de ingredientes pelo grafo de custos
+(compilar_grafo_custos): produto --(fração ÷ rendimento)--> lotes da receita --(gramas)--> ingrediente.
+
+O histórico vai até ontem, então a previsão é calculada uma vez por dia em cada
+processo (cache em memória). Vendas lançadas hoje com data passada entram amanhã.
+"""
+import threading
+from datetime import date, timedelta
+
+import numpy as np
+from flask import current_app
+
+from .custos import compilar_grafo_custos
+from .db import get_db, get_geracao_banco
+
+
+ALFAS = (0.05, 0.1, 0.2, 0.3, 0.5)  # Peso do dia novo no nível
+GAMAS = (0.05, 0.1, 0.2, 0.3)  # Peso do dia novo na sazonalidade do dia da semana
+PERIODO = 7  # Sazonalidade semanal
+
+_cache_previsoes = {}
+_cache_previsoes_lock = threading.Lock()
+
+
+# --- Histórico ---
+def get_historico_produtos(fim, dias):
+    """Unidades vendidas de cada produto por dia nos 'dias' dias terminados em 'fim'.
+
+    Retorna (ids dos produtos, matriz produtos x dias). Dias sem venda ficam com 0 e
+    as vendas de produtos excluídos (id 0 no resumo) ficam de fora.
+    """
+    inicio = fim - timedelta(days=dias - 1)
+    cursor = get_db().cursor()
+    cursor.row_factory = None  # Tuplas simples: mais rápidas de transpor em colunas
+    cursor.execute("SELECT id FROM produtos ORDER BY id")
+    ids = np.array([row[0] for row in cursor.fetchall()], dtype=np.int64)
+    cursor.execute("""SELECT produto_id, data, total_quantidade FROM resumo_produto_diario
+                      WHERE data BETWEEN ? AND ? AND produto_id != 0""", (inicio.isoformat(), fim.isoformat()))
+    linhas = cursor.fetchall()
+
+    historico = np.zeros((len(ids), dias))
+    if linhas and len(ids):
+        produto, data, quantidade = zip(*linhas)
+        produto = np.array(produto, dtype=np.int64)
+        posicoes = np.minimum(np.searchsorted(ids, produto), len(ids) - 1)
+        existe = ids[posicoes] == produto
+        colunas = (np.array(data, dtype='datetime64[D]') - np.datetime64(inicio, 'D')).astype(np.intp)
+        historico[posicoes[existe], colunas[existe]] = np.array(quantidade, dtype=float)[existe]
+    return ids, historico
+
+
+# --- Métodos de Previsão ---
+# Recebem a matriz produtos x dias e o horizonte, e retornam a matriz produtos x horizonte
+# com a previsão dos dias seguintes ao último do histórico.
+def prever_sazonal_ingenuo(historico, horizonte):
+    """Cada dia previsto repete o mesmo dia da semana na última semana do histórico."""
+    ultima_semana = historico[:, -PERIODO:]
+    return ultima_semana[:, np.arange(horizonte) % PERIODO]
+
+
+def prever_suavizacao(historico, horizonte, alfas=ALFAS, gamas=GAMAS):
+    """Holt-Winters aditivo sem tendência (nível + sazonalidade semanal), para todos os produtos.
+
+    Todas as combinações (alfa, gama) da grade são ajustadas juntas (eixo 0 das matrizes
+    de estado): o laço é só sobre os dias. Cada produto fica com a combinação de menor
+    soma dos erros quadráticos das previsões de um passo.
+    """
+    num_produtos, num_dias = historico.shape
+    if num_dias < 2 * PERIODO:
+        return prever_sazonal_ingenuo(historico, horizonte)  # Pouco histórico para ajustar
+    alfa, gama = (grade.reshape(-1, 1) for grade in np.meshgrid(alfas, gamas, indexing='ij'))
+
+    # Estado inicial: nível = média da primeira semana; sazonalidade = desvio de cada dia dela
+    primeira_semana = historico[:, :PERIODO]
+    nivel = np.tile(primeira_semana.mean(axis=1), (len(alfa), 1))
+    sazonal = np.tile(primeira_semana - nivel[0][:, None], (len(alfa), 1, 1))
+    erro_quadratico = np.zeros((len(alfa), num_produtos))
+    for t in range(PERIODO, num_dias):
+        dia_semana = t % PERIODO
+        vendido = historico[:, t]
+        sazonal_dia = sazonal[:, :, dia_semana]
+        erro = vendido - (nivel + sazonal_dia)
+        erro_quadratico += erro * erro
+        nivel = nivel + alfa * erro  # = alfa * (vendido - sazonal) + (1 - alfa) * nivel
+        sazonal[:, :, dia_semana] = sazonal_dia + gama * (vendido - nivel - sazonal_dia)
+
+    melhor = erro_quadratico.argmin(axis=0)
+    produtos = np.arange(num_produtos)
+    nivel, sazonal = nivel[melhor, produtos], sazonal[melhor, produtos]
+    dias_semana = np.arange(num_dias, num_dias + horizonte) % PERIODO
+    return np.maximum(nivel[:, None] + sazonal[:, dias_semana], 0)  # Venda negativa não existe
+
+
+METODOS_PREVISAO = {
+    # nome: (descrição, função (historico, horizonte) -> previsão)
+    'suavizacao': ("Suavização exponencial com sazonalidade semanal", prever_suavizacao),
+    'sazonal': ("Sazonal ingênuo (repete a semana passada)", prever_sazonal_ingenuo),
+}
+
+
+def get_previsao_vendas(dias=7, metodo='suavizacao'):
+    """Unidades previstas por produto em cada um dos 'dias' dias a partir de amanhã.
+
+    Retorna {'datas': [...], 'ids': array, 'unidades': matriz produtos x dias}, calculado
+    uma vez por dia (o histórico termina ontem; hoje ainda está em andamento).
+    """
+    if metodo not in METODOS_PREVISAO:
+        raise ValueError(f"Método de previsão desconhecido '{metodo}'. Use: {', '.join(METODOS_PREVISAO)}")
+    hoje = date.today()
+    chave = (current_app.config['DATABASE'], get_geracao_banco(), hoje, dias, metodo)
+    with _cache_previsoes_lock:
+        if chave in _cache_previsoes:
+            return _cache_previsoes[chave]
+
+    ids, historico = get_historico_produtos(hoje - timedelta(days=1), current_app.config['PREVISAO_SEMANAS'] * 7)
+    _, funcao = METODOS_PREVISAO[metodo]
+    previsao = {
+        'datas': [(hoje + timedelta(days=d)).isoformat() for d in range(1, dias + 1)],
+        'ids': ids,
+        'unidades': funcao(historico, dias + 1)[:, 1:],  # O primeiro dia do horizonte é hoje
+    }
+
+    with _cache_previsoes_lock:
+        for antiga in [c for c in _cache_previsoes if c[2] != hoje]:
+            del _cache_previsoes[antiga]  # Só as previsões de hoje ficam na memória
+        _cache_previsoes[chave] = previsao
+    return previsao
+
+
+# --- Lista de Compras ---
+def calcular_lista_compras(dias=7, metodo='suavizacao'):
+    """Produtos previstos, lotes de cada receita e gramas de cada ingrediente para os próximos 'dias' dias."""
+    previsao = get_previsao_vendas(dias, metodo)
+    grafo = compilar_grafo_custos()
+
+    # Unidades previstas na ordem do grafo (um produto criado hoje ainda não tem previsão)
+    unidades_produto = np.zeros(len(grafo['produtos']))
+    totais = previsao['unidades'].sum(axis=1)
+    for produto_id, total in zip(previsao['ids'].tolist(), totais.tolist()):
+        if produto_id in grafo['pos_produto']:
+            unidades_produto[grafo['pos_produto'][produto_id]] = total
+
+    # produto -> unidades de receita -> lotes (÷ rendimento) -> gramas de cada ingrediente
+    unidades_receita = unidades_produto @ grafo['fracoes']
+    lotes = unidades_receita / np.where(grafo['rendimento'] > 0, grafo['rendimento'], 1)
+    gramas = np.round(lotes @ grafo['gramas'], 1)
+    # Mesma regra de calcular_custo_ingrediente: embalagem sem quantidade custa 0
+    com_embalagem = grafo['quant_embalagem'] > 0
+    preco_por_grama = np.divide(grafo['preco_embalagem'], grafo['quant_embalagem'],
+                                out=np.zeros_like(grafo['preco_embalagem']), where=com_embalagem)
+    embalagens = np.ceil(np.divide(gramas, grafo['quant_embalagem'], out=np.zeros_like(gramas), where=com_embalagem))
+    custo = gramas * preco_por_grama
+
+    return {
+        'inicio': previsao['datas'][0],
+        'fim': previsao['datas'][-1],
+        'metodo': metodo,
+        'produtos': [{**produto, 'unidades': round(float(unidades_produto[i]), 2)}
+                     for i, produto in enumerate(grafo['produtos']) if unidades_produto[i] > 0],
+        'receitas': [{**receita, 'unidades': round(float(unidades_receita[i]), 2), 'lotes': round(float(lotes[i]), 2)}
+                     for i, receita in enumerate(grafo['receitas']) if lotes[i] > 0],
+        'ingredientes': sorted(
+            ({**ingrediente, 'gramas': float(gramas[i]),
+              'embalagens': int(embalagens[i]) if com_embalagem[i] else None,
+              'custo_estimado': round(float(custo[i]), 2)}
+             for i, ingrediente in enumerate(grafo['ingredientes']) if gramas[i] > 0),
+            key=lambda ingrediente: ingrediente['nome']),
+        'custo_total_estimado': round(float(custo.sum()), 2),
+    }
@@ -0,0 +1,117 @@
+"""
+Blueprint principal: página inicial, acompanhamento das tarefas em segundo plano e
+rotas utilitárias (reset e debug).
+"""
+import os
+from datetime import datetime
+
+from flask import Blueprint, current_app, flash, jsonify, redirect, render_template, request, send_file, url_for
+
+from .arquivamento import apagar_arquivo_morto
+from .db import close_connection, fechar_conexoes, get_db, init_db
+from .tarefas import TAREFAS, enfileirar_tarefa, get_tarefa, get_tarefas_recentes
+
+bp = Blueprint('principal', __name__)
+
+
+@bp.route("/")
+def index():
+    return render_template('index.html')
+
+
+# --- Tarefas em Segundo Plano ---
+TAREFAS_MANUAIS = ('recalcular_custos', 'reconstruir_resumos', 'arquivar')  # Podem ser disparadas pela tela de tarefas
+
+
+@bp.route("/tarefas")
+def tarefas():
+    return render_template("tarefas.html", tarefas=get_tarefas_recentes(),
+                           manuais=[(tipo, TAREFAS[tipo][0]) for tipo in TAREFAS_MANUAIS])
+
+
+@bp.route("/tarefas/nova/<tipo>", methods=["POST"])
+def nova_tarefa(tipo):
+    if tipo not in TAREFAS_MANUAIS:
+        flash("Tarefa desconhecida.", "error")
+    else:
+        enfileirar_tarefa(tipo, unica=True)
+        flash(f"Tarefa '{TAREFAS[tipo][0]}' enviada para a fila.", "success")
+    return redirect(url_for('principal.tarefas'))
+
+
+@bp.route("/api/tarefas/<int:tarefa_id>")
+def api_tarefa(tarefa_id):
+    """Status de uma tarefa: status (pendente/executando/concluida/erro), progresso (0 a 1) e resultado."""
+    tarefa = get_tarefa(tarefa_id)
+    if not tarefa:
+        return jsonify({'erro': 'Tarefa não encontrada.'}), 404
+    return jsonify(tarefa)
+
+
+@bp.route("/tarefas/<int:tarefa_id>/arquivo")
+def arquivo_tarefa(tarefa_id):
+    """Download do arquivo gerado por uma tarefa de exportação."""
+    tarefa = get_tarefa(tarefa_id)
+    resultado = (tarefa or {}).get('resultado') or {}
+    if tarefa is None or tarefa['status'] != 'concluida' or 'arquivo' not in resultado \
+            or not os.path.exists(resultado['arquivo']):
+        flash(f"Arquivo não disponível (os arquivos das exportações são apagados depois de "
+              f"{current_app.config['TAREFAS_ARQUIVOS_HORAS']} horas).", "error")
+        return redirect(url_for('principal.tarefas'))
+    return send_file(resultado['arquivo'], as_attachment=True, download_name=resultado['nome_download'])
+
+
+# --- Rotas Utilitárias ---
+def executar_reset_db():
+    try:
+        close_connection(None)
+        fechar_conexoes()
+        # Em modo WAL o banco também tem os arquivos -wal e -shm
+        banco = current_app.config['DATABASE']
+        for caminho in (banco, banco + "-wal", banco + "-shm"):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+        apagar_arquivo_morto()  # Os meses arquivados pertencem ao banco apagado
+        init_db()
+        # A versão dos dados começa num valor novo para que ETags antigos dos navegadores não sejam reaproveitados
+        db = get_db()
+        db.execute("UPDATE versao_dados SET versao = ? WHERE dominio = 'financeiro'",
+                   (int(datetime.now().timestamp()),))
+        db.commit()
+        flash("Banco de dados resetado com sucesso!", "success")
+    except Exception as e:
+        flash(f"Erro ao resetar o banco de dados: {e}", "error")
+
+
+@bp.route("/confirmar_reset", methods=["GET", "POST"])
+def confirmar_reset():
+    if request.method == "POST":
+        senha_digitada = request.form.get("password")
+
+        # 3. VERIFICA A SENHA DEFINIDA NO PASSO 1
+        if senha_digitada == current_app.config['ADMIN_PASSWORD']:
+            # Senha correta: executa o reset e vai para o início
+            executar_reset_db()
+            return redirect(url_for("principal.index"))
+        else:
+            # Senha incorreta: exibe erro e recarrega a página de senha
+            flash("Senha incorreta. O banco de dados NÃO foi resetado.", "error")
+            return redirect(url_for('principal.confirmar_reset'))
+
+    # Se for método GET, apenas mostra a página de confirmação
+    return render_template("confirmar_reset.html")
+
+
+@bp.route("/debug/db")
+def debug_db():
+    if not current_app.debug:
+        return "Acesso negado", 403
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = [row['name'] for row in cursor.fetchall()]
+    db_data = {}
+    for table_name in tables:
+        cursor.execute(f"SELECT * FROM {table_name}")
+        db_data[table_name] = cursor.fetchall()
+    return render_template("debug.html", db_data=db_data, tables=tables)
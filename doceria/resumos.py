@@ -0,0 +1,373 @@
+"""
+Resumos financeiros (rollups) e KPIs e rankings de produtos lidos deles.
+"""
+from datetime import timedelta
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+
+from .db import get_db
+
+
+# --- Resumos Financeiros (Rollups) ---
+# resumo_diario / resumo_semanal guardam os totais por dia / semana (semana = segunda-feira)
+# e resumo_produto_diario guarda os totais por produto e dia. São atualizados de forma
+# incremental por add_venda, add_despesa, delete_venda e delete_despesa, na mesma transação.
+SQL_INICIO_SEMANA = "date({}, 'weekday 0', '-6 days')"  # Segunda-feira da semana (semanas de Seg a Dom)
+
+
+def _incrementar_versao_dados(cursor):
+    """Marca que os dados financeiros mudaram (invalida os gráficos em cache de todos os workers)."""
+    cursor.execute("UPDATE versao_dados SET versao = versao + 1 WHERE dominio = 'financeiro'")
+
+
+def get_versao_dados():
+    cursor = get_db().cursor()
+    cursor.execute("SELECT versao FROM versao_dados WHERE dominio = 'financeiro'")
+    row = cursor.fetchone()
+    return row['versao'] if row else 0
+
+
+def _somar_nos_resumos(cursor, data, total_vendido=0, total_gasto=0, total_quantidade=0, num_vendas=0):
+    """Soma (ou subtrai, com valores negativos) os deltas no resumo diário e no semanal."""
+    _incrementar_versao_dados(cursor)
+    for tabela, coluna, chave_sql in (('resumo_diario', 'data', 'date(?)'),
+                                      ('resumo_semanal', 'semana', SQL_INICIO_SEMANA.format('?'))):
+        cursor.execute(f"""
+            INSERT INTO {tabela} ({coluna}, total_vendido, total_gasto, total_quantidade, num_vendas)
+            VALUES({chave_sql}, ?, ?, ?, ?)
+            ON CONFLICT({coluna}) DO UPDATE SET
+                total_vendido = total_vendido + excluded.total_vendido,
+                total_gasto = total_gasto + excluded.total_gasto,
+                total_quantidade = total_quantidade + excluded.total_quantidade,
+                num_vendas = num_vendas + excluded.num_vendas
+        """, (data, total_vendido, total_gasto, total_quantidade, num_vendas))
+
+
+def _aplicar_venda_nos_resumos(venda_id, sinal):
+    """Aplica uma venda (sinal=1) ou a retira (sinal=-1) de todos os resumos."""
+    cursor = get_db().cursor()
+    cursor.execute("SELECT data, total_venda FROM vendas WHERE id = ?", (venda_id,))
+    venda = cursor.fetchone()
+    if not venda:
+        return
+    cursor.execute("SELECT COALESCE(SUM(quantidade), 0) AS qtd FROM venda_itens WHERE venda_id = ?", (venda_id,))
+    quantidade = cursor.fetchone()['qtd']
+    _somar_nos_resumos(cursor, venda['data'], total_vendido=sinal * venda['total_venda'],
+                       total_quantidade=sinal * quantidade, num_vendas=sinal)
+
+    # Produto excluído (produto_id NULL) fica agrupado no id 0
+    cursor.execute("""
+        INSERT INTO resumo_produto_diario (data, produto_id, total_quantidade, total_vendido, total_lucro_bruto)
+        SELECT date(?), COALESCE(produto_id, 0),
+               ? * SUM(quantidade),
+               ? * SUM(preco_unitario_venda * quantidade),
+               ? * SUM((preco_unitario_venda - custo_unitario_producao) * quantidade)
+        FROM venda_itens
+        WHERE venda_id = ?
+        GROUP BY COALESCE(produto_id, 0)
+        ON CONFLICT(data, produto_id) DO UPDATE SET
+            total_quantidade = total_quantidade + excluded.total_quantidade,
+            total_vendido = total_vendido + excluded.total_vendido,
+            total_lucro_bruto = total_lucro_bruto + excluded.total_lucro_bruto
+    """, (venda['data'], sinal, sinal, sinal, venda_id))
+
+
+def _aplicar_lote_no_resumo_produto(cursor, primeiro_venda_id, ultimo_venda_id):
+    """Soma no resumo por produto todas as vendas de uma faixa de ids (importação em lote)."""
+    cursor.execute("""
+        INSERT INTO resumo_produto_diario (data, produto_id, total_quantidade, total_vendido, total_lucro_bruto)
+        SELECT date(v.data), COALESCE(vi.produto_id, 0),
+               SUM(vi.quantidade),
+               SUM(vi.preco_unitario_venda * vi.quantidade),
+               SUM((vi.preco_unitario_venda - vi.custo_unitario_producao) * vi.quantidade)
+        FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+        WHERE vi.venda_id BETWEEN ? AND ?
+        GROUP BY 1, 2
+        ON CONFLICT(data, produto_id) DO UPDATE SET
+            total_quantidade = total_quantidade + excluded.total_quantidade,
+            total_vendido = total_vendido + excluded.total_vendido,
+            total_lucro_bruto = total_lucro_bruto + excluded.total_lucro_bruto
+    """, (primeiro_venda_id, ultimo_venda_id))
+
+
+def _mover_resumo_produto_para_excluido(cursor, produto_id):
+    """Soma o resumo de um produto que será excluído no grupo "produto excluído" (id 0)."""
+    cursor.execute("""
+        INSERT INTO resumo_produto_diario (data, produto_id, total_quantidade, total_vendido, total_lucro_bruto)
+        SELECT data, 0, total_quantidade, total_vendido, total_lucro_bruto
+        FROM resumo_produto_diario
+        WHERE produto_id = ?
+        ON CONFLICT(data, produto_id) DO UPDATE SET
+            total_quantidade = total_quantidade + excluded.total_quantidade,
+            total_vendido = total_vendido + excluded.total_vendido,
+            total_lucro_bruto = total_lucro_bruto + excluded.total_lucro_bruto
+    """, (produto_id,))
+    cursor.execute("DELETE FROM resumo_produto_diario WHERE produto_id = ?", (produto_id,))
+
+
+def reconstruir_resumos_financeiros():
+    """Recria todos os resumos a partir das tabelas de vendas/despesas (back-fill)."""
+    db = get_db()
+    _reconstruir_resumos(db.cursor())
+    db.commit()
+
+
+def _reconstruir_resumos(cursor):
+    """SQL do back-fill dos resumos (sem commit, para poder rodar dentro de uma migração).
+
+    Os dias dos meses já arquivados (arquivamento.py) não estão mais nas tabelas de
+    vendas/despesas: os resumos diários desses meses são mantidos como estão.
+    """
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'versao_dados'").fetchone():
+        _incrementar_versao_dados(cursor)
+    mes_aberto = "1"
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'meses_arquivados'").fetchone():
+        mes_aberto = "substr({}, 1, 7) NOT IN (SELECT mes FROM meses_arquivados)"
+    cursor.execute(f"DELETE FROM resumo_diario WHERE {mes_aberto.format('data')}")
+    cursor.execute("DELETE FROM resumo_semanal")
+    cursor.execute(f"DELETE FROM resumo_produto_diario WHERE {mes_aberto.format('data')}")
+
+    cursor.execute(f"""
+        INSERT INTO resumo_diario (data, total_vendido, total_gasto, total_quantidade, num_vendas)
+        SELECT data, SUM(total_vendido), SUM(total_gasto), SUM(total_quantidade), SUM(num_vendas)
+        FROM (
+            SELECT date(data) AS data, total_venda AS total_vendido, 0 AS total_gasto,
+                   0 AS total_quantidade, 1 AS num_vendas
+            FROM vendas
+            UNION ALL
+            SELECT date(v.data), 0, 0, vi.quantidade, 0
+            FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+            UNION ALL
+            SELECT date(data), 0, valor, 0, 0
+            FROM despesas
+        )
+        WHERE {mes_aberto.format('data')}
+        GROUP BY data
+    """)
+    cursor.execute(f"""
+        INSERT INTO resumo_semanal (semana, total_vendido, total_gasto, total_quantidade, num_vendas)
+        SELECT {SQL_INICIO_SEMANA.format('data')}, SUM(total_vendido), SUM(total_gasto),
+               SUM(total_quantidade), SUM(num_vendas)
+        FROM resumo_diario
+        GROUP BY 1
+    """)
+    cursor.execute(f"""
+        INSERT INTO resumo_produto_diario (data, produto_id, total_quantidade, total_vendido, total_lucro_bruto)
+        SELECT date(v.data), COALESCE(vi.produto_id, 0),
+               SUM(vi.quantidade),
+               SUM(vi.preco_unitario_venda * vi.quantidade),
+               SUM((vi.preco_unitario_venda - vi.custo_unitario_producao) * vi.quantidade)
+        FROM venda_itens vi JOIN vendas v ON vi.venda_id = v.id
+        WHERE {mes_aberto.format('v.data')}
+        GROUP BY 1, 2
+    """)
+
+
+@click.command("reconstruir-resumos")
+@with_appcontext
+def reconstruir_resumos_command():
+    """Recalcula as tabelas de resumo financeiro a partir do histórico completo."""
+    reconstruir_resumos_financeiros()
+    print("Resumos financeiros reconstruídos com sucesso!")
+
+
+def get_evolucao_semanal(inicio, fim):
+    """Evolução semanal (semanas começando na segunda) de vendas e despesas no período.
+
+    Semanas inteiras dentro do período vêm do resumo semanal; as semanas parciais
+    das pontas são somadas a partir do resumo diário, só com os dias do período.
+    """
+    primeira_segunda = inicio + timedelta(days=(7 - inicio.weekday()) % 7)
+    ultimo_domingo = fim - timedelta(days=(fim.weekday() + 1) % 7)
+    ultima_segunda_completa = ultimo_domingo - timedelta(days=6)
+
+    cursor = get_db().cursor()
+    cursor.execute(f"""
+        SELECT semana, total_vendido, total_gasto
+        FROM resumo_semanal
+        WHERE semana BETWEEN ? AND ?
+        UNION ALL
+        SELECT {SQL_INICIO_SEMANA.format('data')} AS semana, SUM(total_vendido), SUM(total_gasto)
+        FROM resumo_diario
+        WHERE data BETWEEN ? AND ? AND (data < ? OR data > ?)
+        GROUP BY 1
+    """, (primeira_segunda.isoformat(), ultima_segunda_completa.isoformat(),
+          inicio.isoformat(), fim.isoformat(), primeira_segunda.isoformat(), ultimo_domingo.isoformat()))
+    linhas = cursor.fetchall()
+
+    from . import analise
+    return analise.montar_evolucao_semanal(linhas)
+
+
+# --- Comparação de Períodos (KPIs) ---
+# Os KPIs do período e de todas as janelas de comparação saem de UMA leitura do resumo
+# diário: os totais viram uma série densa (dias sem movimento ficam zerados) e a soma
+# acumulada dela (prefix sum). A soma de qualquer janela é a diferença de duas posições
+# da soma acumulada, então mais janelas (ou as somas móveis de cada dia do período) não
+# custam mais queries nem mais leituras.
+CAMPOS_KPIS = ('total_vendido', 'total_gasto', 'total_quantidade')
+
+
+def _mesmo_dia_ano_anterior(dia):
+    try:
+        return dia.replace(year=dia.year - 1)
+    except ValueError:
+        return dia.replace(year=dia.year - 1, day=28)  # 29/02 -> 28/02
+
+
+JANELAS_COMPARACAO = {
+    # nome: (descrição mostrada na tela, função (inicio, fim) -> (inicio, fim) da janela)
+    'semana_anterior': ("7 dias antes do período",
+                        lambda inicio, fim: (inicio - timedelta(days=7), inicio - timedelta(days=1))),
+    'mes_anterior': ("30 dias antes do período",
+                     lambda inicio, fim: (inicio - timedelta(days=30), inicio - timedelta(days=1))),
+    'periodo_anterior': ("Período anterior (mesma duração)",
+                         lambda inicio, fim: (inicio - (fim - inicio) - timedelta(days=1), inicio - timedelta(days=1))),
+    'ano_anterior': ("Mesmo período do ano anterior",
+                     lambda inicio, fim: (_mesmo_dia_ano_anterior(inicio), _mesmo_dia_ano_anterior(fim))),
+    'ultimas_4_semanas': ("Últimas 4 semanas do período", lambda inicio, fim: (fim - timedelta(days=27), fim)),
+    'ultimas_12_semanas': ("Últimas 12 semanas do período", lambda inicio, fim: (fim - timedelta(days=83), fim)),
+}
+
+
+def get_comparacao_periodos(inicio, fim, janelas=tuple(JANELAS_COMPARACAO), dias_moveis=(28, 84)):
+    """KPIs do período [inicio, fim] e de cada janela de JANELAS_COMPARACAO, numa única query.
+
+    Retorna {'atual': periodo, 'janelas': {nome: periodo}, 'moveis': {dias: serie}}, em que
+    periodo = {'inicio', 'fim', 'dias', 'kpis'} e serie traz, para cada dia do período, o
+    total vendido e o lucro líquido dos 'dias' dias terminados nele (somas móveis).
+    """
+    desconhecidas = [nome for nome in janelas if nome not in JANELAS_COMPARACAO]
+    if desconhecidas:
+        raise ValueError(f"Janela de comparação desconhecida: {', '.join(desconhecidas)}")
+    periodos = {'atual': (inicio, fim)}
+    periodos.update({nome: JANELAS_COMPARACAO[nome][1](inicio, fim) for nome in janelas})
+    primeiro_dia = min([inicio - timedelta(days=max(dias_moveis, default=1) - 1)]
+                       + [comeco for comeco, _ in periodos.values()])
+    ultimo_dia = max(max(periodo) for periodo in periodos.values())
+
+    cursor = get_db().cursor()
+    cursor.execute(f"SELECT data, {', '.join(CAMPOS_KPIS)} FROM resumo_diario WHERE data BETWEEN ? AND ?",
+                   (primeiro_dia.isoformat(), ultimo_dia.isoformat()))
+    linhas = cursor.fetchall()
+
+    # Posição de cada dia na série densa; acumulado[k] = soma dos dias de posição < k
+    posicoes = (np.array([row['data'] for row in linhas], dtype='datetime64[D]')
+                - np.datetime64(primeiro_dia, 'D')).astype(np.int64)
+    acumulados = {}
+    for campo in CAMPOS_KPIS:
+        diario = np.zeros((ultimo_dia - primeiro_dia).days + 1,
+                          dtype=np.int64 if campo == 'total_quantidade' else np.float64)
+        diario[posicoes] = [row[campo] for row in linhas]
+        acumulados[campo] = np.concatenate(([0], np.cumsum(diario)))
+
+    # Todas as janelas de uma vez: soma de [a, b] = acumulado[b + 1] - acumulado[a]
+    comecos = np.array([(comeco - primeiro_dia).days for comeco, _ in periodos.values()])
+    finais = np.array([(final - primeiro_dia).days + 1 for _, final in periodos.values()])
+    finais = np.maximum(finais, comecos)  # Janela com fim antes do inicio: vazia (soma zero)
+    somas = {campo: acumulado[finais] - acumulado[comecos] for campo, acumulado in acumulados.items()}
+    resultado = {'janelas': {}}
+    for i, (nome, (comeco, final)) in enumerate(periodos.items()):
+        total_vendido = round(somas['total_vendido'][i].item(), 2)
+        total_gasto = round(somas['total_gasto'][i].item(), 2)
+        periodo = {
+            'inicio': comeco.isoformat(), 'fim': final.isoformat(), 'dias': max((final - comeco).days + 1, 0),
+            'kpis': {
+                'total_vendido': total_vendido,
+                'total_gasto': total_gasto,
+                'lucro_liquido': round(total_vendido - total_gasto, 2),
+                'total_quantidade': somas['total_quantidade'][i].item(),
+            },
+        }
+        if nome == 'atual':
+            resultado['atual'] = periodo
+        else:
+            resultado['janelas'][nome] = periodo
+
+    # Somas móveis de cada dia do período (tendência), com a mesma soma acumulada
+    dias_periodo = np.arange((inicio - primeiro_dia).days, (fim - primeiro_dia).days + 1) + 1
+    datas = [(inicio + timedelta(days=d)).isoformat() for d in range(len(dias_periodo))]
+    resultado['moveis'] = {}
+    for dias in dias_moveis:
+        vendido = acumulados['total_vendido'][dias_periodo] - acumulados['total_vendido'][dias_periodo - dias]
+        gasto = acumulados['total_gasto'][dias_periodo] - acumulados['total_gasto'][dias_periodo - dias]
+        resultado['moveis'][dias] = {
+            'data': datas,
+            'total_vendido': np.round(vendido, 2).tolist(),
+            'lucro_liquido': np.round(vendido - gasto, 2).tolist(),
+        }
+    return resultado
+
+
+# --- Mix de Produtos (Rankings) ---
+# Os rankings leem o resumo por produto e dia (resumo_produto_diario), e não os itens de
+# venda: o período inteiro vira uma linha por produto. O agrupamento é pelo produto_id,
+# então um produto renomeado continua numa linha só e as vendas de produtos excluídos
+# (id 0) aparecem como "Produto Excluído" em vez de sumirem do ranking.
+METRICAS_MIX = ('total_vendido', 'total_lucro_bruto', 'total_quantidade')
+NOME_PRODUTO_EXCLUIDO = 'Produto Excluído'
+
+
+def get_mix_produtos(inicio, fim):
+    """Totais por produto no período [inicio, fim]. Retorna (ids, nomes, {metrica: np.array})."""
+    cursor = get_db().cursor()
+    cursor.execute("""
+        SELECT r.produto_id, COALESCE(p.nome, ?) AS nome,
+               r.total_vendido, r.total_lucro_bruto, r.total_quantidade
+        FROM (
+            SELECT produto_id, SUM(total_vendido) AS total_vendido,
+                   SUM(total_lucro_bruto) AS total_lucro_bruto, SUM(total_quantidade) AS total_quantidade
+            FROM resumo_produto_diario
+            WHERE data BETWEEN ? AND ?
+            GROUP BY produto_id
+            HAVING SUM(total_quantidade) != 0  -- Dias em que todas as vendas foram excluídas ficam zerados
+        ) r
+        LEFT JOIN produtos p ON p.id = r.produto_id
+    """, (NOME_PRODUTO_EXCLUIDO, inicio.isoformat(), fim.isoformat()))
+    linhas = cursor.fetchall()
+    ids = [row['produto_id'] for row in linhas]
+    nomes = [row['nome'] for row in linhas]
+    valores = {metrica: np.array([row[metrica] for row in linhas],
+                                 dtype=np.int64 if metrica == 'total_quantidade' else np.float64)
+               for metrica in METRICAS_MIX}
+    return ids, nomes, valores
+
+
+def _indices_extremos(valores, nomes, n, maiores=True):
+    """Posições dos n maiores (ou menores) valores, em ordem (empate: ordem alfabética).
+
+    O argpartition separa os n primeiros numa única passada (O(m)), sem ordenar os m
+    produtos; só os n escolhidos são ordenados depois.
+    """
+    if len(valores) > n:
+        escolhidos = np.argpartition(-valores if maiores else valores, n - 1)[:n]
+    else:
+        escolhidos = np.arange(len(valores))
+    sinal = -1 if maiores else 1
+    return sorted(escolhidos.tolist(), key=lambda i: (sinal * valores[i], nomes[i]))
+
+
+def get_ranking_produtos(inicio, fim, metrica, n=5, maiores=True):
+    """Os n produtos com maior (ou menor) 'metrica' no período, com todas as métricas de cada um."""
+    if metrica not in METRICAS_MIX:
+        raise ValueError(f"Métrica inválida '{metrica}'. Use: {', '.join(METRICAS_MIX)}")
+    ids, nomes, valores = get_mix_produtos(inicio, fim)
+    return [{'produto_id': ids[i], 'nome': nomes[i],
+             **{m: valores[m][i].item() for m in METRICAS_MIX}}
+            for i in _indices_extremos(valores[metrica], nomes, n, maiores)]
+
+
+def get_top_bottom_produtos(inicio, fim, n=5):
+    """Para cada métrica, o Top n seguido do Bottom n (mesma ordem dos gráficos de barras)."""
+    _, nomes, valores = get_mix_produtos(inicio, fim)
+    top_bottom = {}
+    for metrica in METRICAS_MIX:
+        indices = (_indices_extremos(valores[metrica], nomes, n, maiores=True)
+                   + _indices_extremos(valores[metrica], nomes, n, maiores=False))
+        top_bottom[metrica] = {
+            'nome': [nomes[i] for i in indices],
+            'valor': valores[metrica][indices].tolist(),
+        }
+    return top_bottom
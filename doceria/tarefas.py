@@ -0,0 +1,309 @@
+"""
+Fila de tarefas em segundo plano, guardada no próprio SQLite (sem broker externo).
+
+Recálculos pesados (custos depois de uma mudança de preço, reconstrução dos
+resumos, exportações grandes) não seguram a thread do request: a rota grava a
+tarefa na tabela 'tarefas' e retorna na hora, e um pool de threads do processo
+executa as pendentes em ordem, gravando o progresso na mesma tabela
+(GET /api/tarefas/<id>).
+
+Como a fila é o banco, qualquer worker pode pegar qualquer tarefa pendente (a
+reserva é feita com BEGIN IMMEDIATE). Uma tarefa que ficou na fila (ex: o
+processo reiniciou) roda na próxima vez que algo for enfileirado, ou com
+'flask processar-tarefas'. Cada tarefa em execução guarda o processo dono
+('host:pid') e um batimento atualizado a cada INTERVALO_BATIMENTO_S segundos.
+Uma tarefa 'executando' só volta para a fila (e roda de novo do começo) quando
+o dono não existe mais: na mesma máquina isso é perguntado ao sistema; fora dela
+(ou no Windows) vale o batimento parado há mais de TAREFAS_TIMEOUT_MIN minutos.
+Os arquivos das exportações são apagados depois de TAREFAS_ARQUIVOS_HORAS horas.
+Com TAREFAS_WORKERS=0 a tarefa roda no próprio request.
+"""
+import json
+import os
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from .arquivamento import arquivar_meses_fechados
+from .custos import atualizar_cache_custos
+from .db import conectar_db, get_db
+from .exportacao import exportar_para_arquivo
+from .importacao import atualizar_precos_ingredientes
+from .resumos import reconstruir_resumos_financeiros
+
+
+_executor = None  # Pool de threads deste processo (criado na primeira tarefa)
+_executor_pid = None
+_executor_lock = threading.Lock()
+INTERVALO_BATIMENTO_S = 30  # Sinal de vida de cada tarefa em execução
+
+
+# --- Tarefas ---
+# Cada tarefa recebe (parametros, progresso) e retorna um resultado serializável em JSON.
+# progresso(fracao, mensagem) faz commit: chame-o só fora de uma transação da tarefa.
+def _tarefa_recalcular_custos(parametros, progresso):
+    atualizar_cache_custos()
+    cursor = get_db().cursor()
+    return {'receitas': cursor.execute("SELECT COUNT(*) FROM custos_receitas_cache").fetchone()[0],
+            'produtos': cursor.execute("SELECT COUNT(*) FROM custos_produtos_cache").fetchone()[0]}
+
+
+def _tarefa_atualizar_precos(parametros, progresso):
+    progresso(0.1, f"Aplicando {len(parametros['linhas'])} linhas da tabela de preços")
+    return atualizar_precos_ingredientes(parametros['linhas'])
+
+
+def _tarefa_reconstruir_resumos(parametros, progresso):
+    reconstruir_resumos_financeiros()
+    return {}
+
+
+def _tarefa_exportar(parametros, progresso):
+    nome, formato = parametros['nome'], parametros.get('formato', 'csv')
+    data_inicio = date.fromisoformat(parametros['inicio']) if parametros.get('inicio') else None
+    data_fim = date.fromisoformat(parametros['fim']) if parametros.get('fim') else None
+    pasta = current_app.config['PASTA_ARQUIVOS_TAREFAS']
+    os.makedirs(pasta, exist_ok=True)
+    descritor, caminho = tempfile.mkstemp(prefix=f"{nome}_", suffix=f".{formato}", dir=pasta)
+    progresso(0.1, "Gerando o arquivo")
+    try:
+        if formato == 'xlsx':
+            with os.fdopen(descritor, 'wb') as destino:
+                linhas = exportar_para_arquivo(nome, formato, destino, data_inicio, data_fim)
+        else:
+            with os.fdopen(descritor, 'w', newline='', encoding='utf-8') as destino:
+                linhas = exportar_para_arquivo(nome, formato, destino, data_inicio, data_fim)
+    except Exception:
+        os.remove(caminho)  # Não deixa o arquivo pela metade na pasta
+        raise
+    nome_download = f"{nome}_{datetime.now().strftime('%Y%m%d')}.{formato}"
+    return {'arquivo': caminho, 'nome_download': nome_download, 'linhas': linhas}
+
+
+def _tarefa_arquivar(parametros, progresso):
+    return {'meses': arquivar_meses_fechados(parametros.get('meses_abertos'))}
+
+
+TAREFAS = {
+    # tipo: (descrição mostrada na tela, função)
+    'recalcular_custos': ("Recalcular custos de receitas e produtos", _tarefa_recalcular_custos),
+    'atualizar_precos': ("Aplicar tabela de preços dos ingredientes", _tarefa_atualizar_precos),
+    'reconstruir_resumos': ("Reconstruir resumos financeiros", _tarefa_reconstruir_resumos),
+    'exportar': ("Exportar planilha", _tarefa_exportar),
+    'arquivar': ("Arquivar meses fechados (Parquet)", _tarefa_arquivar),
+}
+
+
+# --- Fila ---
+def _get_executor():
+    """Pool de threads do processo atual (outro é criado depois de um fork, ex: gunicorn --preload)."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ThreadPoolExecutor(max_workers=current_app.config['TAREFAS_WORKERS'],
+                                           thread_name_prefix="tarefas")
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _processar_no_pool(app):
+    with app.app_context():
+        processar_tarefas_pendentes()
+
+
+def enfileirar_tarefa(tipo, parametros=None, unica=False):
+    """Grava uma tarefa na fila, agenda a execução e retorna o id (sem esperar ela rodar).
+
+    Com unica=True, se já houver uma tarefa do mesmo tipo esperando na fila, retorna
+    o id dela: como ainda não começou, ela já vai enxergar os dados mais novos.
+    """
+    if tipo not in TAREFAS:
+        raise ValueError(f"Tipo de tarefa desconhecido: '{tipo}'")
+    db = get_db()
+    cursor = db.cursor()
+    existente = None
+    if unica:
+        existente = cursor.execute("SELECT id FROM tarefas WHERE tipo = ? AND status = 'pendente' ORDER BY id LIMIT 1",
+                                   (tipo,)).fetchone()
+    if existente:
+        return existente['id']
+    cursor.execute("INSERT INTO tarefas (tipo, parametros, status, criada_em) VALUES(?, ?, 'pendente', ?)",
+                   (tipo, json.dumps(parametros or {}, default=str), datetime.now().isoformat(timespec='seconds')))
+    tarefa_id = cursor.lastrowid
+    db.commit()
+
+    if current_app.config['TAREFAS_WORKERS'] > 0:
+        _get_executor().submit(_processar_no_pool, current_app._get_current_object())
+    else:
+        processar_tarefas_pendentes()
+    return tarefa_id
+
+
+def _id_executor():
+    """Identifica o processo atual ('host:pid'); muda depois de um fork."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _processo_vivo(executor):
+    """Se o processo 'host:pid' ainda existe, ou None se não dá para saber daqui (outra máquina, Windows)."""
+    host, _, pid = (executor or '').rpartition(':')
+    # No Windows o os.kill encerraria o processo em vez de só consultá-lo
+    if host != socket.gethostname() or not pid.isdigit() or os.name == 'nt':
+        return None
+    try:
+        os.kill(int(pid), 0)  # Sinal 0: só verifica se o processo existe
+    except ProcessLookupError:
+        return False
+    except OSError:  # Ex: PermissionError, o processo existe mas é de outro usuário
+        pass
+    return True
+
+
+def _tarefa_abandonada(tarefa, limite):
+    """Se o dono de uma tarefa 'executando' morreu (pelo sistema ou, sem como perguntar, pelo batimento parado)."""
+    vivo = _processo_vivo(tarefa['executor'])
+    return not vivo if vivo is not None else tarefa['batimento'] < limite
+
+
+def _reservar_proxima_tarefa(db, executor):
+    """Marca a tarefa pendente mais antiga como 'executando' por 'executor' e a retorna (None se a fila estiver vazia).
+
+    Antes, as tarefas 'executando' cujo processo dono morreu no meio voltam para
+    'pendente', na mesma transação. As de processos vivos nunca são tiradas deles.
+    """
+    agora = datetime.now()
+    limite = (agora - timedelta(minutes=current_app.config['TAREFAS_TIMEOUT_MIN'])).isoformat(timespec='seconds')
+    cursor = db.cursor()
+    cursor.execute("BEGIN IMMEDIATE")  # Dois workers nunca reservam a mesma tarefa
+    try:
+        executando = cursor.execute("""SELECT id, executor, COALESCE(batimento_em, iniciada_em) AS batimento
+                                       FROM tarefas WHERE status = 'executando'""").fetchall()
+        cursor.executemany("""UPDATE tarefas SET status = 'pendente', progresso = 0, executor = NULL,
+                                                 mensagem = 'Reenfileirada: a execução anterior não terminou'
+                              WHERE id = ?""", [(t['id'],) for t in executando if _tarefa_abandonada(t, limite)])
+        tarefa = cursor.execute("""SELECT id, tipo, parametros FROM tarefas
+                                   WHERE status = 'pendente' ORDER BY id LIMIT 1""").fetchone()
+        if tarefa:
+            cursor.execute("""UPDATE tarefas SET status = 'executando', iniciada_em = ?, batimento_em = ?, executor = ?
+                              WHERE id = ?""",
+                           (agora.isoformat(timespec='seconds'), agora.isoformat(timespec='seconds'),
+                            executor, tarefa['id']))
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return tarefa
+
+
+def _manter_batimento(app, tarefa_id, executor, parar):
+    """Atualiza o batimento da tarefa a cada INTERVALO_BATIMENTO_S segundos, até 'parar' ser sinalizado."""
+    with app.app_context():
+        db = conectar_db()  # Conexão própria: a da tarefa pode estar no meio de uma transação
+        try:
+            while not parar.wait(INTERVALO_BATIMENTO_S):
+                try:
+                    db.execute("UPDATE tarefas SET batimento_em = ? WHERE id = ? AND executor = ?",
+                               (datetime.now().isoformat(timespec='seconds'), tarefa_id, executor))
+                    db.commit()
+                except sqlite3.OperationalError:  # Banco ocupado: tenta de novo no próximo intervalo
+                    db.rollback()
+        finally:
+            db.close()
+
+
+def executar_proxima_tarefa():
+    """Executa a próxima tarefa da fila. Retorna o id dela, ou None se a fila estava vazia."""
+    db = get_db()
+    executor = _id_executor()
+    tarefa = _reservar_proxima_tarefa(db, executor)
+    if tarefa is None:
+        return None
+
+    def progresso(fracao, mensagem=None):
+        db.execute("""UPDATE tarefas SET progresso = ?, mensagem = COALESCE(?, mensagem), batimento_em = ?
+                      WHERE id = ?""",
+                   (fracao, mensagem, datetime.now().isoformat(timespec='seconds'), tarefa['id']))
+        db.commit()
+
+    parar = threading.Event()
+    threading.Thread(target=_manter_batimento, name=f"batimento-{tarefa['id']}", daemon=True,
+                     args=(current_app._get_current_object(), tarefa['id'], executor, parar)).start()
+    _, funcao = TAREFAS[tarefa['tipo']]
+    try:
+        resultado = funcao(json.loads(tarefa['parametros']), progresso)
+    except Exception as e:
+        db.rollback()
+        current_app.logger.exception("Erro na tarefa %s (%s)", tarefa['id'], tarefa['tipo'])
+        db.execute("UPDATE tarefas SET status = 'erro', mensagem = ?, concluida_em = ? WHERE id = ?",
+                   (str(e), datetime.now().isoformat(timespec='seconds'), tarefa['id']))
+    else:
+        db.execute("""UPDATE tarefas SET status = 'concluida', progresso = 1, mensagem = NULL, resultado = ?,
+                      concluida_em = ? WHERE id = ?""",
+                   (json.dumps(resultado, default=str), datetime.now().isoformat(timespec='seconds'), tarefa['id']))
+    finally:
+        parar.set()
+    db.commit()
+    return tarefa['id']
+
+
+def apagar_arquivos_expirados():
+    """Apaga os arquivos das exportações com mais de TAREFAS_ARQUIVOS_HORAS horas. Retorna quantos apagou."""
+    pasta = current_app.config['PASTA_ARQUIVOS_TAREFAS']
+    limite = time.time() - current_app.config['TAREFAS_ARQUIVOS_HORAS'] * 3600
+    try:
+        nomes = os.listdir(pasta)
+    except FileNotFoundError:
+        return 0
+    apagados = 0
+    for nome in nomes:
+        caminho = os.path.join(pasta, nome)
+        try:
+            if os.path.isfile(caminho) and os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+                apagados += 1
+        except OSError:  # Já apagado por outro worker, ou sendo baixado agora (Windows)
+            continue
+    return apagados
+
+
+def processar_tarefas_pendentes():
+    """Executa as tarefas da fila até ela esvaziar e apaga os arquivos expirados. Retorna quantas foram executadas."""
+    executadas = 0
+    while executar_proxima_tarefa() is not None:
+        executadas += 1
+    apagar_arquivos_expirados()
+    return executadas
+
+
+# --- Consulta ---
+def _tarefa_para_dict(row):
+    tarefa = dict(row)
+    tarefa['descricao'] = TAREFAS[tarefa['tipo']][0] if tarefa['tipo'] in TAREFAS else tarefa['tipo']
+    tarefa['parametros'] = json.loads(tarefa['parametros'] or '{}')
+    tarefa['resultado'] = json.loads(tarefa['resultado']) if tarefa['resultado'] else None
+    return tarefa
+
+
+def get_tarefa(tarefa_id):
+    row = get_db().execute("SELECT * FROM tarefas WHERE id = ?", (tarefa_id,)).fetchone()
+    return _tarefa_para_dict(row) if row else None
+
+
+def get_tarefas_recentes(limite=30):
+    rows = get_db().execute("SELECT * FROM tarefas ORDER BY id DESC LIMIT ?", (limite,)).fetchall()
+    return [_tarefa_para_dict(row) for row in rows]
+
+
+@click.command("processar-tarefas")
+@with_appcontext
+def processar_tarefas_command():
+    """Executa agora as tarefas que ficaram pendentes na fila."""
+    print(f"{processar_tarefas_pendentes()} tarefas executadas.")